@@ -0,0 +1,267 @@
+"""
+Асинхронные представления для чтения (профиль ASGI).
+
+Лента и страница рецепта, поиск ингредиентов и профиль пользователя
+- основная нагрузка на чтение. Под ASGI-сервером эти GET-запросы
+обрабатываются корутинами: запросы к БД идут через асинхронный ORM,
+кеш - через асинхронный API кеша Django, и воркер не блокируется,
+пока ждет ответа. Составные синхронные помощники (валидаторы условных
+запросов, пагинация со стратегиями count) вызываются через
+sync_to_async одним переходом в поток - так же асинхронный ORM Django
+выполняет каждый отдельный запрос. Сериализация идет в цикле событий:
+все данные для нее загружаются заранее.
+
+Ответы совпадают с ответами ViewSet. Все, что быстрый путь не
+обрабатывает (другие методы, браузерный API, ошибки авторизации,
+несуществующие объекты, некорректные параметры), передается
+синхронному ViewSet, поэтому тексты ошибок остаются прежними.
+
+Маршруты подключаются в api.urls при ASYNC_READ_VIEWS = True.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Exists, OuterRef
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authentication import get_authorization_header
+from rest_framework.exceptions import APIException
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from recipes.models import Ingredient
+from users.authentication import aget_token_user
+from users.models import Subscription
+
+from .conditional import (
+    aconditional_response, ingredient_validators, recipe_list_validators,
+    recipe_validators, user_validators
+)
+from .filters import IngredientSearchFilter, RecipeFilter
+from .ingredient_cache import ingredient_catalogue_cache
+from .pagination import CustomPageNumberPagination
+from .response_cache import (
+    get_cached, is_cacheable, recipe_list_tags, recipe_tags, store
+)
+from .serializers import (
+    CustomUserSerializer, IngredientSerializer, RecipeReadSerializer
+)
+from .views import IngredientViewSet, RecipeViewSet, UserViewSet
+
+User = get_user_model()
+
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {
+    'get': 'retrieve', 'put': 'update',
+    'patch': 'partial_update', 'delete': 'destroy',
+}
+
+
+class Fallback(Exception):
+    """Запрос нужно передать синхронному ViewSet."""
+
+
+async def authenticate(request):
+    """
+    Пользователь по заголовку Authorization: Token <ключ>.
+
+    Повторяет CachedTokenAuthentication и использует тот же кеш
+    снимков: без заголовка или с другой схемой запрос анонимный.
+    Некорректный или чужой токен вызывает Fallback, чтобы ответ 401
+    сформировал DRF.
+    """
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != b'token':
+        return AnonymousUser()
+    if len(auth) != 2:
+        raise Fallback
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        raise Fallback
+    user = await aget_token_user(key)
+    if user is None or not user.is_active:
+        raise Fallback
+    return user
+
+
+def negotiate(request):
+    """Выбирает рендерер как DRF; быстрый путь отдает только JSON."""
+    renderers = [
+        renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+    ]
+    renderer, media_type = DefaultContentNegotiation().select_renderer(
+        request, renderers
+    )
+    if renderer.format != 'json':
+        raise Fallback
+    request.accepted_renderer = renderer
+    request.accepted_media_type = media_type
+
+
+def to_http_response(response):
+    """Рендерит Response в JSON без перехода в поток при отдаче."""
+    if not isinstance(response, Response):
+        return response
+    rendered = HttpResponse(
+        JSONRenderer().render(response.data),
+        status=response.status_code,
+        content_type='application/json'
+    )
+    for header, value in response.items():
+        if header.lower() != 'content-type':
+            rendered[header] = value
+    # Как DRF Response: содержимое зависит от заголовка Accept
+    patch_vary_headers(rendered, ('Accept',))
+    return rendered
+
+
+def read_view(viewset, actions):
+    """
+    Асинхронное представление GET-запросов с откатом на viewset.
+
+    Обработчик получает DRF Request с пользователем и выбранным
+    рендерером и возвращает ответ или вызывает Fallback.
+    """
+    fallback = sync_to_async(viewset.as_view(actions))
+
+    def decorator(handler):
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            if request.method == 'GET':
+                try:
+                    drf_request = Request(request)
+                    negotiate(drf_request)
+                    # Как DRF Request: APIClient.force_authenticate в тестах
+                    user = getattr(request, '_force_auth_user', None)
+                    if user is None:
+                        user = await authenticate(request)
+                    drf_request.user = user
+                    return to_http_response(
+                        await handler(drf_request, *args, **kwargs)
+                    )
+                except (Fallback, APIException, ObjectDoesNotExist):
+                    pass
+            return await fallback(request, *args, **kwargs)
+
+        return csrf_exempt(view)
+
+    return decorator
+
+
+async def cached(request, build, get_tags):
+    """Асинхронный вариант response_cache.get_cached_response."""
+    if not is_cacheable(request):
+        return await build()
+    response = await sync_to_async(get_cached)(request)
+    if response is None:
+        response = await build()
+        response = await sync_to_async(store)(request, response, get_tags)
+    return response
+
+
+def serializer_context(request):
+    return {'request': request, 'format': None}
+
+
+@read_view(RecipeViewSet, LIST_ACTIONS)
+async def recipe_list(request):
+    """Лента рецептов: фильтры, пагинация и формат как у ViewSet."""
+    def filtered(queryset):
+        filterset = RecipeFilter(
+            request.query_params, queryset=queryset, request=request
+        )
+        if not filterset.is_valid():
+            raise Fallback
+        return filterset.qs
+
+    queryset = filtered(RecipeViewSet.get_read_queryset(request.user))
+
+    async def render():
+        paginator = CustomPageNumberPagination()
+        page = await sync_to_async(paginator.paginate_queryset)(
+            queryset, request, RecipeViewSet
+        )
+        serializer = RecipeReadSerializer(
+            page, many=True, context=serializer_context(request)
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    async def build():
+        validators = await sync_to_async(recipe_list_validators)(request)
+        return await aconditional_response(request, validators, render)
+
+    return await cached(request, build, recipe_list_tags)
+
+
+@read_view(RecipeViewSet, DETAIL_ACTIONS)
+async def recipe_detail(request, pk):
+    """Страница рецепта."""
+    async def render():
+        recipe = await RecipeViewSet.get_read_queryset(request.user).aget(
+            pk=pk
+        )
+        return Response(RecipeReadSerializer(
+            recipe, context=serializer_context(request)
+        ).data)
+
+    async def build():
+        validators = await sync_to_async(recipe_validators)(pk, request.user)
+        if validators is None:
+            raise Fallback
+        return await aconditional_response(request, validators, render)
+
+    return await cached(request, build, recipe_tags)
+
+
+@read_view(IngredientViewSet, {'get': 'list'})
+async def ingredient_list(request):
+    """Поиск по справочнику ингредиентов."""
+    key = IngredientViewSet.get_list_key(request)
+
+    async def serialize():
+        queryset = await sync_to_async(
+            IngredientSearchFilter().filter_queryset
+        )(request, Ingredient.objects.all(), None)
+        ingredients = [ingredient async for ingredient in queryset]
+        return JSONRenderer().render(
+            IngredientSerializer(ingredients, many=True).data
+        )
+
+    async def render():
+        return HttpResponse(
+            await ingredient_catalogue_cache.aget(key, serialize),
+            content_type='application/json'
+        )
+
+    validators = await sync_to_async(ingredient_validators)(key)
+    return await aconditional_response(request, validators, render)
+
+
+@read_view(UserViewSet, DETAIL_ACTIONS)
+async def user_detail(request, pk):
+    """Профиль пользователя."""
+    user = request.user
+
+    async def render():
+        queryset = User.objects.all()
+        if user.is_authenticated:
+            queryset = queryset.annotate(is_subscribed=Exists(
+                Subscription.objects.filter(user=user, author=OuterRef('pk'))
+            ))
+        instance = await queryset.aget(pk=pk)
+        return Response(CustomUserSerializer(
+            instance, context=serializer_context(request)
+        ).data)
+
+    validators = await sync_to_async(user_validators)(pk, user)
+    if validators is None:
+        raise Fallback
+    return await aconditional_response(request, validators, render)
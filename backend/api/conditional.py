@@ -0,0 +1,157 @@
+"""
+Условные GET-запросы (ETag, Last-Modified).
+
+Валидаторы вычисляются без сериализации, поэтому при совпадении
+If-None-Match ответ 304 отдается до запуска сериализатора. Для рецепта
+и профиля это выборка updated_at по первичному ключу; ETag ленты
+строится по версиям тегов кеша (api.response_cache) и параметрам
+запроса и не требует запросов к БД: агрегат по всей ленте выполнялся бы
+на каждый ее запрос.
+
+Ответ авторизованному пользователю зависит от его избранного, списка
+покупок и подписок: в ETag входит версия тега этих списков, а
+Last-Modified такому ответу не отдается.
+"""
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+from recipes.catalogue import get_catalogue_version
+from recipes.models import Recipe
+
+from .response_cache import FEED_TAG, get_tag_versions, user_lists_tag
+
+
+def make_etag(*parts):
+    """Строгий ETag из значений, от которых зависит ответ."""
+    raw = '|'.join(str(part) for part in parts)
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def get_user_state(user):
+    """
+    Версия списков пользователя, влияющих на флаги в ответах.
+
+    Меняется при любом добавлении или удалении избранного, рецепта в
+    списке покупок и подписки (см. api.signals). Для анонима - None.
+    """
+    if not user.is_authenticated:
+        return None
+    tag = user_lists_tag(user.pk)
+    return get_tag_versions([tag])[tag]
+
+
+def _validators(user, last_modified, *parts):
+    """ETag с учетом пользователя; Last-Modified только для анонима."""
+    etag = make_etag(
+        *parts, user.pk, get_user_state(user), get_catalogue_version()
+    )
+    if user.is_authenticated:
+        last_modified = None
+    return etag, last_modified
+
+
+def recipe_list_validators(request):
+    """
+    Валидаторы ленты: версия тега feed, которая меняется при любом
+    изменении рецептов и их авторов, и параметры запроса (фильтры,
+    страница). Last-Modified ленте не отдается.
+    """
+    params = sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        for value in values
+    )
+    feed_version = get_tag_versions([FEED_TAG])[FEED_TAG]
+    return _validators(request.user, None, 'recipes', params, feed_version)
+
+
+def recipe_validators(pk, user):
+    """Валидаторы рецепта; None, если рецепта нет."""
+    try:
+        row = Recipe.objects.filter(pk=pk).values(
+            'updated_at', 'author__updated_at'
+        ).first()
+    except (TypeError, ValueError):
+        return None
+    if row is None:
+        return None
+    return _validators(
+        user, max(row['updated_at'], row['author__updated_at']),
+        'recipe', pk, row['updated_at'], row['author__updated_at']
+    )
+
+
+def user_validators(instance_or_pk, user):
+    """Валидаторы профиля пользователя; None, если его нет."""
+    if isinstance(instance_or_pk, get_user_model()):
+        updated_at = instance_or_pk.updated_at
+        pk = instance_or_pk.pk
+    else:
+        pk = instance_or_pk
+        updated_at = get_user_model().objects.filter(pk=pk).values_list(
+            'updated_at', flat=True
+        ).first()
+        if updated_at is None:
+            return None
+    return _validators(user, updated_at, 'user', pk, updated_at)
+
+
+def ingredient_validators(key):
+    """
+    Валидаторы ответа справочника: он определяется версией
+    справочника и ключом кеша, запрос к БД не нужен.
+    """
+    return make_etag('ingredients', key, get_catalogue_version()), None
+
+
+def conditional_response(request, validators, build):
+    """
+    Возвращает 304, если валидаторы совпадают с заголовками запроса,
+    иначе ответ build() с заголовками ETag и Last-Modified.
+
+    validators - пара (etag, last_modified) или None, если проверку
+    нужно пропустить (например, объект не найден).
+    """
+    if validators is None:
+        return build()
+    response = _not_modified_by(request, validators)
+    if response is None:
+        response = build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+    return _set_validators(response, validators)
+
+
+async def aconditional_response(request, validators, build):
+    """Вариант conditional_response для асинхронных представлений."""
+    if validators is None:
+        return await build()
+    response = _not_modified_by(request, validators)
+    if response is None:
+        response = await build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+    return _set_validators(response, validators)
+
+
+def _timestamp(last_modified):
+    return int(last_modified.timestamp()) if last_modified else None
+
+
+def _not_modified_by(request, validators):
+    etag, last_modified = validators
+    return get_conditional_response(
+        request, etag=etag, last_modified=_timestamp(last_modified)
+    )
+
+
+def _set_validators(response, validators):
+    etag, last_modified = validators
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(_timestamp(last_modified))
+    return response
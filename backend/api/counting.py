@@ -0,0 +1,168 @@
+"""
+Стратегии подсчета общего количества записей для пагинации.
+
+Точный SELECT COUNT(*) по отфильтрованному queryset выполняется на каждой
+странице. Стратегия выбирается во view атрибутом count_strategy:
+
+- ExactCount - точный COUNT (по умолчанию);
+- CachedCount - точный COUNT, закешированный на короткое время по
+  нормализованному SQL запроса (то есть по набору фильтров); все
+  значения сбрасывает invalidate_counts - его вызывают сигналы api.signals
+  при создании и удалении рецептов, пользователей и записей избранного,
+  списка покупок и подписок;
+- EstimatedCount - на PostgreSQL оценка планировщика (reltuples для
+  запроса без фильтров, EXPLAIN для запроса с фильтрами), если она
+  больше порога; иначе и на других СУБД - CachedCount.
+"""
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils.functional import cached_property
+
+from foodgram.metrics import record_cache
+
+CACHE_KEY_PREFIX = 'api:count:'
+VERSION_KEY = CACHE_KEY_PREFIX + 'version'
+
+
+def get_count_version():
+    """Текущая версия закешированных значений count."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate_counts():
+    """Делает устаревшими все закешированные значения count."""
+    def bump():
+        cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+    bump()
+    # Повторно после коммита: count, посчитанный другим воркером до
+    # фиксации транзакции, мог попасть в кеш уже с новой версией
+    transaction.on_commit(bump)
+
+
+class ExactCount:
+    """Точный COUNT на каждый запрос."""
+
+    def count(self, queryset):
+        return queryset.count()
+
+
+class CachedCount(ExactCount):
+    """Точный COUNT, закешированный на timeout секунд."""
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+
+    def count(self, queryset):
+        key = self.get_cache_key(queryset)
+        if key is None:
+            return super().count(queryset)
+        version = get_count_version()
+        value = cache.get(key, version=version)
+        record_cache('count', value is not None)
+        if value is None:
+            value = super().count(queryset)
+            cache.set(
+                key, value, timeout=self.get_timeout(), version=version
+            )
+        return value
+
+    def get_timeout(self):
+        if self.timeout is not None:
+            return self.timeout
+        return settings.PAGINATION_COUNT_CACHE_TIMEOUT
+
+    @staticmethod
+    def get_cache_key(queryset):
+        """
+        Ключ по SQL выборки первичных ключей без сортировки.
+
+        Аннотации, не участвующие в фильтрах, в этот SQL не попадают,
+        поэтому запросы с одинаковым набором фильтров делят один ключ.
+        Возвращает None, если запрос заведомо пустой.
+        """
+        query = queryset.order_by().values('pk').query
+        try:
+            sql, params = query.sql_with_params()
+        except EmptyResultSet:
+            return None
+        digest = hashlib.md5(f'{sql}|{params!r}'.encode()).hexdigest()
+        return f'{CACHE_KEY_PREFIX}{queryset.db}:{digest}'
+
+
+class EstimatedCount(CachedCount):
+    """Оценка количества строк планировщиком PostgreSQL."""
+
+    def __init__(self, threshold=None, timeout=None):
+        super().__init__(timeout=timeout)
+        self.threshold = threshold
+
+    def count(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            estimate = self.estimate(queryset, connection)
+            if estimate is not None and estimate > self.get_threshold():
+                return estimate
+        return super().count(queryset)
+
+    def get_threshold(self):
+        if self.threshold is not None:
+            return self.threshold
+        return settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD
+
+    @staticmethod
+    def estimate(queryset, connection):
+        """Возвращает оценку количества строк или None."""
+        query = queryset.order_by().values('pk').query
+        with connection.cursor() as cursor:
+            if not query.where:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+                # -1: таблица еще не анализировалась
+                return row[0] if row and row[0] >= 0 else None
+            try:
+                sql, params = query.sql_with_params()
+            except EmptyResultSet:
+                return 0
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CountStrategyPaginator(Paginator):
+    """Paginator, получающий count через стратегию подсчета."""
+
+    def __init__(self, object_list, per_page, count_strategy=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_strategy = count_strategy or ExactCount()
+
+    @cached_property
+    def count(self):
+        return self.count_strategy.count(self.object_list)
+
+    def page(self, number):
+        """
+        Срез страницы не ограничивается значением count: закешированное
+        или оценочное значение может отставать, и последняя страница
+        не должна терять новые записи.
+        """
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        return self._get_page(self.object_list[bottom:top], number, self)
@@ -0,0 +1,150 @@
+"""
+Потоковое декодирование изображений в формате data URI.
+
+Строка base64 не копируется целиком и не декодируется за один вызов:
+она разбирается кусками в SpooledTemporaryFile, который держит в памяти
+не больше IMAGE_UPLOAD_SPOOL_SIZE байт, а остальное пишет на диск.
+Пробельные символы (base64 с переносами строк) пропускаются.
+Размер файла проверяется по длине строки до декодирования, разрешение -
+по заголовку изображения (ленивое открытие в Pillow) после первых
+кусков, поэтому слишком большие изображения отклоняются до того,
+как будут декодированы полностью.
+"""
+import base64
+import binascii
+import re
+import uuid
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+from rest_framework import serializers
+
+# Форматы Pillow, которые принимаются от клиентов
+ALLOWED_FORMATS = frozenset(('PNG', 'JPEG', 'GIF', 'WEBP', 'AVIF'))
+# Длина куска строки base64 (кратна 4) и объем начала файла,
+# в котором ищется заголовок с размерами изображения
+CHUNK_SIZE = 64 * 1024
+HEADER_PROBE_SIZE = 256 * 1024
+# Заголовок data URI ищется только в начале строки
+MAX_HEADER_LENGTH = 64
+
+HEADER_RE = re.compile(r'data:image/[a-z0-9.+-]+;base64,')
+# Пробельные символы, которые клиенты вставляют в base64
+WHITESPACE = ' \t\n\r\x0b\x0c'
+STRIP_WHITESPACE = str.maketrans('', '', WHITESPACE)
+
+INVALID_MESSAGE = 'Загруженный файл не является корректным изображением.'
+TOO_LARGE_MESSAGE = 'Размер изображения не должен превышать {limit} байт.'
+TOO_MANY_PIXELS_MESSAGE = (
+    'Разрешение изображения не должно превышать {limit} пикселей.'
+)
+
+
+def _check_pixels(image):
+    width, height = image.size
+    if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+        raise serializers.ValidationError(TOO_MANY_PIXELS_MESSAGE.format(
+            limit=settings.IMAGE_UPLOAD_MAX_PIXELS
+        ))
+
+
+def _probe(file):
+    """
+    Пытается прочитать размеры по уже записанному началу файла.
+
+    Возвращает True, если заголовок прочитан и проверен.
+    """
+    position = file.tell()
+    file.seek(0)
+    try:
+        image = Image.open(file)
+    except Image.DecompressionBombError:
+        raise serializers.ValidationError(TOO_MANY_PIXELS_MESSAGE.format(
+            limit=settings.IMAGE_UPLOAD_MAX_PIXELS
+        ))
+    except Exception:
+        # Заголовок еще не записан целиком
+        return False
+    finally:
+        file.seek(position)
+    _check_pixels(image)
+    return True
+
+
+def _write_decoded(file, encoded):
+    try:
+        file.write(base64.b64decode(encoded, validate=True))
+    except (binascii.Error, ValueError):
+        raise serializers.ValidationError(INVALID_MESSAGE)
+
+
+def decode_image(data):
+    """
+    Декодирует data URI в файл изображения.
+
+    Возвращает UploadedFile поверх SpooledTemporaryFile с именем
+    <uuid>.<формат>; при ошибке проверки - ValidationError.
+    """
+    header = HEADER_RE.match(data, 0, MAX_HEADER_LENGTH)
+    if header is None:
+        raise serializers.ValidationError(INVALID_MESSAGE)
+    start = header.end()
+
+    # 4 символа base64 - 3 байта; проверка до декодирования
+    encoded_length = len(data) - start - sum(
+        data.count(char, start) for char in WHITESPACE
+    )
+    if encoded_length * 3 // 4 > settings.IMAGE_UPLOAD_MAX_BYTES:
+        raise serializers.ValidationError(TOO_LARGE_MESSAGE.format(
+            limit=settings.IMAGE_UPLOAD_MAX_BYTES
+        ))
+
+    file = SpooledTemporaryFile(max_size=settings.IMAGE_UPLOAD_SPOOL_SIZE)
+    try:
+        checked = False
+        pending = ''
+        for offset in range(start, len(data), CHUNK_SIZE):
+            # После удаления пробелов кусок обрезается до длины, кратной
+            # 4; остаток переносится в начало следующего куска
+            chunk = pending + data[offset:offset + CHUNK_SIZE].translate(
+                STRIP_WHITESPACE
+            )
+            usable = len(chunk) - len(chunk) % 4
+            pending = chunk[usable:]
+            _write_decoded(file, chunk[:usable])
+            if not checked and file.tell() <= HEADER_PROBE_SIZE:
+                checked = _probe(file)
+        if pending:
+            _write_decoded(file, pending)
+        size = file.tell()
+
+        file.seek(0)
+        try:
+            image = Image.open(file)
+            image_format = image.format
+            if not checked:
+                _check_pixels(image)
+            image.verify()
+        except serializers.ValidationError:
+            raise
+        except Image.DecompressionBombError:
+            raise serializers.ValidationError(TOO_MANY_PIXELS_MESSAGE.format(
+                limit=settings.IMAGE_UPLOAD_MAX_PIXELS
+            ))
+        except Exception:
+            raise serializers.ValidationError(INVALID_MESSAGE)
+        if image_format not in ALLOWED_FORMATS:
+            raise serializers.ValidationError(INVALID_MESSAGE)
+        file.seek(0)
+    except Exception:
+        file.close()
+        raise
+
+    return UploadedFile(
+        file=file,
+        name=f'{uuid.uuid4()}.{image_format.lower()}',
+        content_type=Image.MIME.get(image_format),
+        size=size,
+    )
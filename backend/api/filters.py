@@ -1,8 +1,10 @@
 from django_filters import rest_framework as filters
 from rest_framework.filters import SearchFilter
+from django.conf import settings
 from django.contrib.auth import get_user_model
 
 from recipes.models import Recipe
+from recipes.search import normalize, search_ingredients
 
 User = get_user_model()
 
@@ -10,18 +12,32 @@ User = get_user_model()
 class IngredientSearchFilter(SearchFilter):
     """Фильтр для поиска по названию ингредиента."""
     search_param = 'name'
+    limit_param = 'limit'
 
     def filter_queryset(self, request, queryset, view):
         """
-        Переопределенный метод фильтрации для поиска по префиксу.
+        Поиск по префиксу, вхождению и с опечатками
+        (см. recipes.search.search_ingredients).
         """
-        search_terms = self.get_search_terms(request)
-        if not search_terms:
+        search_term = self.get_search_term(request)
+        if not search_term:
             return queryset
+        return search_ingredients(
+            queryset, search_term, self.get_limit(request)
+        )
 
-        # Используем поиск по префиксу вместо поиска вхождения
-        search_term = search_terms[0]  # Берем первый поисковый термин
-        return queryset.filter(name__startswith=search_term)
+    def get_search_term(self, request):
+        """Нормализованная строка поиска из параметра name."""
+        return normalize(request.query_params.get(self.search_param, ''))
+
+    def get_limit(self, request):
+        """Количество результатов: ?limit=, но не больше настройки."""
+        max_limit = settings.INGREDIENT_SEARCH_LIMIT
+        try:
+            limit = int(request.query_params.get(self.limit_param, max_limit))
+        except ValueError:
+            return max_limit
+        return max(1, min(limit, max_limit))
 
 
 class RecipeFilter(filters.FilterSet):
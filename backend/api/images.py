@@ -0,0 +1,164 @@
+"""
+Фоновая обработка загруженных изображений рецептов.
+
+Оригинал сохраняется в запросе как есть. Уменьшенные копии
+фиксированной ширины (WebP, AVIF) строятся после коммита транзакции
+в пуле потоков процесса и записываются в Recipe.image_variants:
+{формат: {ширина: имя файла в хранилище}}. Пока копии не готовы,
+поле пустое и клиенты используют оригинал.
+
+Аватары не обрабатываются и отдаются клиентам оригиналом.
+"""
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from recipes.models import Recipe
+
+from .response_cache import invalidate_tags, recipe_tag
+
+logger = logging.getLogger('api')
+
+VARIANTS_DIR = 'variants'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_variant_formats():
+    """Форматы копий, которые умеет кодировать установленный Pillow."""
+    return [
+        fmt for fmt in settings.IMAGE_VARIANT_FORMATS if features.check(fmt)
+    ]
+
+
+def variant_name(name, width, fmt):
+    """Имя копии: <каталог>/variants/<имя оригинала>-<ширина>.<формат>."""
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, VARIANTS_DIR, f'{stem}-{width}.{fmt}')
+
+
+def build_variants(name, storage=default_storage):
+    """
+    Строит копии изображения name и возвращает их имена.
+
+    Изображение не увеличивается: ширины больше оригинала пропускаются,
+    а если оригинал уже всех ширин, копия делается в исходном размере.
+    Уже существующие файлы копий не перезаписываются.
+    """
+    with storage.open(name) as f:
+        image = Image.open(f)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if image.has_transparency_data
+                              else 'RGB')
+
+    widths = [
+        width for width in settings.IMAGE_VARIANT_WIDTHS
+        if width < image.width
+    ] or [image.width]
+    formats = get_variant_formats()
+
+    variants = {fmt: {} for fmt in formats}
+    for width in widths:
+        resized = None
+        for fmt in formats:
+            target = variant_name(name, width, fmt)
+            if not storage.exists(target):
+                if resized is None:
+                    height = max(1, round(image.height * width / image.width))
+                    resized = image.resize(
+                        (width, height), Image.Resampling.LANCZOS
+                    )
+                buffer = BytesIO()
+                resized.save(
+                    buffer, format=fmt.upper(),
+                    quality=settings.IMAGE_VARIANT_QUALITY
+                )
+                target = storage.save(target, ContentFile(buffer.getvalue()))
+            variants[fmt][str(width)] = target
+    return variants
+
+
+def process_recipe_image(recipe_id, name):
+    """Строит копии изображения рецепта и сохраняет их в рецепт."""
+    try:
+        variants = build_variants(name)
+        # Изображение могли заменить, пока строились копии
+        updated = Recipe.objects.filter(pk=recipe_id, image=name).update(
+            image_variants=variants, updated_at=timezone.now()
+        )
+        if updated:
+            invalidate_tags(recipe_tag(recipe_id))
+    except Exception:
+        logger.exception(
+            'Не удалось обработать изображение %s рецепта %s',
+            name, recipe_id
+        )
+
+
+def _run_in_worker(func, *args):
+    """Выполняет задачу в потоке пула и закрывает его соединения с БД."""
+    try:
+        func(*args)
+    finally:
+        connections.close_all()
+
+
+def get_executor():
+    """Пул потоков обработки, создается при первом обращении."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_PIPELINE_WORKERS,
+                    thread_name_prefix='image-pipeline'
+                )
+    return _executor
+
+
+def schedule_recipe_image(recipe):
+    """
+    Ставит обработку изображения рецепта в очередь после коммита.
+
+    При IMAGE_PIPELINE_WORKERS = 0 обработка выполняется сразу
+    в текущем потоке (для тестов и отладки).
+    """
+    name = recipe.image.name
+    if not name:
+        return
+
+    def submit():
+        if settings.IMAGE_PIPELINE_WORKERS > 0:
+            get_executor().submit(
+                _run_in_worker, process_recipe_image, recipe.pk, name
+            )
+        else:
+            process_recipe_image(recipe.pk, name)
+
+    transaction.on_commit(submit)
+
+
+def get_variant_urls(recipe, request=None):
+    """Абсолютные ссылки на готовые копии изображения рецепта."""
+    urls = {}
+    for fmt, widths in (recipe.image_variants or {}).items():
+        urls[fmt] = {}
+        for width, name in widths.items():
+            url = default_storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[fmt][width] = url
+    return urls
@@ -0,0 +1,106 @@
+"""
+Кеш ответов API справочника ингредиентов.
+
+Ответы /api/ingredients/ (весь список, результаты поиска по каждому
+запросу) и /api/ingredients/{id}/ хранятся уже сериализованными в JSON:
+в памяти процесса и в общем для воркеров кеше Django. Записи привязаны
+к версии справочника (recipes.catalogue) и устаревают при ее смене.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from foodgram.metrics import record_cache
+from recipes.catalogue import get_catalogue_version
+
+CACHE_KEY_PREFIX = 'api:ingredients:'
+
+
+class IngredientCatalogueCache:
+    """Двухуровневый кеш сериализованных ответов справочника."""
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or settings.INGREDIENT_CACHE_MAX_ENTRIES
+        self._version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """
+        Возвращает JSON для ключа key.
+
+        Порядок поиска: память процесса, кеш Django, вызов build(),
+        результат которого сохраняется на обоих уровнях.
+        """
+        version = get_catalogue_version()
+        content = self._get_local(version, key)
+        if content is not None:
+            return content
+
+        shared_key = self._shared_key(key)
+        content = cache.get(shared_key, version=version)
+        record_cache('ingredients', content is not None)
+        if content is None:
+            content = build()
+            cache.set(
+                shared_key, content,
+                timeout=settings.INGREDIENT_CACHE_TIMEOUT, version=version
+            )
+        self._set_local(version, key, content)
+        return content
+
+    async def aget(self, key, build):
+        """Вариант get для асинхронных представлений: build - корутина."""
+        version = await sync_to_async(get_catalogue_version)()
+        content = self._get_local(version, key)
+        if content is not None:
+            return content
+
+        shared_key = self._shared_key(key)
+        content = await cache.aget(shared_key, version=version)
+        record_cache('ingredients', content is not None)
+        if content is None:
+            content = await build()
+            await cache.aset(
+                shared_key, content,
+                timeout=settings.INGREDIENT_CACHE_TIMEOUT, version=version
+            )
+        self._set_local(version, key, content)
+        return content
+
+    def _get_local(self, version, key):
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+        record_cache('ingredients_local', content is not None)
+        return content
+
+    def _set_local(self, version, key, content):
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = content
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def clear(self):
+        """Очищает кеш в памяти процесса."""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    @staticmethod
+    def _shared_key(key):
+        # Ключ содержит строку поиска пользователя, поэтому хешируется:
+        # memcached не допускает пробелов и длинных ключей
+        return CACHE_KEY_PREFIX + hashlib.md5(key.encode()).hexdigest()
+
+
+ingredient_catalogue_cache = IngredientCatalogueCache()
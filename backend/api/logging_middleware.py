@@ -2,72 +2,120 @@
 Middleware для логирования запросов и отладки
 """
 import logging
+import random
 import time
-import traceback
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .sql_profiler import RepeatedQueriesError, profile_queries
 
 logger = logging.getLogger('api.middleware')
+sql_logger = logging.getLogger('api.sql')
 
 
 class LoggingMiddleware:
-    """Middleware для логирования всех запросов"""
+    """
+    Middleware для логирования всех запросов
+
+    На запрос пишется одна запись с полями method, path, route, status,
+    duration_ms, ip, user_agent, а также db_queries и db_ms от
+    QueryProfilerMiddleware. Сообщение форматируется лениво, в
+    фоновом потоке логирования (см. foodgram.log). Успешные быстрые
+    запросы логируются с вероятностью REQUEST_LOG_SAMPLE_RATES[маршрут]
+    (по умолчанию REQUEST_LOG_SAMPLE_RATE); ошибки и запросы дольше
+    REQUEST_LOG_SLOW_MS - всегда.
+    """
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
+        # Под ASGI цепочка остается асинхронной, без перехода в поток
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        start_time = time.time()
-
-        # Логируем входящий запрос
-        logger.info(
-            f"Запрос: {request.method} {request.path} "
-            f"от IP: {self.get_client_ip(request)} "
-            f"User-Agent: {request.META.get('HTTP_USER_AGENT', 'Unknown')}"
-        )
-
-        # Логируем тело запроса для POST/PUT запросов
-        if request.method in ['POST', 'PUT', 'PATCH']:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start_time = self.log_request(request)
+        response = self.get_response(request)
+        return self.log_response(request, response, start_time)
+
+    async def __acall__(self, request):
+        start_time = self.log_request(request)
+        response = await self.get_response(request)
+        return self.log_response(request, response, start_time)
+
+    def log_request(self, request):
+        """Логирует тело запроса на уровне DEBUG и возвращает время начала"""
+        if (
+            request.method in ('POST', 'PUT', 'PATCH')
+            and logger.isEnabledFor(logging.DEBUG)
+        ):
             try:
-                if hasattr(request, 'body') and request.body:
-                    logger.debug(f"Тело запроса: {request.body.decode('utf-8')[:1000]}")
+                logger.debug(
+                    'Тело запроса: %s',
+                    request.body[:1000].decode('utf-8', 'replace')
+                )
             except Exception as e:
-                logger.warning(f"Не удалось прочитать тело запроса: {e}")
-
-        # Логируем GET параметры
-        if request.GET:
-            logger.debug(f"GET параметры: {dict(request.GET)}")
-
-        # Обрабатываем запрос
-        response = self.get_response(request)
-
-        # Считаем время выполнения
-        duration = time.time() - start_time
-
-        # Логируем ответ
-        logger.info(
-            f"Ответ: {response.status_code} для {request.method} {request.path} "
-            f"за {duration:.3f}с"
+                logger.warning('Не удалось прочитать тело запроса: %s', e)
+        return time.perf_counter()
+
+    def log_response(self, request, response, start_time):
+        """Логирует ответ и время выполнения запроса"""
+        duration = time.perf_counter() - start_time
+        status = response.status_code
+        if status >= 500:
+            level = logging.ERROR
+        elif status >= 400:
+            level = logging.WARNING
+        else:
+            level = logging.INFO
+        if not logger.isEnabledFor(level):
+            return response
+
+        route = get_route(request)
+        if (
+            level == logging.INFO
+            and duration * 1000 < settings.REQUEST_LOG_SLOW_MS
+        ):
+            rate = get_sample_rate(route)
+            if rate < 1 and random.random() >= rate:
+                return response
+
+        extra = {}
+        profile = getattr(request, 'sql_profile', None)
+        if profile is not None:
+            extra = {
+                'db_queries': profile.count,
+                'db_ms': round(profile.duration * 1000, 2),
+            }
+        logger.log(
+            level, '%s %s %s за %.1fмс',
+            request.method, request.path, status, duration * 1000,
+            extra={
+                **extra,
+                'method': request.method,
+                'path': request.path,
+                'query': request.META.get('QUERY_STRING', ''),
+                'route': route,
+                'status': status,
+                'duration_ms': round(duration * 1000, 2),
+                'ip': self.get_client_ip(request),
+                'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+            }
         )
-
-        # Логируем детали ошибок
-        if response.status_code >= 400:
-            logger.warning(
-                f"Ошибка {response.status_code}: {request.method} {request.path}"
-            )
-
-        if response.status_code >= 500:
-            logger.error(
-                f"Серверная ошибка {response.status_code}: {request.method} {request.path}"
-            )
-
         return response
 
     def process_exception(self, request, exception):
         """Логируем необработанные исключения"""
         logger.error(
-            f"Необработанное исключение для {request.method} {request.path}: "
-            f"{exception.__class__.__name__}: {str(exception)}"
+            'Необработанное исключение для %s %s: %r',
+            request.method, request.path, exception,
+            exc_info=(type(exception), exception, exception.__traceback__),
+            extra={'route': get_route(request), 'path': request.path}
         )
-        logger.error(f"Traceback: {traceback.format_exc()}")
         return None
 
     @staticmethod
@@ -81,36 +129,106 @@ class LoggingMiddleware:
         return ip
 
 
-class DatabaseQueryLoggingMiddleware:
-    """Middleware для логирования SQL запросов"""
+def get_route(request):
+    """Имя маршрута (api:recipe-list) или None, если URL не найден"""
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else None
 
-    def __init__(self, get_response):
-        self.get_response = get_response
-        self.sql_logger = logging.getLogger('django.db.backends')
 
-    def __call__(self, request):
-        from django.db import connection
+def get_sample_rate(route):
+    """Доля логируемых успешных запросов маршрута"""
+    return settings.REQUEST_LOG_SAMPLE_RATES.get(
+        route, settings.REQUEST_LOG_SAMPLE_RATE
+    )
 
-        # Считаем количество запросов до
-        queries_before = len(connection.queries)
 
-        response = self.get_response(request)
+class QueryProfilerMiddleware:
+    """
+    Middleware для профилирования SQL запросов
 
-        # Считаем количество запросов после
-        queries_after = len(connection.queries)
-        queries_count = queries_after - queries_before
+    Считает запросы и время в БД через connection.execute_wrapper
+    (api.sql_profiler), поэтому работает и без DEBUG. Статистика
+    попадает в запись LoggingMiddleware (поля db_queries и db_ms), в
+    заголовок Server-Timing при SQL_PROFILER_SERVER_TIMING, а запросы
+    дольше SQL_SLOW_QUERY_MS логируются отдельно с отпечатками.
 
-        if queries_count > 0:
-            self.sql_logger.info(
-                f"SQL запросов для {request.method} {request.path}: {queries_count}"
-            )
+    Повторы одного отпечатка (N+1) логируются с местом вызова, а при
+    SQL_REPEATED_QUERY_RAISE выбрасывается RepeatedQueriesError.
+    """
+    sync_capable = True
+    async_capable = True
 
-            # Логируем медленные запросы
-            for query in connection.queries[queries_before:]:
-                duration = float(query.get('time', 0))
-                if duration > 0.1:  # Запросы дольше 100ms
-                    self.sql_logger.warning(
-                        f"Медленный запрос ({duration:.3f}s): {query['sql'][:200]}..."
-                    )
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with profile_queries() as profile:
+            response = self.get_response(request)
+        return self.report(request, response, profile)
+
+    async def __acall__(self, request):
+        # Профиль хранится в ContextVar: запросы из потоков sync_to_async
+        # попадают в него, а запросы соседних корутин - нет
+        with profile_queries() as profile:
+            response = await self.get_response(request)
+        return self.report(request, response, profile)
+
+    def report(self, request, response, profile):
+        request.sql_profile = profile
+        if settings.SQL_PROFILER_SERVER_TIMING:
+            response['Server-Timing'] = ', '.join(filter(None, (
+                response.get('Server-Timing'), profile.server_timing()
+            )))
+
+        slow_ms = settings.SQL_SLOW_QUERY_MS
+        if profile.count and sql_logger.isEnabledFor(logging.WARNING):
+            slowest = [
+                (duration, sql) for duration, sql in profile.slowest
+                if duration * 1000 >= slow_ms
+            ]
+            if slowest:
+                sql_logger.warning(
+                    'Медленные SQL запросы для %s %s: %d',
+                    request.method, request.path, len(slowest),
+                    extra={
+                        'route': get_route(request),
+                        'db_queries': profile.count,
+                        'db_ms': round(profile.duration * 1000, 2),
+                        'slowest': [
+                            {'ms': round(duration * 1000, 2), 'sql': sql}
+                            for duration, sql in slowest
+                        ],
+                    }
+                )
+        self.report_repeated(request, profile)
         return response
+
+    @staticmethod
+    def report_repeated(request, profile):
+        """Логирует или выбрасывает повторяющиеся запросы (N+1)"""
+        repeated = profile.repeated
+        if not repeated:
+            return
+        if settings.SQL_REPEATED_QUERY_RAISE:
+            raise RepeatedQueriesError(
+                f'{request.method} {request.path}: ' + '; '.join(
+                    f'{count}x {sql} ({site})'
+                    for sql, count, site in repeated
+                )
+            )
+        sql_logger.warning(
+            'Повторяющиеся SQL запросы (N+1) для %s %s: %d',
+            request.method, request.path, len(repeated),
+            extra={
+                'route': get_route(request),
+                'db_queries': profile.count,
+                'repeated': [
+                    {'count': count, 'sql': sql, 'site': site}
+                    for sql, count, site in repeated
+                ],
+            }
+        )
@@ -1,13 +1,27 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+
 class InvalidTokenFixMiddleware:
     """
     Middleware для исправления проблемы с невалидными токенами от фронтенда.
     Удаляет заголовки типа "Token null", "Token undefined" и т.п.
     """
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        self.fix_authorization(request)
+        # Под ASGI get_response возвращает корутину, ее ожидает
+        # вызывающий middleware
+        return self.get_response(request)
+
+    @staticmethod
+    def fix_authorization(request):
         # Исправляем проблему с невалидными токенами из фронтенда
         auth_header = request.META.get('HTTP_AUTHORIZATION', '')
 
@@ -17,6 +31,3 @@ class InvalidTokenFixMiddleware:
             token_value = auth_header.split(' ', 1)[1].strip().lower()
             if token_value in invalid_tokens:
                 del request.META['HTTP_AUTHORIZATION']
-
-        response = self.get_response(request)
-        return response
@@ -1,18 +1,164 @@
+import base64
+import json
+from functools import partial, reduce
+from operator import or_
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .counting import CountStrategyPaginator
 
 
 class CustomPageNumberPagination(PageNumberPagination):
-    """Кастомный пагинатор с поддержкой параметра limit."""
+    """
+    Кастомный пагинатор с поддержкой параметра limit.
+
+    Общее количество записей считается стратегией из атрибута view
+    count_strategy (см. api.counting), по умолчанию - точным COUNT.
+
+    Если у view задан cursor_ordering, доступен режим keyset-пагинации:
+    он включается параметром cursor (для первой страницы - пустым).
+    Страница выбирается условием по значениям полей cursor_ordering
+    последней записи, а не OFFSET, и COUNT не выполняется; формат
+    ответа тот же, count в этом режиме равен null.
+    """
     page_size = 6
     page_size_query_param = 'limit'
     max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = False
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering and self.cursor_query_param in request.query_params:
+            self.cursor_mode = True
+            return self.paginate_queryset_by_cursor(
+                queryset, request, ordering
+            )
+        # Способ подсчета count задается во view (см. api.counting)
+        self.django_paginator_class = partial(
+            CountStrategyPaginator,
+            count_strategy=getattr(view, 'count_strategy', None)
+        )
+        return super().paginate_queryset(queryset, request, view)
 
     def get_paginated_response(self, data):
         """Переопределение формата ответа для соответствия требованиям."""
+        if self.cursor_mode:
+            return Response({
+                'count': None,
+                'next': self.get_next_cursor_link(),
+                'previous': self.get_previous_cursor_link(),
+                'results': data
+            })
         return Response({
             'count': self.page.paginator.count,
             'next': self.get_next_link(),
             'previous': self.get_previous_link(),
             'results': data
         })
+
+    def paginate_queryset_by_cursor(self, queryset, request, ordering):
+        """Возвращает страницу после (или до) позиции из курсора."""
+        self.request = request
+        self.ordering = tuple(ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(
+            request.query_params[self.cursor_query_param], queryset.model
+        )
+
+        # Для предыдущей страницы идем в обратном порядке
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self._invert(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self._after_position_filter(ordering, position)
+            )
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        page = rows[:page_size]
+        if reverse:
+            page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page_items = page
+        return page
+
+    def get_next_cursor_link(self):
+        if not self.has_next or not self.page_items:
+            return None
+        return self._cursor_link(self.page_items[-1], reverse=False)
+
+    def get_previous_cursor_link(self):
+        if not self.has_previous or not self.page_items:
+            return None
+        return self._cursor_link(self.page_items[0], reverse=True)
+
+    def _cursor_link(self, instance, reverse):
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param,
+            self.encode_cursor(instance, reverse)
+        )
+
+    def encode_cursor(self, instance, reverse):
+        """Кодирует значения полей сортировки записи в курсор."""
+        values = [
+            instance._meta.get_field(field).value_to_string(instance)
+            for field in self.fields
+        ]
+        payload = json.dumps({'p': values, 'r': reverse})
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, cursor, model):
+        """Возвращает (позиция, направление) из курсора; пустой - начало."""
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            values = payload['p']
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+            return position, bool(payload.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _after_position_filter(ordering, position):
+        """
+        Условие "строго после позиции" для составного ключа:
+        (a > x) OR (a = x AND b > y) OR ... с учетом направления полей.
+        """
+        conditions = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {
+                previous.lstrip('-'): value
+                for previous, value in zip(ordering[:index], position)
+            }
+            conditions.append(
+                Q(**equal, **{f'{name}__{lookup}': position[index]})
+            )
+        return reduce(or_, conditions)
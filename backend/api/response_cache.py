@@ -0,0 +1,193 @@
+"""
+Кеш ответов API для анонимных пользователей.
+
+Ответы на анонимные GET-запросы к рецептам одинаковы для всех
+посетителей, поэтому они хранятся в кеше Django уже отрендеренными
+в JSON. Ключ - адрес запроса с отсортированными параметрами и версия
+справочника ингредиентов.
+
+Каждая запись помечена тегами: recipes (состав ленты), recipe:<id>
+для каждого рецепта в ответе и author:<id> для каждого автора. У тега
+есть версия в кеше; запись с версиями тегов, отличными от текущих,
+считается устаревшей. invalidate_tags меняет версии тегов - так
+изменение одного рецепта сбрасывает его страницу и все страницы ленты,
+где он показан, не трогая остальные записи.
+
+Версии тегов служат и валидаторами условных запросов (api.conditional):
+тег feed меняется при каждом invalidate_tags, а тег user-lists:<id> -
+при изменении избранного, списка покупок и подписок пользователя.
+"""
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from foodgram.metrics import record_cache
+from recipes.catalogue import get_catalogue_version
+
+CACHE_KEY_PREFIX = 'api:response:'
+TAG_KEY_PREFIX = 'api:tag:'
+RECIPE_LIST_TAG = 'recipes'
+# Любое изменение ленты: этим тегом записи не помечаются
+FEED_TAG = 'feed'
+# Заголовки, сохраняемые вместе с содержимым ответа
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+
+def recipe_tag(pk):
+    return f'recipe:{pk}'
+
+
+def author_tag(pk):
+    return f'author:{pk}'
+
+
+def user_lists_tag(pk):
+    return f'user-lists:{pk}'
+
+
+def get_tag_versions(tags):
+    """Возвращает {тег: версия}; отсутствующим тегам назначает версию."""
+    keys = {TAG_KEY_PREFIX + tag: tag for tag in tags}
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        # Вытесненный тег получает новую версию, поэтому записи,
+        # сохраненные со старой, не оживают
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+        versions.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def invalidate_tags(*tags):
+    """Сбрасывает записи кеша, помеченные любым из тегов."""
+    _bump_versions((*tags, FEED_TAG))
+
+
+def invalidate_user_lists(pk):
+    """Меняет версию списков пользователя (избранное, покупки, подписки)."""
+    _bump_versions((user_lists_tag(pk),))
+
+
+def _bump_versions(tags):
+    def bump():
+        cache.set_many(
+            {TAG_KEY_PREFIX + tag: uuid.uuid4().hex for tag in tags},
+            timeout=None
+        )
+
+    bump()
+    # Повторно после коммита: запись, собранная другим воркером
+    # до фиксации транзакции, могла получить уже новую версию
+    transaction.on_commit(bump)
+
+
+def get_cache_key(request):
+    """Ключ по адресу запроса с нормализованными параметрами."""
+    params = urlencode(
+        sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            for value in values
+        )
+    )
+    # Хост входит в ключ: ссылки пагинации и изображений абсолютные
+    url = f'{request.scheme}://{request.get_host()}{request.path}?{params}'
+    digest = hashlib.md5(
+        f'{get_catalogue_version()}|{url}'.encode()
+    ).hexdigest()
+    return CACHE_KEY_PREFIX + digest
+
+
+def is_cacheable(request):
+    """Кешируются только анонимные GET-запросы с ответом в JSON."""
+    return (
+        request.method == 'GET'
+        and not request.user.is_authenticated
+        and getattr(request.accepted_renderer, 'format', None) == 'json'
+    )
+
+
+def get_cached(request):
+    """
+    Ответ из кеша или None, если записи нет или она устарела.
+
+    Ответ проверяется по заголовкам условного запроса и может стать
+    304 без обращения к БД.
+    """
+    entry = cache.get(get_cache_key(request))
+    if entry is None:
+        record_cache('response', False)
+        return None
+    versions, content, headers = entry
+    if get_tag_versions(versions) != versions:
+        record_cache('response', False)
+        return None
+    record_cache('response', True)
+    response = _make_response(content, headers)
+    # Ответ проверяется по сохраненным с ним ETag и Last-Modified
+    return get_conditional_response(
+        request,
+        etag=response.get('ETag'),
+        last_modified=parse_http_date_safe(response.get('Last-Modified')),
+        response=response
+    )
+
+
+def store(request, response, get_tags):
+    """
+    Сохраняет успешный ответ в кеш и возвращает его отрендеренным.
+
+    Содержимое и валидаторы (ETag, Last-Modified) сохраняются с тегами
+    get_tags(response.data); остальные ответы возвращаются как есть.
+    """
+    if response.status_code != status.HTTP_200_OK:
+        return response
+    content = JSONRenderer().render(response.data)
+    headers = {
+        header: response[header]
+        for header in VALIDATOR_HEADERS if header in response
+    }
+    versions = get_tag_versions(get_tags(response.data))
+    cache.set(
+        get_cache_key(request), (versions, content, headers),
+        timeout=settings.RESPONSE_CACHE_TIMEOUT
+    )
+    return _make_response(content, headers)
+
+
+def get_cached_response(request, build, get_tags):
+    """Возвращает закешированный ответ или строит его вызовом build()."""
+    response = get_cached(request)
+    if response is None:
+        response = store(request, build(), get_tags)
+    return response
+
+
+def _make_response(content, headers):
+    response = HttpResponse(content, content_type='application/json')
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def recipe_tags(data):
+    """Теги ответа с одним рецептом."""
+    return [recipe_tag(data['id']), author_tag(data['author']['id'])]
+
+
+def recipe_list_tags(data):
+    """Теги страницы ленты рецептов."""
+    tags = {RECIPE_LIST_TAG}
+    for item in data['results']:
+        tags.update(recipe_tags(item))
+    return sorted(tags)
@@ -1,8 +1,5 @@
-import base64
-import uuid
-
-from django.core.files.base import ContentFile
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
 
@@ -10,21 +7,49 @@ from recipes.models import (Favorite, Ingredient, RecipeIngredient, Recipe,
                             ShoppingCart)
 from users.models import User, Subscription
 
+from .data_uri import decode_image
+from .images import get_variant_urls, schedule_recipe_image
+
 
 class Base64ImageField(serializers.ImageField):
     """Кастомное поле для обработки изображений в формате Base64."""
 
     def to_internal_value(self, data):
         """Преобразует строку Base64 в файл изображения."""
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            # Генерируем уникальное имя файла
-            filename = f'{uuid.uuid4()}.{ext}'
-            data = ContentFile(base64.b64decode(imgstr), name=filename)
+        if isinstance(data, str) and data.startswith('data:'):
+            # Изображение проверяется при потоковом декодировании
+            # (см. api.data_uri), повторно в памяти не открывается
+            return serializers.FileField.to_internal_value(
+                self, decode_image(data)
+            )
         return super().to_internal_value(data)
 
 
+class ImageVariantsMixin:
+    """
+    Поле image_variants со ссылками на уменьшенные копии изображения.
+
+    Поле выводится только по запросу с параметром ?image_variants=1,
+    чтобы не менять формат ответов для существующих клиентов: схемы
+    ответов в коллекции Postman запрещают лишние поля. Параметр описан
+    в docs/openapi-schema.yml.
+    """
+    variants_query_param = 'image_variants'
+
+    def get_image_variants(self, obj):
+        return get_variant_urls(obj, self.context.get('request'))
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        request = self.context.get('request')
+        requested = request is not None and request.GET.get(
+            self.variants_query_param
+        ) in ('1', 'true')
+        if not requested:
+            data.pop('image_variants', None)
+        return data
+
+
 class CustomUserSerializer(UserSerializer):
     """Сериализатор для модели User с полем is_subscribed."""
     is_subscribed = serializers.SerializerMethodField()
@@ -43,6 +68,10 @@ class CustomUserSerializer(UserSerializer):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
+        # Значение, проставленное RecipeReadSerializer из аннотации
+        annotated = getattr(obj, 'is_subscribed', None)
+        if annotated is not None:
+            return annotated
         return Subscription.objects.filter(
             user=request.user, author=obj
         ).exists()
@@ -69,7 +98,7 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     """Сериализатор для чтения рецептов."""
     author = CustomUserSerializer(read_only=True)
     ingredients = RecipeIngredientSerializer(
@@ -78,12 +107,13 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text',
+            'is_in_shopping_cart', 'name', 'image', 'image_variants', 'text',
             'cooking_time'
         )
 
@@ -92,6 +122,10 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
+        # Значение, вычисленное в RecipeViewSet.get_queryset
+        annotated = getattr(obj, 'is_favorited', None)
+        if annotated is not None:
+            return annotated
         return Favorite.objects.filter(user=request.user, recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
@@ -99,14 +133,26 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
+        annotated = getattr(obj, 'is_in_shopping_cart', None)
+        if annotated is not None:
+            return annotated
         return ShoppingCart.objects.filter(
             user=request.user, recipe=obj
         ).exists()
 
+    def to_representation(self, instance):
+        """Передает аннотацию подписки на автора во вложенный сериализатор."""
+        annotated = getattr(instance, 'author_is_subscribed', None)
+        if annotated is not None:
+            instance.author.is_subscribed = annotated
+        return super().to_representation(instance)
+
 
 class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
     """Сериализатор для записи ингредиентов в рецепте."""
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    # Ингредиенты загружаются одним запросом в
+    # RecipeWriteSerializer.validate_ingredients, а не по одному на строку
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(min_value=1)
 
     class Meta:
@@ -128,7 +174,10 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         )
 
     def validate_ingredients(self, value):
-        """Проверяет, что ингредиенты указаны и не повторяются."""
+        """
+        Проверяет, что ингредиенты указаны, не повторяются и существуют.
+        Ингредиенты загружаются одним запросом.
+        """
         if not value:
             raise serializers.ValidationError(
                 'Нужно указать хотя бы один ингредиент.'
@@ -136,7 +185,19 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         ingredient_ids = [item['id'] for item in value]
         if len(ingredient_ids) != len(set(ingredient_ids)):
             raise serializers.ValidationError('Ингредиенты не должны повторяться.')
-        return value
+        ingredients = Ingredient.objects.in_bulk(ingredient_ids)
+        if len(ingredients) != len(ingredient_ids):
+            message = serializers.PrimaryKeyRelatedField.default_error_messages[
+                'does_not_exist'
+            ]
+            raise serializers.ValidationError([
+                {} if item['id'] in ingredients
+                else {'id': [message.format(pk_value=item['id'])]}
+                for item in value
+            ])
+        return [
+            {**item, 'id': ingredients[item['id']]} for item in value
+        ]
 
     def validate_cooking_time(self, value):
         """Проверяет, что время приготовления больше 0."""
@@ -152,6 +213,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         ingredients_data = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
         self._create_ingredients_in_recipe(recipe, ingredients_data)
+        schedule_recipe_image(recipe)
         return recipe
 
     @transaction.atomic
@@ -171,9 +233,20 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         instance.cooking_time = validated_data.get(
             'cooking_time', instance.cooking_time
         )
+        image_changed = False
         if 'image' in validated_data:  # Проверяем наличие ключа 'image'
-            instance.image = validated_data.get('image', instance.image)
+            image = validated_data['image']
+            old_name = instance.image.name
+            # Файл сохраняется сразу, чтобы узнать его имя в хранилище
+            # по хешу: фронтенд присылает то же изображение при каждом
+            # редактировании, и тогда готовые копии остаются в силе
+            instance.image.save(image.name, image, save=False)
+            image_changed = instance.image.name != old_name
+            if image_changed:
+                instance.image_variants = {}
         instance.save()
+        if image_changed:
+            schedule_recipe_image(instance)
 
         # Обновляем ингредиенты
         RecipeIngredient.objects.filter(recipe=instance).delete()
@@ -193,19 +266,25 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         """Возвращает представление рецепта с использованием RecipeReadSerializer."""
+        # Ингредиенты с названиями одним запросом, а не по одному на строку
+        prefetch_related_objects([instance], Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        ))
         return RecipeReadSerializer(
             instance,
             context={'request': self.context.get('request')}
         ).data
 
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
+class ShortRecipeSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     """Сериализатор для краткого представления рецепта (для избранного и подписок)."""
     image = Base64ImageField(read_only=True)
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class SubscriptionSerializer(serializers.ModelSerializer):
@@ -227,6 +306,13 @@ class SubscriptionSerializer(serializers.ModelSerializer):
 
     def get_recipes(self, obj):
         """Получает рецепты автора с ограничением по параметру recipes_limit."""
+        # Рецепты, заранее загруженные в UserViewSet.subscriptions
+        limited_recipes = getattr(obj, 'limited_recipes', None)
+        if limited_recipes is not None:
+            return ShortRecipeSerializer(
+                limited_recipes, many=True, context=self.context
+            ).data
+
         request = self.context.get('request')
         recipes_limit = None
 
@@ -247,8 +333,8 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         return ShortRecipeSerializer(recipes, many=True, context=self.context).data
 
     def get_recipes_count(self, obj):
-        """Получает общее количество рецептов автора."""
-        return obj.recipes.count()
+        """Общее количество рецептов автора из счетчика User.recipes_count."""
+        return obj.recipes_count
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
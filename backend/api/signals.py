@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+from .counting import invalidate_counts
+from .response_cache import (
+    RECIPE_LIST_TAG, author_tag, invalidate_tags, invalidate_user_lists,
+    recipe_tag
+)
+from .sql_profiler import install
+
+# Поля пользователя, не входящие в ответы API
+_HIDDEN_USER_FIELDS = frozenset(('last_login', 'password'))
+
+
+@receiver((post_save, post_delete), sender=get_user_model())
+def invalidate_author_responses(sender, instance, signal, created=False,
+                                update_fields=None, **kwargs):
+    """
+    Сбрасывает кеш ответов с рецептами пользователя (аватар, профиль),
+    а при создании и удалении - и count списка пользователей.
+    """
+    if created or signal is post_delete:
+        invalidate_counts()
+    if update_fields and set(update_fields) <= _HIDDEN_USER_FIELDS:
+        return
+    invalidate_tags(author_tag(instance.pk))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def invalidate_recipe_responses(sender, instance, signal, created=False,
+                                **kwargs):
+    """
+    Сбрасывает кеш ответов с рецептом и меняет ETag ленты при
+    изменениях в обход API (админка, команды).
+    """
+    if created or signal is post_delete:
+        invalidate_tags(recipe_tag(instance.pk), RECIPE_LIST_TAG)
+        invalidate_counts()
+    else:
+        invalidate_tags(recipe_tag(instance.pk))
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Subscription)
+def invalidate_user_lists_version(sender, instance, **kwargs):
+    """
+    Меняет ETag ответов пользователя с флагами избранного и подписок и
+    сбрасывает count отфильтрованной по этим спискам ленты и подписок.
+    """
+    invalidate_user_lists(instance.user_id)
+    invalidate_counts()
+
+
+@receiver(connection_created)
+def install_query_profiler(sender, connection, **kwargs):
+    """Подключает профилировщик SQL к новому соединению (в любом потоке)."""
+    install(connection)
@@ -0,0 +1,164 @@
+"""
+Профилирование SQL-запросов без DEBUG.
+
+QueryProfile подключается к соединениям через connection.execute_wrapper
+и считает запросы и суммарное время в БД, а также хранит
+SQL_PROFILER_TOP_N самых медленных запросов в виде отпечатков: литералы
+и параметры заменены на ?, списки IN (...) и VALUES свернуты. Память не
+зависит от числа запросов: хранятся только счетчики и N отпечатков.
+
+Детектор N+1 считает выполнения каждого отпечатка: когда отпечаток
+повторяется SQL_REPEATED_QUERY_THRESHOLD раз, запоминается место
+вызова - ближайшие кадры стека из кода проекта (например,
+api/serializers.py:73 in get_is_subscribed < api/views.py:120 in list).
+
+Соединения Django привязаны к потоку, а ORM под ASGI работает в потоках
+sync_to_async. Поэтому обертка ставится на каждое соединение при его
+открытии (сигнал connection_created, см. api.signals), а текущий
+профиль берется из ContextVar, который sync_to_async копирует в поток.
+"""
+import heapq
+import os
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+
+_profile = ContextVar('sql_profile', default=None)
+
+_PROJECT_DIR = str(settings.BASE_DIR) + os.sep
+
+_NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'%s|\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """Отпечаток запроса: одинаков для запросов с разными параметрами."""
+    for pattern, replacement in _NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()[:settings.SQL_PROFILER_MAX_SQL_LENGTH]
+
+
+class RepeatedQueriesError(Exception):
+    """Запрос выполняется для каждой строки (N+1)."""
+
+
+def call_site(depth=3):
+    """
+    Место вызова запроса: до depth ближайших кадров стека из кода
+    проекта, от внутреннего к внешнему.
+    """
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < depth:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(_PROJECT_DIR)
+            and filename != __file__
+            and 'site-packages' not in filename
+        ):
+            frames.append(
+                f'{os.path.relpath(filename, _PROJECT_DIR)}:'
+                f'{frame.f_lineno} in {frame.f_code.co_name}'
+            )
+        frame = frame.f_back
+    return ' < '.join(frames) or None
+
+
+class QueryProfile:
+    """Статистика запросов к БД за один HTTP-запрос."""
+
+    def __init__(self, top_n=None, repeat_threshold=None):
+        self.top_n = settings.SQL_PROFILER_TOP_N if top_n is None else top_n
+        self.repeat_threshold = (
+            settings.SQL_REPEATED_QUERY_THRESHOLD
+            if repeat_threshold is None else repeat_threshold
+        )
+        self.count = 0
+        self.duration = 0.0
+        self._slowest = []
+        self._executions = Counter()
+        self._call_sites = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.perf_counter() - started)
+
+    def record(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, (duration, self.count, sql))
+        elif self._slowest and duration > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (duration, self.count, sql))
+        if self.repeat_threshold:
+            key = fingerprint(sql)
+            self._executions[key] += 1
+            if self._executions[key] == self.repeat_threshold:
+                self._call_sites[key] = call_site()
+
+    @property
+    def repeated(self):
+        """[(отпечаток, число выполнений, место вызова)] повторов N+1."""
+        return sorted(
+            (
+                (key, self._executions[key], site)
+                for key, site in self._call_sites.items()
+            ),
+            key=lambda item: item[1], reverse=True
+        )
+
+    @property
+    def slowest(self):
+        """[(секунды, отпечаток)] от самого медленного."""
+        return [
+            (duration, fingerprint(sql))
+            for duration, _, sql in sorted(self._slowest, reverse=True)
+        ]
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing."""
+        return (
+            f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries"'
+        )
+
+
+def _execute(execute, sql, params, many, context):
+    profile = _profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+
+def install(connection):
+    """Ставит обертку профилировщика на соединение (один раз)."""
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _execute)
+
+
+@contextmanager
+def profile_queries(profile=None):
+    """Собирает в QueryProfile запросы текущего контекста."""
+    profile = QueryProfile() if profile is None else profile
+    for connection in connections.all(initialized_only=True):
+        install(connection)
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
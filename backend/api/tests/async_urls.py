@@ -0,0 +1,10 @@
+"""URLconf тестов асинхронных представлений (ASYNC_READ_VIEWS = True)."""
+from django.urls import include, path
+
+from api import urls
+
+urlpatterns = [
+    path('api/', include(
+        (urls.async_urlpatterns + urls.urlpatterns, 'api'), namespace='api'
+    )),
+]
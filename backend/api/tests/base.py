@@ -1,13 +1,27 @@
 """
-Базовые классы для тестирования API.
+Базовые классы и общие функции для тестирования API.
 """
+import base64
+import io
+
 import pytest
 from django.contrib.auth import get_user_model
+from PIL import Image
 from rest_framework.test import APIClient
 
 User = get_user_model()
 
 
+def image_data_uri(width=800, height=400):
+    """Изображение PNG в формате data URI."""
+    img = Image.new('RGB', (width, height), color='green')
+    img_io = io.BytesIO()
+    img.save(img_io, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        img_io.getvalue()
+    ).decode()
+
+
 class BaseAPITestCase:
     """
     Базовый класс для тестов API с общими методами.
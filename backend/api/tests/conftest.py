@@ -0,0 +1,11 @@
+"""Общие фикстуры тестов API."""
+import pytest
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    """Временный каталог медиафайлов и обработка без пула потоков."""
+    settings.MEDIA_ROOT = tmp_path
+    settings.IMAGE_PIPELINE_WORKERS = 0
+    settings.IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+    return tmp_path
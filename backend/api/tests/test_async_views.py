@@ -0,0 +1,164 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.urls import resolve
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from api import async_views
+from api.tests.base import image_data_uri
+from recipes.models import Favorite, Ingredient
+from users.models import Subscription
+
+ASYNC_URLCONF = 'api.tests.async_urls'
+
+
+@pytest.fixture
+def token_client(user):
+    """Клиент с настоящим токеном: его проверяет асинхронный путь."""
+    client = APIClient()
+    token = Token.objects.create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def get_both(settings, monkeypatch, client, path, **params):
+    """
+    Ответы синхронного ViewSet и асинхронного представления.
+
+    Во время второго запроса ViewSet недоступен: ответ должен быть
+    построен асинхронным путем без отката.
+    """
+    settings.ROOT_URLCONF = 'foodgram.urls'
+    cache.clear()
+    sync = client.get(path, params)
+
+    settings.ROOT_URLCONF = ASYNC_URLCONF
+    cache.clear()
+    with monkeypatch.context() as patch:
+        patch.setattr(APIView, 'dispatch', None)
+        async_ = client.get(path, params)
+    return sync, async_
+
+
+@pytest.mark.django_db
+class TestAsyncReadViews:
+    """Асинхронные представления отдают те же ответы, что и ViewSet."""
+
+    @pytest.mark.urls(ASYNC_URLCONF)
+    def test_routes(self):
+        """Маршруты чтения ведут на асинхронные представления."""
+        assert resolve('/api/recipes/').func.__name__ == 'recipe_list'
+        assert resolve('/api/recipes/1/').func.__name__ == 'recipe_detail'
+        assert resolve('/api/ingredients/').func.__name__ == (
+            'ingredient_list'
+        )
+        assert resolve('/api/users/1/').func.__name__ == 'user_detail'
+        # Действия ViewSet не перехватываются
+        assert resolve('/api/users/me/').func.__name__ != 'user_detail'
+
+    @pytest.mark.parametrize('params', [
+        {}, {'limit': 1}, {'page': 2, 'limit': 1}, {'cursor': ''},
+        {'is_favorited': 1}, {'author': 'abc'},
+    ])
+    def test_recipe_list(self, settings, monkeypatch, token_client, recipe,
+                         user, user_with_recipes, params):
+        """Лента с фильтрами и пагинацией для анонима и пользователя."""
+        Favorite.objects.create(user=user, recipe=recipe)
+        for client in (APIClient(), token_client):
+            sync, async_ = get_both(
+                settings, monkeypatch, client, '/api/recipes/', **params
+            )
+            assert sync.status_code == async_.status_code == 200
+            assert sync.json() == async_.json()
+            assert 'ETag' in async_
+
+    def test_recipe_detail(self, settings, monkeypatch, token_client,
+                           recipe, user):
+        """Рецепт с флагом подписки на автора."""
+        Subscription.objects.create(user=user, author=recipe.author)
+        for client in (APIClient(), token_client):
+            sync, async_ = get_both(
+                settings, monkeypatch, client, f'/api/recipes/{recipe.id}/'
+            )
+            assert sync.status_code == async_.status_code == 200
+            assert sync.json() == async_.json()
+
+    def test_ingredient_search(self, settings, monkeypatch):
+        """Весь справочник и результаты поиска."""
+        Ingredient.objects.create(name='Сахар', measurement_unit='г')
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        for params in ({}, {'name': 'са'}, {'name': 'са', 'limit': 1}):
+            sync, async_ = get_both(
+                settings, monkeypatch, APIClient(), '/api/ingredients/', **params
+            )
+            assert sync.json() == async_.json()
+
+    def test_user_detail(self, settings, monkeypatch, token_client, user,
+                         admin_user):
+        """Профиль с флагом подписки."""
+        Subscription.objects.create(user=user, author=admin_user)
+        sync, async_ = get_both(
+            settings, monkeypatch, token_client, f'/api/users/{admin_user.id}/'
+        )
+        assert async_.json() == sync.json()
+        assert async_.json()['is_subscribed'] is True
+
+    @pytest.mark.urls(ASYNC_URLCONF)
+    def test_not_modified(self, token_client, recipe):
+        """Совпавший ETag дает 304 на асинхронном пути."""
+        url = f'/api/recipes/{recipe.id}/'
+        etag = token_client.get(url)['ETag']
+
+        response = token_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    @pytest.mark.urls(ASYNC_URLCONF)
+    def test_fallback_errors(self, recipe):
+        """Ошибки формирует синхронный ViewSet с прежними текстами."""
+        client = APIClient()
+        assert client.get('/api/recipes/999999/').json() == {
+            'detail': 'Рецепт не найден.'
+        }
+        client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        assert client.get('/api/recipes/').status_code == (
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    @pytest.mark.urls(ASYNC_URLCONF)
+    def test_fallback_methods(self, token_client, ingredient):
+        """Запись по тем же адресам обрабатывает ViewSet."""
+        response = token_client.post('/api/recipes/', {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': image_data_uri(),
+            'ingredients': [{'id': ingredient.id, 'amount': 5}],
+        }, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+
+    @pytest.mark.urls(ASYNC_URLCONF)
+    def test_browsable_api_fallback(self, recipe):
+        """Браузерный API отдает синхронный ViewSet."""
+        response = APIClient().get('/api/recipes/', HTTP_ACCEPT='text/html')
+
+        assert response['Content-Type'].startswith('text/html')
+
+    def test_authenticate(self, rf, user):
+        """Токен проверяется так же, как TokenAuthentication."""
+        token = Token.objects.create(user=user)
+        authenticate = async_to_sync(async_views.authenticate)
+
+        assert authenticate(rf.get('/')).is_anonymous
+        assert authenticate(rf.get(
+            '/', HTTP_AUTHORIZATION='Bearer abc'
+        )).is_anonymous
+        assert authenticate(rf.get(
+            '/', HTTP_AUTHORIZATION=f'Token {token.key}'
+        )) == user
+        with pytest.raises(async_views.Fallback):
+            authenticate(rf.get('/', HTTP_AUTHORIZATION='Token wrong'))
@@ -0,0 +1,131 @@
+import pytest
+from django.db import transaction
+from django.http import HttpResponse
+
+from foodgram import db_router
+from foodgram.db_router import (
+    PIN_COOKIE, PrimaryReplicaRouter, ReplicaRoutingMiddleware
+)
+from recipes.models import Recipe
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ['replica_1', 'replica_2']
+    return settings.DATABASE_REPLICAS
+
+
+def route(request, view):
+    """Выполняет view под ReplicaRoutingMiddleware, возвращает ответ."""
+    return ReplicaRoutingMiddleware(view)(request)
+
+
+def read_alias_view(request):
+    response = HttpResponse()
+    response.alias = PrimaryReplicaRouter().db_for_read(Recipe)
+    return response
+
+
+class TestReadRouting:
+    """Выбор базы для чтения."""
+
+    def test_safe_request_reads_replica(self, rf, replicas):
+        """GET читает с одной из реплик."""
+        assert route(rf.get('/'), read_alias_view).alias in replicas
+
+    @pytest.mark.parametrize('method', ['post', 'put', 'patch', 'delete'])
+    def test_unsafe_request_reads_primary(self, rf, replicas, method):
+        """Запросы с записью читают из основной базы."""
+        request = getattr(rf, method)('/')
+
+        assert route(request, read_alias_view).alias == 'default'
+
+    def test_without_replicas(self, rf):
+        """Без DB_REPLICA_HOSTS все идет в default."""
+        assert route(rf.get('/'), read_alias_view).alias == 'default'
+
+    def test_outside_request(self, replicas):
+        """Команды и фоновые задачи читают из основной базы."""
+        assert PrimaryReplicaRouter().db_for_read(Recipe) == 'default'
+
+    def test_read_after_write(self, rf, replicas):
+        """После записи запрос закреплен за основной базой."""
+        router = PrimaryReplicaRouter()
+
+        def view(request):
+            before = router.db_for_read(Recipe)
+            assert router.db_for_write(Recipe) == 'default'
+            response = HttpResponse()
+            response.aliases = (before, router.db_for_read(Recipe))
+            return response
+
+        before, after = route(rf.get('/'), view).aliases
+
+        assert before in replicas
+        assert after == 'default'
+
+    @pytest.mark.django_db
+    def test_transaction_reads_primary(self, rf, replicas):
+        """Внутри транзакции чтение идет в основную базу."""
+        def view(request):
+            with transaction.atomic():
+                return read_alias_view(request)
+
+        assert route(rf.get('/'), view).alias == 'default'
+
+    def test_pin_cookie(self, rf, replicas):
+        """Клиент с cookie закрепления читает из основной базы."""
+        request = rf.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+
+        assert route(request, read_alias_view).alias == 'default'
+
+    def test_state_reset(self, rf, replicas):
+        """Состояние запроса не переживает запрос."""
+        def view(request):
+            db_router.pin_to_primary()
+            return HttpResponse()
+
+        route(rf.get('/'), view)
+
+        assert db_router._state.get() is None
+        assert not db_router.is_pinned()
+
+
+@pytest.mark.django_db
+class TestWritePaths:
+    """Пути записи закрепляют клиента за основной базой."""
+
+    def test_favorite_sets_pin_cookie(self, authenticated_client, recipe,
+                                      replicas, settings):
+        response = authenticated_client.post(
+            f'/api/recipes/{recipe.id}/favorite/'
+        )
+
+        assert response.status_code == 201
+        cookie = response.cookies[PIN_COOKIE]
+        assert cookie['max-age'] == settings.DB_REPLICA_PIN_SECONDS
+
+    def test_subscribe_sets_pin_cookie(self, authenticated_client,
+                                       admin_user, replicas):
+        response = authenticated_client.post(
+            f'/api/users/{admin_user.id}/subscribe/'
+        )
+
+        assert response.status_code == 201
+        assert PIN_COOKIE in response.cookies
+
+    def test_pinned_without_write(self, authenticated_client, replicas):
+        """Ответ с ошибкой до записи тоже закреплен: чтения шли в default."""
+        response = authenticated_client.post('/api/recipes/999999/favorite/')
+
+        assert response.status_code == 404
+        assert PIN_COOKIE in response.cookies
+
+    def test_no_cookie_without_replicas(self, authenticated_client, recipe):
+        response = authenticated_client.post(
+            f'/api/recipes/{recipe.id}/shopping_cart/'
+        )
+
+        assert response.status_code == 201
+        assert PIN_COOKIE not in response.cookies
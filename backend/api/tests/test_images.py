@@ -0,0 +1,140 @@
+import io
+
+import pytest
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from PIL import Image
+
+from api.images import build_variants, get_variant_formats, variant_name
+from api.tests.base import image_data_uri
+from recipes.models import Recipe
+
+
+@pytest.mark.django_db
+class TestImagePipeline:
+    """Тесты фоновой обработки изображений рецептов."""
+
+    def _create_recipe(self, client, ingredient, image):
+        return client.post(
+            reverse('api:recipe-list'),
+            {
+                'name': 'Рецепт',
+                'text': 'Описание',
+                'cooking_time': 10,
+                'image': image,
+                'ingredients': [{'id': ingredient.id, 'amount': 5}],
+            },
+            format='json'
+        )
+
+    def test_variant_name(self):
+        """Копии лежат в подкаталоге variants рядом с оригиналом."""
+        assert variant_name('recipes/images/abc.png', 320, 'webp') == (
+            'recipes/images/variants/abc-320.webp'
+        )
+
+    def test_build_variants(self, media_root):
+        """Копии строятся для ширин меньше оригинала без увеличения."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 400)).save(buffer, format='PNG')
+        buffer.seek(0)
+        name = default_storage.save('recipes/images/photo.png', buffer)
+
+        variants = build_variants(name)
+
+        assert set(variants) == set(get_variant_formats())
+        for fmt, widths in variants.items():
+            assert set(widths) == {'320', '640'}
+            with default_storage.open(widths['320']) as f:
+                image = Image.open(f)
+                assert image.size == (320, 160)
+                assert image.format.lower() == fmt
+
+    def test_small_image_reencoded(self, media_root):
+        """Изображение уже всех ширин кодируется в исходном размере."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (100, 50)).save(buffer, format='PNG')
+        buffer.seek(0)
+        name = default_storage.save('recipes/images/small.png', buffer)
+
+        variants = build_variants(name)
+
+        assert variants['webp'] == {
+            '100': 'recipes/images/variants/small-100.webp'
+        }
+
+    def test_variants_after_commit(
+        self, authenticated_client, ingredient, media_root,
+        django_capture_on_commit_callbacks
+    ):
+        """Обработка запускается после коммита и заполняет рецепт."""
+        with django_capture_on_commit_callbacks(execute=True):
+            response = self._create_recipe(
+                authenticated_client, ingredient, image_data_uri()
+            )
+
+        recipe = Recipe.objects.get(pk=response.json()['id'])
+        assert set(recipe.image_variants['webp']) == {'320', '640'}
+
+    def test_variants_opt_in(
+        self, authenticated_client, ingredient, media_root,
+        django_capture_on_commit_callbacks
+    ):
+        """Ссылки на копии выводятся только по ?image_variants=1."""
+        with django_capture_on_commit_callbacks(execute=True):
+            response = self._create_recipe(
+                authenticated_client, ingredient, image_data_uri()
+            )
+        url = reverse('api:recipe-detail', kwargs={'pk': response.json()['id']})
+
+        assert 'image_variants' not in authenticated_client.get(url).json()
+        data = authenticated_client.get(url, {'image_variants': 1}).json()
+        assert data['image_variants']['webp']['320'].startswith('http://')
+        assert data['image_variants']['webp']['320'].endswith('-320.webp')
+
+    def test_update_resets_variants(
+        self, authenticated_client, ingredient, media_root
+    ):
+        """Новое изображение сбрасывает копии старого."""
+        response = self._create_recipe(
+            authenticated_client, ingredient, image_data_uri()
+        )
+        recipe = Recipe.objects.get(pk=response.json()['id'])
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image_variants={'webp': {'320': 'old.webp'}}
+        )
+
+        authenticated_client.patch(
+            reverse('api:recipe-detail', kwargs={'pk': recipe.pk}),
+            {
+                'image': image_data_uri(400, 400),
+                'ingredients': [{'id': ingredient.id, 'amount': 5}],
+            },
+            format='json'
+        )
+
+        recipe.refresh_from_db()
+        assert recipe.image_variants == {}
+
+    def test_same_image_keeps_variants(
+        self, authenticated_client, ingredient, media_root
+    ):
+        """Повторно присланное изображение не сбрасывает копии."""
+        image = image_data_uri()
+        response = self._create_recipe(authenticated_client, ingredient, image)
+        recipe = Recipe.objects.get(pk=response.json()['id'])
+        variants = {'webp': {'320': 'ready.webp'}}
+        Recipe.objects.filter(pk=recipe.pk).update(image_variants=variants)
+
+        authenticated_client.patch(
+            reverse('api:recipe-detail', kwargs={'pk': recipe.pk}),
+            {
+                'image': image,
+                'ingredients': [{'id': ingredient.id, 'amount': 5}],
+            },
+            format='json'
+        )
+
+        updated = Recipe.objects.get(pk=recipe.pk)
+        assert updated.image.name == recipe.image.name
+        assert updated.image_variants == variants
@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+from api import logging_middleware
+from foodgram.log import JsonFormatter, QueueListenerHandler
+
+
+class CollectingHandler(logging.Handler):
+    """Обработчик, сохраняющий записи в список."""
+
+    def __init__(self, name=None):
+        super().__init__()
+        self.records = []
+        if name:
+            self.set_name(name)
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def request_log():
+    """Записи логгера запросов."""
+    logger = logging.getLogger('api.middleware')
+    handler = CollectingHandler()
+    logger.addHandler(handler)
+    level = logger.level
+    logger.setLevel(logging.INFO)
+    yield handler.records
+    logger.removeHandler(handler)
+    logger.setLevel(level)
+
+
+def make_record(msg='%s %s', args=('GET', '/'), **extra):
+    record = logging.LogRecord(
+        'api.middleware', logging.INFO, __file__, 1, msg, args, None
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+class TestJsonFormatter:
+
+    def test_fields(self):
+        data = json.loads(JsonFormatter().format(
+            make_record(status=200, route='api:recipe-list')
+        ))
+
+        assert data['message'] == 'GET /'
+        assert data['level'] == 'INFO'
+        assert data['logger'] == 'api.middleware'
+        assert data['status'] == 200
+        assert data['route'] == 'api:recipe-list'
+        assert 'args' not in data
+
+    def test_exception(self):
+        try:
+            raise ValueError('ошибка')
+        except ValueError:
+            record = make_record()
+            record.exc_info = sys.exc_info()
+
+        data = json.loads(JsonFormatter().format(record))
+
+        assert 'ValueError: ошибка' in data['exception']
+
+
+class TestQueueListenerHandler:
+
+    def test_records_written_by_background_thread(self):
+        target = CollectingHandler('test_queue_target')
+        handler = QueueListenerHandler(['test_queue_target'])
+        try:
+            handler.handle(make_record())
+            handler.flush()
+        finally:
+            handler.close()
+
+        assert len(target.records) == 1
+        assert target.records[0].getMessage() == 'GET /'
+
+    def test_message_not_formatted_in_caller(self):
+        """Аргументы сообщения подставляет фоновый поток."""
+        handler = QueueListenerHandler([])
+        record = handler.prepare(make_record())
+
+        assert record.args == ('GET', '/')
+        assert record.msg == '%s %s'
+
+    def test_full_queue_drops(self):
+        """Переполненная очередь не блокирует запрос."""
+        handler = QueueListenerHandler([], queue_size=1)
+        # Фоновый поток не запущен: очередь никто не читает
+        handler._pid = os.getpid()
+
+        handler.handle(make_record())
+        handler.handle(make_record())
+
+        assert handler.dropped == 1
+        handler._pid = None
+
+
+@pytest.mark.django_db
+class TestRequestLogging:
+    """Одна запись на запрос с выборкой по маршрутам."""
+
+    def test_structured_record(self, client, request_log):
+        client.get('/api/ingredients/', {'name': 'соль'})
+
+        record, = request_log
+        assert record.route == 'api:ingredient-list'
+        assert record.status == 200
+        assert record.method == 'GET'
+        assert record.query == 'name=%D1%81%D0%BE%D0%BB%D1%8C'
+        assert record.duration_ms >= 0
+
+    def test_sampled_out(self, client, request_log, settings):
+        settings.REQUEST_LOG_SAMPLE_RATES = {'api:ingredient-list': 0}
+
+        client.get('/api/ingredients/')
+        client.get('/api/recipes/')
+
+        assert [record.route for record in request_log] == ['api:recipe-list']
+
+    def test_default_rate(self, client, request_log, settings):
+        settings.REQUEST_LOG_SAMPLE_RATE = 0
+        settings.REQUEST_LOG_SAMPLE_RATES = {'api:recipe-list': 1}
+
+        client.get('/api/ingredients/')
+        client.get('/api/recipes/')
+
+        assert [record.route for record in request_log] == ['api:recipe-list']
+
+    def test_errors_always_logged(self, client, request_log, settings):
+        settings.REQUEST_LOG_SAMPLE_RATE = 0
+
+        client.get('/api/recipes/999999/')
+
+        record, = request_log
+        assert record.levelno == logging.WARNING
+        assert record.status == 404
+
+    def test_slow_always_logged(self, client, request_log, settings):
+        settings.REQUEST_LOG_SAMPLE_RATE = 0
+        settings.REQUEST_LOG_SLOW_MS = 0
+
+        client.get('/api/ingredients/')
+
+        assert len(request_log) == 1
+
+    def test_body_not_read_above_debug(self, client, request_log,
+                                       monkeypatch):
+        """Тело запроса читается только при включенном DEBUG."""
+        debug = []
+        monkeypatch.setattr(
+            logging_middleware.logger, 'debug',
+            lambda *args, **kwargs: debug.append(args)
+        )
+        client.post('/api/auth/token/login/', {'email': 'x@example.com'})
+        assert debug == []
+
+        logging.getLogger('api.middleware').setLevel(logging.DEBUG)
+        client.post('/api/auth/token/login/', {'email': 'x@example.com'})
+        assert len(debug) == 1
@@ -0,0 +1,187 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from django.conf import settings as django_settings
+from django.db import connection
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from foodgram.metrics import get_registry
+
+
+class FakePool:
+    """Пул с фиксированной статистикой в формате psycopg_pool."""
+
+    def get_stats(self):
+        return {
+            'pool_min': 2, 'pool_max': 4, 'pool_size': 4,
+            'pool_available': 1, 'requests_waiting': 3,
+            'requests_num': 120, 'requests_queued': 10,
+            'requests_wait_ms': 250,
+        }
+
+
+@pytest.mark.django_db
+class TestDatabaseMetrics:
+    """Тесты внутреннего эндпоинта статистики соединений с БД."""
+
+    url = reverse('metrics-db')
+
+    def test_without_pool(self, client):
+        """Без пула выводятся настройки соединений."""
+        response = client.get(self.url)
+
+        assert response.status_code == 200
+        database = response.json()['databases']['default']
+        assert database['pool'] is None
+        assert 'conn_max_age' in database
+        assert response.json()['pid'] > 0
+
+    def test_pool_stats(self, client, monkeypatch):
+        """Статистика пула: занятые, ожидающие и время ожидания."""
+        monkeypatch.setattr(connection, 'pool', FakePool(), raising=False)
+
+        pool = client.get(self.url).json()['databases']['default']['pool']
+
+        assert pool['in_use'] == 3
+        assert pool['available'] == 1
+        assert pool['waiting'] == 3
+        assert pool['wait_ms'] == 250
+        assert pool['avg_wait_ms'] == 25
+        assert pool['errors'] == 0
+
+    def test_external_address_forbidden(self, client):
+        """Из внешней сети эндпоинт недоступен."""
+        response = client.get(self.url, REMOTE_ADDR='203.0.113.5')
+
+        assert response.status_code == 403
+
+    def test_allowed_networks_setting(self, client, settings):
+        """Список сетей задается настройкой."""
+        settings.METRICS_ALLOWED_NETWORKS = ['203.0.113.0/24']
+
+        assert client.get(
+            self.url, REMOTE_ADDR='203.0.113.5'
+        ).status_code == 200
+        assert client.get(self.url).status_code == 403
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.django_db
+class TestPrometheusMetrics:
+    """Тесты эндпоинта /metrics и middleware метрик."""
+
+    url = reverse('metrics')
+
+    def test_request_latency_by_route(self, client):
+        before = sample(
+            'foodgram_http_request_duration_seconds_count',
+            route='api:ingredient-list', method='GET'
+        )
+
+        client.get('/api/ingredients/')
+        response = client.get(self.url)
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain')
+        assert sample(
+            'foodgram_http_request_duration_seconds_count',
+            route='api:ingredient-list', method='GET'
+        ) == before + 1
+        assert (
+            'foodgram_http_requests_total{method="GET",'
+            'route="api:ingredient-list",status="200"}'
+        ) in response.content.decode()
+
+    def test_unmatched_route(self, client):
+        before = sample(
+            'foodgram_http_requests_total',
+            route='unmatched', method='GET', status='404'
+        )
+
+        client.get('/no-such-page/')
+
+        assert sample(
+            'foodgram_http_requests_total',
+            route='unmatched', method='GET', status='404'
+        ) == before + 1
+
+    def test_db_queries_per_request(self, client, recipe):
+        labels = {'route': 'api:recipe-detail'}
+        count = sample('foodgram_db_queries_per_request_count', **labels)
+        total = sample('foodgram_db_queries_per_request_sum', **labels)
+
+        client.get(f'/api/recipes/{recipe.id}/')
+
+        assert sample(
+            'foodgram_db_queries_per_request_count', **labels
+        ) == count + 1
+        assert sample(
+            'foodgram_db_queries_per_request_sum', **labels
+        ) > total
+        assert sample('foodgram_db_duration_seconds_count', **labels) > 0
+
+    def test_cache_hits(self, client, recipe):
+        hits = sample(
+            'foodgram_cache_requests_total', cache='response', result='hit'
+        )
+        misses = sample(
+            'foodgram_cache_requests_total', cache='response', result='miss'
+        )
+
+        client.get(f'/api/recipes/{recipe.id}/')
+        client.get(f'/api/recipes/{recipe.id}/')
+
+        assert sample(
+            'foodgram_cache_requests_total', cache='response', result='hit'
+        ) == hits + 1
+        assert sample(
+            'foodgram_cache_requests_total', cache='response', result='miss'
+        ) == misses + 1
+
+    def test_workers(self, client):
+        response = client.get(self.url).content.decode()
+
+        assert 'foodgram_workers 1.0' in response
+        # Запрос к /metrics еще обрабатывается
+        assert 'foodgram_workers_busy 1.0' in response
+        assert 'foodgram_http_requests_in_progress 1.0' in response
+        assert sample('foodgram_workers_busy') == 0
+
+    def test_external_address_forbidden(self, client):
+        response = client.get(self.url, REMOTE_ADDR='203.0.113.5')
+
+        assert response.status_code == 403
+
+
+def test_multiprocess_aggregation(tmp_path, monkeypatch):
+    """Значения воркеров из файлов PROMETHEUS_MULTIPROC_DIR суммируются."""
+    code = (
+        'import django; django.setup(); '
+        'from foodgram.metrics import record_cache; '
+        'record_cache("response", True)'
+    )
+    env = {
+        **os.environ,
+        'PROMETHEUS_MULTIPROC_DIR': str(tmp_path),
+        'DJANGO_SETTINGS_MODULE': 'foodgram.settings',
+    }
+    for _ in range(2):
+        subprocess.run(
+            [sys.executable, '-c', code], env=env, check=True,
+            cwd=django_settings.BASE_DIR
+        )
+
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+    registry = get_registry()
+
+    assert registry is not REGISTRY
+    assert registry.get_sample_value(
+        'foodgram_cache_requests_total', {'cache': 'response', 'result': 'hit'}
+    ) == 2
+    assert registry.get_sample_value('foodgram_workers') == 2
@@ -0,0 +1,262 @@
+"""
+Бюджеты SQL запросов для действий ViewSet.
+
+QUERY_BUDGETS задает максимальное число запросов к БД для каждого
+действия API. Запросы выполняются на данных, где у каждой связи
+несколько строк (SIZE больше порога детектора N+1), с холодным кешем.
+Запрос, выполняемый для каждой строки, превышает бюджет или вызывает
+RepeatedQueriesError (SQL_REPEATED_QUERY_RAISE включен в conftest).
+Новое действие ViewSet без бюджета - ошибка теста.
+"""
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from api.tests.base import image_data_uri
+from api.urls import router
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+QUERY_BUDGETS = {
+    'IngredientViewSet.list': 2,
+    'IngredientViewSet.retrieve': 1,
+    'RecipeViewSet.list': 3,
+    'RecipeViewSet.retrieve': 4,
+    'RecipeViewSet.create': 10,
+    'RecipeViewSet.update': 10,
+    'RecipeViewSet.partial_update': 10,
+    'RecipeViewSet.destroy': 11,
+    'RecipeViewSet.favorite': 4,
+    'RecipeViewSet.shopping_cart': 4,
+    'RecipeViewSet.download_shopping_cart': 1,
+    'RecipeViewSet.get_link': 1,
+    'UserViewSet.list': 2,
+    'UserViewSet.retrieve': 4,
+    'UserViewSet.create': 5,
+    'UserViewSet.update': 6,
+    'UserViewSet.partial_update': 4,
+    'UserViewSet.destroy': 24,
+    'UserViewSet.me': 2,
+    'UserViewSet.avatar': 2,
+    'UserViewSet.set_password': 2,
+    'UserViewSet.subscribe': 6,
+    'UserViewSet.subscriptions': 3,
+}
+
+# Строк в каждой связи: больше порога детектора N+1
+SIZE = 8
+
+
+@pytest.fixture
+def catalogue(user):
+    """Авторы с рецептами; пользователь подписан на всех, рецепты в
+    избранном и в списке покупок."""
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'Ингредиент {i}', measurement_unit='г')
+        for i in range(SIZE)
+    )
+    authors = User.objects.bulk_create(
+        User(
+            username=f'author{i}', email=f'author{i}@example.com',
+            first_name='Автор', last_name=str(i)
+        )
+        for i in range(SIZE)
+    )
+    recipes = []
+    for author in [user, *authors]:
+        for i in range(2):
+            recipes.append(Recipe.objects.create(
+                name=f'Рецепт {author.username} {i}', text='Описание',
+                cooking_time=10, image='test_image.jpg', author=author
+            ))
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+        for recipe in recipes for ingredient in ingredients
+    )
+    Subscription.objects.bulk_create(
+        Subscription(user=user, author=author) for author in authors
+    )
+    for model in (Favorite, ShoppingCart):
+        model.objects.bulk_create(
+            model(user=user, recipe=recipe) for recipe in recipes
+        )
+    return {
+        'author': authors[0],
+        'recipe': recipes[0],
+        'foreign_recipe': recipes[-1],
+        'ingredient': ingredients[0],
+        'ingredients': ingredients,
+    }
+
+
+def recipe_payload(ingredients):
+    return {
+        'name': 'Новый рецепт',
+        'text': 'Описание',
+        'cooking_time': 5,
+        'image': image_data_uri(16, 16),
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 5} for ingredient in ingredients
+        ],
+    }
+
+
+def scenario(action, data, user):
+    """Запросы (метод, путь, тело), выполняющие действие."""
+    recipe = data['recipe']
+    author = data['author']
+    foreign = data['foreign_recipe']
+    fresh_author = User.objects.create(
+        username='fresh', email='fresh@example.com'
+    )
+    fresh_recipe = Recipe.objects.create(
+        name='Свежий', text='Описание', cooking_time=1,
+        image='test_image.jpg', author=fresh_author
+    )
+    return {
+        'IngredientViewSet.list': [
+            ('get', '/api/ingredients/', None),
+            ('get', '/api/ingredients/?name=Ингр', None),
+        ],
+        'IngredientViewSet.retrieve': [
+            ('get', f'/api/ingredients/{data["ingredient"].id}/', None),
+        ],
+        'RecipeViewSet.list': [
+            ('get', '/api/recipes/?limit=100', None),
+            ('get', '/api/recipes/?is_favorited=1&limit=100', None),
+            ('get', '/api/recipes/?is_in_shopping_cart=1&limit=100', None),
+            ('get', f'/api/recipes/?author={author.id}', None),
+        ],
+        'RecipeViewSet.retrieve': [
+            ('get', f'/api/recipes/{recipe.id}/', None),
+        ],
+        'RecipeViewSet.create': [
+            ('post', '/api/recipes/', recipe_payload(data['ingredients'])),
+        ],
+        'RecipeViewSet.update': [
+            (
+                'put', f'/api/recipes/{recipe.id}/',
+                recipe_payload(data['ingredients'][::-1])
+            ),
+        ],
+        'RecipeViewSet.partial_update': [
+            (
+                'patch', f'/api/recipes/{recipe.id}/',
+                recipe_payload(data['ingredients'][:2])
+            ),
+        ],
+        'RecipeViewSet.destroy': [
+            ('delete', f'/api/recipes/{recipe.id}/', None),
+        ],
+        'RecipeViewSet.favorite': [
+            ('post', f'/api/recipes/{fresh_recipe.id}/favorite/', None),
+            ('delete', f'/api/recipes/{fresh_recipe.id}/favorite/', None),
+        ],
+        'RecipeViewSet.shopping_cart': [
+            ('post', f'/api/recipes/{fresh_recipe.id}/shopping_cart/', None),
+            (
+                'delete', f'/api/recipes/{fresh_recipe.id}/shopping_cart/',
+                None
+            ),
+        ],
+        'RecipeViewSet.download_shopping_cart': [
+            ('get', '/api/recipes/download_shopping_cart/', None),
+            ('get', '/api/recipes/download_shopping_cart/?format=csv', None),
+        ],
+        'RecipeViewSet.get_link': [
+            ('get', f'/api/recipes/{foreign.id}/get-link/', None),
+        ],
+        'UserViewSet.list': [
+            ('get', '/api/users/?limit=100', None),
+        ],
+        'UserViewSet.retrieve': [
+            ('get', f'/api/users/{author.id}/', None),
+        ],
+        'UserViewSet.create': [
+            ('post', '/api/users/', {
+                'email': 'new@example.com', 'username': 'newuser',
+                'first_name': 'Новый', 'last_name': 'Пользователь',
+                'password': 'Sup3r-secret-pass',
+            }),
+        ],
+        'UserViewSet.update': [
+            ('put', f'/api/users/{user.id}/', {
+                'email': user.email, 'username': user.username,
+                'first_name': 'Имя', 'last_name': 'Фамилия',
+            }),
+        ],
+        'UserViewSet.partial_update': [
+            ('patch', f'/api/users/{user.id}/', {'first_name': 'Имя'}),
+        ],
+        'UserViewSet.destroy': [
+            ('delete', f'/api/users/{author.id}/', None),
+        ],
+        'UserViewSet.me': [
+            ('get', '/api/users/me/', None),
+        ],
+        'UserViewSet.avatar': [
+            ('put', '/api/users/me/avatar/', {
+                'avatar': image_data_uri(16, 16)
+            }),
+            ('delete', '/api/users/me/avatar/', None),
+        ],
+        'UserViewSet.set_password': [
+            ('post', '/api/users/set_password/', {
+                'current_password': 'testpassword',
+                'new_password': 'Sup3r-secret-pass',
+            }),
+        ],
+        'UserViewSet.subscribe': [
+            ('post', f'/api/users/{fresh_author.id}/subscribe/', None),
+            ('delete', f'/api/users/{fresh_author.id}/subscribe/', None),
+        ],
+        'UserViewSet.subscriptions': [
+            ('get', '/api/users/subscriptions/?limit=100', None),
+            (
+                'get', '/api/users/subscriptions/?limit=100&recipes_limit=1',
+                None
+            ),
+        ],
+    }[action]
+
+
+def resolved_action(response, method):
+    """Имя действия ViewSet, обработавшего запрос: RecipeViewSet.list."""
+    view = response.wsgi_request.resolver_match.func
+    return f'{view.cls.__name__}.{view.actions[method]}'
+
+
+def test_every_action_has_budget():
+    """Каждое действие зарегистрированных ViewSet имеет бюджет."""
+    actions = {
+        f'{viewset.__name__}.{action}'
+        for _, viewset, _ in router.registry
+        for route in router.get_routes(viewset)
+        for action in route.mapping.values()
+        if hasattr(viewset, action)
+    }
+
+    assert actions == set(QUERY_BUDGETS)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('media_root')
+@pytest.mark.parametrize('action, budget', QUERY_BUDGETS.items())
+def test_query_budget(
+    action, budget, authenticated_client, user, catalogue,
+    django_assert_max_num_queries
+):
+    for method, path, payload in scenario(action, catalogue, user):
+        # Бюджет считается для холодного кеша
+        cache.clear()
+        with django_assert_max_num_queries(budget):
+            response = getattr(authenticated_client, method)(
+                path, payload, format='json'
+            )
+
+        assert response.status_code < 400, response.content
+        assert resolved_action(response, method) == action
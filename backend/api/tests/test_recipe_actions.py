@@ -1,4 +1,6 @@
+import csv
 import io
+import json
 import pytest
 from django.urls import reverse
 from rest_framework import status
@@ -184,8 +186,84 @@ class TestRecipeActions:
         assert response['Content-Type'] == 'text/plain; charset=utf-8'
         assert 'Content-Disposition' in response
         assert 'attachment; filename="shopping_list.txt"' in response['Content-Disposition']
-        assert 'Список покупок:' in response.content.decode('utf-8')
-        assert 'Тестовый ингредиент' in response.content.decode('utf-8')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        assert 'Список покупок:' in content
+        assert 'Тестовый ингредиент' in content
+
+    def test_download_shopping_cart_sums_amounts(
+        self, authenticated_client, user, recipe_data
+    ):
+        """Количество одного ингредиента из разных рецептов суммируется."""
+        other_recipe = Recipe.objects.create(
+            name='Другой рецепт',
+            text='Описание',
+            cooking_time=10,
+            author=user,
+            image='test_image.jpg'
+        )
+        RecipeIngredient.objects.create(
+            recipe=other_recipe,
+            ingredient=recipe_data.ingredients.first(),
+            amount=50
+        )
+        ShoppingCart.objects.create(user=user, recipe=recipe_data)
+        ShoppingCart.objects.create(user=user, recipe=other_recipe)
+
+        url = reverse('api:recipe-download-shopping-cart')
+        response = authenticated_client.get(url, {'format': 'json'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/json; charset=utf-8'
+        assert 'shopping_list.json' in response['Content-Disposition']
+        content = json.loads(b''.join(response.streaming_content))
+        assert content == [{
+            'name': 'Тестовый ингредиент',
+            'measurement_unit': 'г',
+            'amount': 150,
+        }]
+
+    def test_download_shopping_cart_csv(self, authenticated_client, user, recipe_data):
+        """Тест скачивания списка покупок в формате CSV."""
+        ShoppingCart.objects.create(user=user, recipe=recipe_data)
+
+        url = reverse('api:recipe-download-shopping-cart')
+        response = authenticated_client.get(url, {'format': 'csv'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'text/csv; charset=utf-8'
+        content = b''.join(response.streaming_content).decode('utf-8')
+        rows = list(csv.reader(io.StringIO(content)))
+        assert rows == [
+            ['Ингредиент', 'Единица измерения', 'Количество'],
+            ['Тестовый ингредиент', 'г', '100'],
+        ]
+
+    def test_download_shopping_cart_query_in_view(
+        self, authenticated_client, user, recipe_data,
+        django_assert_num_queries
+    ):
+        """Агрегат выполняется в представлении, а не при отдаче тела."""
+        ShoppingCart.objects.create(user=user, recipe=recipe_data)
+        url = reverse('api:recipe-download-shopping-cart')
+
+        with django_assert_num_queries(1):
+            response = authenticated_client.get(url)
+        with django_assert_num_queries(0):
+            content = b''.join(response.streaming_content).decode('utf-8')
+
+        assert 'Тестовый ингредиент' in content
+
+    def test_download_shopping_cart_unknown_format(
+        self, authenticated_client, user, recipe_data
+    ):
+        """Тест скачивания списка покупок в неподдерживаемом формате."""
+        ShoppingCart.objects.create(user=user, recipe=recipe_data)
+
+        url = reverse('api:recipe-download-shopping-cart')
+        response = authenticated_client.get(url, {'format': 'docx'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'errors' in response.data
 
     def test_download_shopping_cart_empty(self, authenticated_client):
         """Тест скачивания пустого списка покупок."""
@@ -56,6 +56,108 @@ class TestBase64ImageField:
         assert result is not None
         assert result.name.endswith('.jpeg')
 
+    @staticmethod
+    def _data_uri(width, height, image_format='PNG', mime='image/png'):
+        img = Image.new('RGB', (width, height), color='red')
+        img_io = io.BytesIO()
+        img.save(img_io, format=image_format)
+        img_b64 = base64.b64encode(img_io.getvalue()).decode()
+        return f'data:{mime};base64,{img_b64}'
+
+    def test_invalid_header(self):
+        """Строка без корректного заголовка data URI отклоняется."""
+        field = Base64ImageField()
+        for value in (
+            'data:text/plain;base64,aGVsbG8=',
+            'data:image/png,aGVsbG8=',
+            'data:image/png;base64,@@@@',
+        ):
+            with pytest.raises(ValidationError):
+                field.to_internal_value(value)
+
+    def test_not_an_image(self):
+        """Данные, не являющиеся изображением, отклоняются."""
+        data_uri = 'data:image/png;base64,' + base64.b64encode(
+            b'not an image' * 100
+        ).decode()
+
+        with pytest.raises(ValidationError):
+            Base64ImageField().to_internal_value(data_uri)
+
+    def test_byte_limit(self, settings):
+        """Размер проверяется по длине строки до декодирования."""
+        settings.IMAGE_UPLOAD_MAX_BYTES = 100
+        data_uri = self._data_uri(200, 200, 'BMP', 'image/bmp')
+
+        with pytest.raises(ValidationError, match='100 байт'):
+            Base64ImageField().to_internal_value(data_uri)
+
+    def test_pixel_limit_checked_from_header(self, settings, monkeypatch):
+        """Разрешение проверяется по заголовку до полного декодирования."""
+        from api import data_uri as module
+
+        settings.IMAGE_UPLOAD_MAX_PIXELS = 1000
+        # Шум плохо сжимается: файл занимает много кусков
+        img = Image.effect_noise((600, 600), 64).convert('RGB')
+        img_io = io.BytesIO()
+        img.save(img_io, format='PNG')
+        encoded = base64.b64encode(img_io.getvalue()).decode()
+        chunks = []
+        original_decode = module.base64.b64decode
+        monkeypatch.setattr(
+            module.base64, 'b64decode',
+            lambda value, **kwargs: chunks.append(value)
+            or original_decode(value, **kwargs)
+        )
+
+        with pytest.raises(ValidationError, match='1000 пикселей'):
+            Base64ImageField().to_internal_value(
+                f'data:image/png;base64,{encoded}'
+            )
+        assert len(chunks) < len(encoded) / module.CHUNK_SIZE
+
+    def test_wrapped_base64(self, settings, monkeypatch):
+        """base64 с переносами строк и пробелами декодируется."""
+        from api import data_uri as module
+
+        # Куски меньше строки base64: переносы попадают на их границы
+        monkeypatch.setattr(module, 'CHUNK_SIZE', 30)
+        img = Image.effect_noise((40, 40), 64).convert('RGB')
+        img_io = io.BytesIO()
+        img.save(img_io, format='PNG')
+        raw = img_io.getvalue()
+        encoded = base64.encodebytes(raw).decode().replace('\n', '\r\n ')
+        # Пробелы не входят в оценку размера (запас - на символы '=')
+        settings.IMAGE_UPLOAD_MAX_BYTES = len(raw) + 2
+
+        result = Base64ImageField().to_internal_value(
+            f'data:image/png;base64,{encoded}'
+        )
+
+        assert result.read() == raw
+
+    def test_format_not_allowed(self):
+        """Форматы вне списка принимаемых отклоняются."""
+        with pytest.raises(ValidationError):
+            Base64ImageField().to_internal_value(
+                self._data_uri(10, 10, 'BMP', 'image/bmp')
+            )
+
+    def test_spooled_to_disk(self, settings):
+        """Файл больше IMAGE_UPLOAD_SPOOL_SIZE пишется на диск."""
+        settings.IMAGE_UPLOAD_SPOOL_SIZE = 1024
+        img = Image.effect_noise((100, 100), 64).convert('RGB')
+        img_io = io.BytesIO()
+        img.save(img_io, format='PNG')
+        data_uri = 'data:image/png;base64,' + base64.b64encode(
+            img_io.getvalue()
+        ).decode()
+
+        result = Base64ImageField().to_internal_value(data_uri)
+
+        assert result.size == len(img_io.getvalue())
+        assert result.file._rolled
+
 
 @pytest.mark.django_db
 class TestCustomUserSerializer:
@@ -211,6 +313,22 @@ class TestRecipeReadSerializer:
         serializer = RecipeReadSerializer(recipe, context={'request': request})
         assert serializer.data['is_in_shopping_cart'] is True
 
+    def test_annotated_flags_used_without_queries(
+        self, recipe, user, django_assert_num_queries
+    ):
+        """Аннотированные флаги используются без дополнительных запросов."""
+        factory = RequestFactory()
+        request = factory.get('/')
+        request.user = user
+
+        recipe.is_favorited = True
+        recipe.is_in_shopping_cart = False
+        serializer = RecipeReadSerializer(recipe, context={'request': request})
+
+        with django_assert_num_queries(0):
+            assert serializer.get_is_favorited(recipe) is True
+            assert serializer.get_is_in_shopping_cart(recipe) is False
+
 
 @pytest.mark.django_db
 class TestSubscriptionSerializer:
@@ -240,6 +358,8 @@ class TestSubscriptionSerializer:
 
     def test_get_recipes_count(self, user_with_recipes):
         """Тест получения количества рецептов."""
+        # Счетчик обновлен в БД сигналами, объект фикстуры его не видит
+        user_with_recipes.refresh_from_db()
         serializer = SubscriptionSerializer(user_with_recipes)
         assert serializer.data['recipes_count'] == user_with_recipes.recipes.count()
 
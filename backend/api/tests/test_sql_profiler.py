@@ -0,0 +1,218 @@
+import logging
+import re
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+
+from api.sql_profiler import (
+    QueryProfile, RepeatedQueriesError, fingerprint, profile_queries
+)
+from api.tests.test_async_views import ASYNC_URLCONF
+from api.tests.test_logging import CollectingHandler
+from recipes.models import Ingredient
+
+
+def repeated_view(request):
+    """Запрос на каждую строку (N+1)."""
+    for ingredient in Ingredient.objects.all():
+        Ingredient.objects.filter(pk=ingredient.pk).exists()
+    return HttpResponse()
+
+
+urlpatterns = [path('repeated/', repeated_view)]
+
+
+@pytest.fixture
+def sql_log():
+    """Записи логгера медленных запросов."""
+    logger = logging.getLogger('api.sql')
+    handler = CollectingHandler()
+    logger.addHandler(handler)
+    yield handler.records
+    logger.removeHandler(handler)
+
+
+def server_timing(response):
+    match = re.fullmatch(
+        r'db;dur=([\d.]+);desc="(\d+) queries"', response['Server-Timing']
+    )
+    assert match, response['Server-Timing']
+    return float(match[1]), int(match[2])
+
+
+class TestFingerprint:
+
+    @pytest.mark.parametrize('sql, expected', [
+        (
+            'SELECT "a"."id" FROM "a" WHERE "a"."id" = %s LIMIT 21',
+            'SELECT "a"."id" FROM "a" WHERE "a"."id" = ? LIMIT ?',
+        ),
+        (
+            "SELECT * FROM t WHERE name = 'it''s' AND x > 1.5",
+            'SELECT * FROM t WHERE name = ? AND x > ?',
+        ),
+        (
+            'SELECT * FROM t WHERE id IN (%s, %s, %s)',
+            'SELECT * FROM t WHERE id IN (...)',
+        ),
+        (
+            'INSERT INTO t ("a", "b") VALUES (%s, %s), (%s, %s), (%s, %s)',
+            'INSERT INTO t ("a", "b") VALUES (...)',
+        ),
+        (
+            'SELECT "t1"."id"\n  FROM   "recipes_recipe" "t1"',
+            'SELECT "t1"."id" FROM "recipes_recipe" "t1"',
+        ),
+    ])
+    def test_normalize(self, sql, expected):
+        assert fingerprint(sql) == expected
+
+    def test_same_for_different_lists(self):
+        assert fingerprint('x IN (%s)') == fingerprint('x IN (%s, %s, %s)')
+
+    def test_truncated(self, settings):
+        settings.SQL_PROFILER_MAX_SQL_LENGTH = 10
+        fingerprint.cache_clear()
+
+        assert fingerprint('SELECT ' + 'a, ' * 100 + '1') == 'SELECT a, '
+        fingerprint.cache_clear()
+
+
+class TestQueryProfile:
+
+    def test_keeps_top_n(self):
+        profile = QueryProfile(top_n=2)
+        for index, duration in enumerate((0.01, 0.05, 0.02, 0.03)):
+            profile.record(f'SELECT {index}', duration)
+
+        assert profile.count == 4
+        assert profile.duration == pytest.approx(0.11)
+        assert profile.slowest == [(0.05, 'SELECT ?'), (0.03, 'SELECT ?')]
+        assert len(profile._slowest) == 2
+
+    def test_repeated(self):
+        profile = QueryProfile(repeat_threshold=3)
+        for index in range(4):
+            profile.record(f'SELECT * FROM t WHERE id = {index}', 0.001)
+        profile.record('SELECT * FROM u', 0.001)
+
+        (sql, count, site), = profile.repeated
+        assert (sql, count) == ('SELECT * FROM t WHERE id = ?', 4)
+        assert site.startswith('api/tests/test_sql_profiler.py:')
+        assert site.endswith(' in test_repeated')
+
+    def test_repeated_disabled(self):
+        profile = QueryProfile(repeat_threshold=0)
+        for _ in range(10):
+            profile.record('SELECT 1', 0.001)
+
+        assert profile.repeated == []
+
+    @pytest.mark.django_db
+    def test_counts_queries_without_debug(self, settings):
+        settings.DEBUG = False
+        with profile_queries() as profile:
+            list(Ingredient.objects.all())
+            Ingredient.objects.filter(name='x').exists()
+
+        assert profile.count == 2
+        assert profile.duration > 0
+        assert not connection.queries_logged
+
+
+@pytest.mark.django_db
+class TestQueryProfilerMiddleware:
+
+    def test_server_timing(self, client, recipe, settings):
+        settings.SQL_PROFILER_SERVER_TIMING = True
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(f'/api/recipes/{recipe.id}/')
+
+        duration, count = server_timing(response)
+        assert count == len(queries)
+        assert duration > 0
+
+    def test_server_timing_disabled(self, client, settings):
+        settings.SQL_PROFILER_SERVER_TIMING = False
+
+        assert 'Server-Timing' not in client.get('/api/ingredients/')
+
+    def test_request_log_fields(self, client, recipe):
+        logger = logging.getLogger('api.middleware')
+        handler = CollectingHandler()
+        logger.addHandler(handler)
+        try:
+            client.get(f'/api/recipes/{recipe.id}/')
+        finally:
+            logger.removeHandler(handler)
+
+        record, = handler.records
+        assert record.db_queries > 0
+        assert record.db_ms >= 0
+
+    def test_slow_queries_logged(self, client, recipe, settings, sql_log):
+        settings.SQL_SLOW_QUERY_MS = 0
+        settings.SQL_PROFILER_TOP_N = 2
+
+        client.get(f'/api/recipes/{recipe.id}/')
+
+        record, = sql_log
+        assert record.route == 'api:recipe-detail'
+        assert len(record.slowest) == 2
+        assert all('%s' not in item['sql'] for item in record.slowest)
+
+    def test_fast_queries_not_logged(self, client, recipe, sql_log):
+        client.get(f'/api/recipes/{recipe.id}/')
+
+        assert sql_log == []
+
+    @pytest.mark.urls(ASYNC_URLCONF)
+    def test_async_views(self, async_client, recipe, settings):
+        """Под ASGI запросы ORM из sync_to_async попадают в профиль."""
+        settings.SQL_PROFILER_SERVER_TIMING = True
+
+        with CaptureQueriesContext(connection) as queries:
+            response = async_to_sync(async_client.get)(
+                f'/api/recipes/{recipe.id}/'
+            )
+
+        assert response.status_code == 200
+        assert server_timing(response)[1] == len(queries) > 0
+
+
+@pytest.mark.django_db
+@pytest.mark.urls(__name__)
+class TestRepeatedQueries:
+    """Детектор N+1 в QueryProfilerMiddleware."""
+
+    @pytest.fixture(autouse=True)
+    def ingredients(self, settings):
+        settings.SQL_REPEATED_QUERY_THRESHOLD = 3
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {i}', measurement_unit='г')
+            for i in range(4)
+        )
+
+    def test_raises(self, client):
+        with pytest.raises(RepeatedQueriesError, match='4x SELECT'):
+            client.get('/repeated/')
+
+    def test_logged(self, client, settings, sql_log):
+        settings.SQL_REPEATED_QUERY_RAISE = False
+
+        assert client.get('/repeated/').status_code == 200
+
+        record, = sql_log
+        repeated, = record.repeated
+        assert repeated['count'] == 4
+        assert 'in repeated_view' in repeated['site']
+
+    def test_below_threshold(self, client, settings):
+        settings.SQL_REPEATED_QUERY_THRESHOLD = 5
+
+        assert client.get('/repeated/').status_code == 200
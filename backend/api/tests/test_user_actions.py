@@ -1,5 +1,7 @@
 import io
 import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework import status
 from PIL import Image
@@ -7,6 +9,8 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 
 from users.models import Subscription
 
+User = get_user_model()
+
 
 @pytest.mark.django_db
 class TestUserActions:
@@ -278,3 +282,109 @@ class TestUserActions:
         response = api_client.get(url)
 
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestSubscriptionsList:
+    """Тесты списка подписок с ограничением recipes_limit."""
+
+    # COUNT для пагинации, авторы с recipes_count, рецепты всех авторов
+    QUERY_BUDGET = 3
+
+    def _create_authors(self, start, stop, subscriber, recipes_per_author=3):
+        """Создает авторов с рецептами и подписывает на них пользователя."""
+        from recipes.models import Recipe
+
+        for i in range(start, stop):
+            author = User.objects.create_user(
+                username=f'author{i}',
+                email=f'author{i}@example.com',
+                first_name='Автор',
+                last_name=str(i),
+                password='testpassword'
+            )
+            Subscription.objects.create(user=subscriber, author=author)
+            for j in range(recipes_per_author):
+                Recipe.objects.create(
+                    name=f'Рецепт {i}-{j}',
+                    text='Описание',
+                    cooking_time=10,
+                    image='test_image.jpg',
+                    author=author
+                )
+
+    def test_recipes_limit(self, authenticated_client, user):
+        """Возвращаются последние recipes_limit рецептов каждого автора."""
+        self._create_authors(0, 3, user)
+
+        url = reverse('api:user-subscriptions')
+        response = authenticated_client.get(url, {'recipes_limit': 2})
+
+        assert response.status_code == status.HTTP_200_OK
+        for author in response.data['results']:
+            assert author['recipes_count'] == 3
+            assert [recipe['name'] for recipe in author['recipes']] == [
+                f"Рецепт {author['last_name']}-2",
+                f"Рецепт {author['last_name']}-1",
+            ]
+
+    def test_without_recipes_limit(self, authenticated_client, user):
+        """Без recipes_limit возвращаются все рецепты автора."""
+        self._create_authors(0, 2, user)
+
+        url = reverse('api:user-subscriptions')
+        response = authenticated_client.get(url)
+
+        for author in response.data['results']:
+            assert len(author['recipes']) == 3
+
+    def test_invalid_recipes_limit(self, authenticated_client, user):
+        """Некорректный recipes_limit игнорируется."""
+        self._create_authors(0, 1, user)
+
+        url = reverse('api:user-subscriptions')
+        response = authenticated_client.get(url, {'recipes_limit': 'invalid'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results'][0]['recipes']) == 3
+
+    def test_negative_recipes_limit(self, authenticated_client, user):
+        """Отрицательный recipes_limit игнорируется, как и некорректный."""
+        self._create_authors(0, 1, user)
+
+        url = reverse('api:user-subscriptions')
+        response = authenticated_client.get(url, {'recipes_limit': -1})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results'][0]['recipes']) == 3
+
+    def test_author_without_recipes(self, authenticated_client, user):
+        """Автор без рецептов отдается с пустым списком."""
+        self._create_authors(0, 1, user, recipes_per_author=0)
+
+        url = reverse('api:user-subscriptions')
+        response = authenticated_client.get(url, {'recipes_limit': 2})
+
+        assert response.data['results'][0]['recipes'] == []
+        assert response.data['results'][0]['recipes_count'] == 0
+
+    def test_query_budget(
+        self, authenticated_client, user, django_assert_num_queries
+    ):
+        """Число запросов не зависит от количества авторов на странице."""
+        url = reverse('api:user-subscriptions')
+
+        self._create_authors(0, 2, user)
+        # Бюджет считается для холодного кеша count
+        cache.clear()
+        with django_assert_num_queries(self.QUERY_BUDGET):
+            authenticated_client.get(url, {'recipes_limit': 2, 'limit': 100})
+
+        self._create_authors(2, 15, user)
+        # Бюджет считается для холодного кеша count
+        cache.clear()
+        with django_assert_num_queries(self.QUERY_BUDGET):
+            response = authenticated_client.get(
+                url, {'recipes_limit': 2, 'limit': 100}
+            )
+        assert len(response.data['results']) == 15
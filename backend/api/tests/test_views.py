@@ -1,7 +1,20 @@
+import os
+import subprocess
+import sys
+
 import pytest
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework import status
-from recipes.models import Ingredient
+from rest_framework.test import APIClient
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart
+)
+from users.models import Subscription
+
+User = get_user_model()
 
 
 @pytest.mark.django_db
@@ -18,10 +31,10 @@ class TestIngredientAPI:
         response = authenticated_client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 2
-        assert response.data[0]['name'] == 'Сахар'  # Проверка сортировки по имени
-        assert response.data[1]['name'] == 'Соль'
-        assert 'measurement_unit' in response.data[0]
+        assert len(response.json()) == 2
+        assert response.json()[0]['name'] == 'Сахар'  # Проверка сортировки по имени
+        assert response.json()[1]['name'] == 'Соль'
+        assert 'measurement_unit' in response.json()[0]
 
     def test_ingredient_detail(self, authenticated_client):
         """Тест получения деталей ингредиента."""
@@ -33,8 +46,8 @@ class TestIngredientAPI:
         response = authenticated_client.get(url)
 
         assert response.status_code == status.HTTP_200_OK
-        assert response.data['name'] == 'Перец'
-        assert response.data['measurement_unit'] == 'г'
+        assert response.json()['name'] == 'Перец'
+        assert response.json()['measurement_unit'] == 'г'
 
     def test_ingredient_search(self, authenticated_client):
         """Тест поиска ингредиентов."""
@@ -46,5 +59,780 @@ class TestIngredientAPI:
         response = authenticated_client.get(url, {'name': 'Са'})
 
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
-        assert response.data[0]['name'] == 'Сахар'
+        assert len(response.json()) == 1
+        assert response.json()[0]['name'] == 'Сахар'
+
+
+@pytest.mark.django_db
+class TestRecipeUserFlags:
+    """Тесты флагов is_favorited / is_in_shopping_cart в списке рецептов."""
+
+    @pytest.fixture
+    def recipes(self, user, ingredient):
+        """Создает несколько рецептов пользователя."""
+        result = []
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {i}',
+                text='Описание',
+                cooking_time=10,
+                image='test_image.jpg',
+                author=user
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=10
+            )
+            result.append(recipe)
+        return result
+
+    def test_flags_in_list(self, authenticated_client, user, recipes):
+        """Флаги в списке соответствуют избранному и корзине."""
+        Favorite.objects.create(user=user, recipe=recipes[0])
+        ShoppingCart.objects.create(user=user, recipe=recipes[1])
+
+        url = reverse('api:recipe-list')
+        response = authenticated_client.get(url, {'limit': 10})
+
+        assert response.status_code == status.HTTP_200_OK
+        flags = {
+            item['id']: (item['is_favorited'], item['is_in_shopping_cart'])
+            for item in response.data['results']
+        }
+        assert flags[recipes[0].id] == (True, False)
+        assert flags[recipes[1].id] == (False, True)
+        assert flags[recipes[2].id] == (False, False)
+
+    def test_flags_in_detail(self, authenticated_client, user, recipes):
+        """Флаги в детальном представлении рецепта."""
+        Favorite.objects.create(user=user, recipe=recipes[0])
+
+        url = reverse('api:recipe-detail', kwargs={'pk': recipes[0].id})
+        response = authenticated_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['is_favorited'] is True
+        assert response.data['is_in_shopping_cart'] is False
+
+    def test_flags_anonymous(self, api_client, recipes):
+        """Для анонимного пользователя флаги всегда False."""
+        url = reverse('api:recipe-list')
+        response = api_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        for item in response.json()['results']:
+            assert item['is_favorited'] is False
+            assert item['is_in_shopping_cart'] is False
+
+
+
+@pytest.mark.django_db
+class TestRecipeListQueries:
+    """Тесты количества SQL-запросов при получении списка рецептов."""
+
+    # COUNT для пагинации, выборка рецептов с автором и флагами,
+    # предзагрузка ингредиентов; валидаторы ETag берутся из кеша
+    QUERY_BUDGET = 3
+
+    def _create_recipes(self, start, stop, ingredient, subscriber):
+        """Создает рецепты разных авторов, на часть из них есть подписка."""
+        for i in range(start, stop):
+            author = User.objects.create_user(
+                username=f'author{i}',
+                email=f'author{i}@example.com',
+                first_name='Автор',
+                last_name=str(i),
+                password='testpassword'
+            )
+            if i % 2:
+                Subscription.objects.create(user=subscriber, author=author)
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {i}',
+                text='Описание',
+                cooking_time=10,
+                image='test_image.jpg',
+                author=author
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=10
+            )
+
+    def test_list_query_budget(
+        self, authenticated_client, user, ingredient,
+        django_assert_num_queries
+    ):
+        """Число запросов не зависит от размера страницы."""
+        url = reverse('api:recipe-list')
+
+        self._create_recipes(0, 2, ingredient, user)
+        # Бюджет считается для холодного кеша count
+        cache.clear()
+        with django_assert_num_queries(self.QUERY_BUDGET):
+            response = authenticated_client.get(url, {'limit': 100})
+        assert len(response.json()['results']) == 2
+
+        self._create_recipes(2, 20, ingredient, user)
+        # Бюджет считается для холодного кеша count
+        cache.clear()
+        with django_assert_num_queries(self.QUERY_BUDGET):
+            response = authenticated_client.get(url, {'limit': 100})
+        assert len(response.json()['results']) == 20
+
+    def test_author_is_subscribed_annotated(
+        self, authenticated_client, user, ingredient
+    ):
+        """Флаг подписки на автора берется из аннотации и корректен."""
+        self._create_recipes(0, 4, ingredient, user)
+
+        url = reverse('api:recipe-list')
+        response = authenticated_client.get(url, {'limit': 100})
+
+        for item in response.json()['results']:
+            author_index = int(item['author']['last_name'])
+            assert item['author']['is_subscribed'] is bool(author_index % 2)
+            assert item['ingredients'][0]['name'] == ingredient.name
+
+
+@pytest.mark.django_db
+class TestIngredientSearch:
+    """Тесты поиска ингредиентов для автодополнения."""
+
+    @pytest.fixture(autouse=True)
+    def ingredients(self):
+        """Создает ингредиенты для поиска."""
+        for name in ('молоко', 'кокосовое молоко', 'моллюски', 'сахар'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def test_search_ranking(self, api_client):
+        """Префиксные совпадения идут раньше остальных."""
+        url = reverse('api:ingredient-list')
+        response = api_client.get(url, {'name': 'молоко'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['name'] for item in response.json()] == [
+            'молоко', 'кокосовое молоко'
+        ]
+
+    def test_search_with_typo(self, api_client):
+        """Поиск с опечаткой."""
+        url = reverse('api:ingredient-list')
+        response = api_client.get(url, {'name': 'сахр'})
+
+        assert [item['name'] for item in response.json()] == ['сахар']
+
+    def test_search_limit(self, api_client):
+        """Параметр limit ограничивает количество результатов."""
+        url = reverse('api:ingredient-list')
+        response = api_client.get(url, {'name': 'мол', 'limit': 1})
+
+        assert len(response.json()) == 1
+
+    def test_search_invalid_limit(self, api_client):
+        """Некорректный limit игнорируется."""
+        url = reverse('api:ingredient-list')
+        response = api_client.get(url, {'name': 'моло', 'limit': 'invalid'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) == 3
+
+    def test_search_short_term_prefix_only(self, api_client):
+        """Запрос из одной буквы возвращает только названия с нее."""
+        url = reverse('api:ingredient-list')
+        response = api_client.get(url, {'name': 'м'})
+
+        assert [item['name'] for item in response.json()] == [
+            'моллюски', 'молоко'
+        ]
+
+
+@pytest.mark.django_db
+class TestIngredientCache:
+    """Тесты кеша ответов справочника ингредиентов."""
+
+    def test_list_served_from_cache(self, api_client, django_assert_num_queries):
+        """Повторный запрос списка не обращается к БД."""
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        url = reverse('api:ingredient-list')
+
+        first = api_client.get(url)
+        with django_assert_num_queries(0):
+            second = api_client.get(url)
+
+        assert second.content == first.content
+
+    def test_search_bucket_served_from_cache(
+        self, api_client, django_assert_num_queries
+    ):
+        """Результаты поиска кешируются по нормализованной строке поиска."""
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        url = reverse('api:ingredient-list')
+
+        api_client.get(url, {'name': 'со'})
+        with django_assert_num_queries(0):
+            response = api_client.get(url, {'name': 'СО'})
+
+        assert response.json()[0]['name'] == 'Соль'
+
+    def test_detail_served_from_cache(
+        self, api_client, django_assert_num_queries
+    ):
+        """Повторный запрос ингредиента не обращается к БД."""
+        salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        url = reverse('api:ingredient-detail', kwargs={'pk': salt.id})
+
+        api_client.get(url)
+        with django_assert_num_queries(0):
+            response = api_client.get(url)
+
+        assert response.json()['name'] == 'Соль'
+
+    def test_cache_invalidated_on_change(self, api_client):
+        """Изменение справочника сбрасывает кеш."""
+        salt = Ingredient.objects.create(name='Соль', measurement_unit='г')
+        list_url = reverse('api:ingredient-list')
+        detail_url = reverse('api:ingredient-detail', kwargs={'pk': salt.id})
+        api_client.get(list_url)
+        api_client.get(detail_url)
+
+        salt.name = 'Морская соль'
+        salt.save()
+        Ingredient.objects.create(name='Сахар', measurement_unit='г')
+
+        names = [item['name'] for item in api_client.get(list_url).json()]
+        assert names == ['Морская соль', 'Сахар']
+        assert api_client.get(detail_url).json()['name'] == 'Морская соль'
+
+    def test_not_found_not_cached(self, api_client):
+        """Ответ 404 не кешируется."""
+        url = reverse('api:ingredient-detail', kwargs={'pk': 99999})
+        assert api_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+
+        Ingredient.objects.create(id=99999, name='Соль', measurement_unit='г')
+        assert api_client.get(url).status_code == status.HTTP_200_OK
+
+    def test_version_shared_between_processes(self, tmp_path):
+        """
+        Кеш по умолчанию общий для процессов: смена версии справочника
+        командой видна воркерам.
+        """
+        env = {
+            key: value for key, value in os.environ.items()
+            if key != 'CACHE_BACKEND'
+        }
+        env.update(
+            CACHE_LOCATION=str(tmp_path),
+            DJANGO_SETTINGS_MODULE='foodgram.settings'
+        )
+
+        def run(function):
+            code = (
+                'import django; django.setup(); '
+                'from recipes import catalogue; '
+                f'print(catalogue.{function}())'
+            )
+            return int(subprocess.run(
+                [sys.executable, '-c', code], env=env, check=True,
+                capture_output=True, text=True, cwd=settings.BASE_DIR
+            ).stdout)
+
+        version = run('get_catalogue_version')
+        run('bump_catalogue_version')
+
+        assert run('get_catalogue_version') == version + 1
+
+
+@pytest.mark.django_db
+class TestRecipeCursorPagination:
+    """Тесты keyset-пагинации ленты рецептов."""
+
+    @pytest.fixture
+    def recipes(self, user):
+        """Создает рецепты, часть - с одинаковой датой публикации."""
+        result = [
+            Recipe.objects.create(
+                name=f'Рецепт {i}',
+                text='Описание',
+                cooking_time=10,
+                image='test_image.jpg',
+                author=user
+            )
+            for i in range(7)
+        ]
+        same_date = result[3].pub_date
+        Recipe.objects.filter(
+            pk__in=[result[2].pk, result[4].pk]
+        ).update(pub_date=same_date)
+        return result
+
+    def _walk(self, client, url, params, link='next'):
+        """Проходит по страницам и собирает id рецептов."""
+        ids = []
+        response = client.get(url, params)
+        while True:
+            assert response.status_code == status.HTTP_200_OK
+            ids.extend(item['id'] for item in response.json()['results'])
+            if not response.json()[link]:
+                return ids, response
+            response = client.get(response.json()[link])
+
+    def test_cursor_pages_cover_feed(self, api_client, recipes):
+        """Курсорные страницы проходят ленту по (pub_date, id) без пропусков."""
+        url = reverse('api:recipe-list')
+        expected = list(Recipe.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('id', flat=True))
+
+        ids, _ = self._walk(api_client, url, {'cursor': '', 'limit': 2})
+
+        assert ids == expected
+        assert len(ids) == len(recipes)
+
+    def test_cursor_response_shape(self, api_client, recipes):
+        """Формат ответа совпадает с обычной пагинацией, count не считается."""
+        url = reverse('api:recipe-list')
+        response = api_client.get(url, {'cursor': '', 'limit': 3})
+
+        assert set(response.json()) == {'count', 'next', 'previous', 'results'}
+        assert response.json()['count'] is None
+        assert response.json()['previous'] is None
+        assert 'cursor=' in response.json()['next']
+
+    def test_previous_link(self, api_client, recipes):
+        """Ссылка previous возвращает на предыдущую страницу."""
+        url = reverse('api:recipe-list')
+        first = api_client.get(url, {'cursor': '', 'limit': 3})
+        second = api_client.get(first.json()['next'])
+        back = api_client.get(second.json()['previous'])
+
+        assert back.json()['results'] == first.json()['results']
+        assert back.json()['previous'] is None
+
+    def test_invalid_cursor(self, api_client, recipes):
+        """Некорректный курсор - 404."""
+        url = reverse('api:recipe-list')
+        response = api_client.get(url, {'cursor': 'invalid'})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_subscriptions_cursor(self, authenticated_client, user):
+        """Keyset-пагинация списка подписок."""
+        for i in range(5):
+            author = User.objects.create_user(
+                username=f'author{i}',
+                email=f'author{i}@example.com',
+                first_name='Автор',
+                last_name=str(i),
+                password='testpassword'
+            )
+            Subscription.objects.create(user=user, author=author)
+
+        url = reverse('api:user-subscriptions')
+        ids, _ = self._walk(
+            authenticated_client, url, {'cursor': '', 'limit': 2}
+        )
+
+        assert ids == sorted(ids)
+        assert len(ids) == 5
+
+
+@pytest.mark.django_db
+class TestPaginationCount:
+    """Тесты стратегий подсчета count в пагинации."""
+
+    def _create_recipes(self, author, count, start=0):
+        for i in range(start, start + count):
+            Recipe.objects.create(
+                name=f'Рецепт {i}',
+                text='Описание',
+                cooking_time=10,
+                image='test_image.jpg',
+                author=author
+            )
+
+    def test_count_cached_between_pages(
+        self, api_client, user, django_assert_num_queries
+    ):
+        """Повторный запрос с теми же фильтрами не выполняет COUNT."""
+        self._create_recipes(user, 8)
+        url = reverse('api:recipe-list')
+
+        first = api_client.get(url, {'limit': 3})
+        # Выборка страницы и ингредиентов, без COUNT
+        with django_assert_num_queries(2):
+            second = api_client.get(url, {'limit': 3, 'page': 2})
+
+        assert first.json()['count'] == second.json()['count'] == 8
+
+    def test_count_keyed_by_filters(self, authenticated_client, user, admin_user):
+        """Разные наборы фильтров кешируются под разными ключами."""
+        self._create_recipes(user, 3)
+        self._create_recipes(admin_user, 2, start=3)
+        url = reverse('api:recipe-list')
+
+        assert authenticated_client.get(url).json()['count'] == 5
+        assert authenticated_client.get(
+            url, {'author': user.id}
+        ).json()['count'] == 3
+        assert authenticated_client.get(
+            url, {'author': admin_user.id}
+        ).json()['count'] == 2
+
+    def test_cached_count_expires(self, authenticated_client, user, settings):
+        """Закешированное значение живет не дольше таймаута."""
+        # Авторизованный клиент: анонимные ответы кешируются целиком
+        settings.PAGINATION_COUNT_CACHE_TIMEOUT = 0
+        self._create_recipes(user, 2)
+        url = reverse('api:recipe-list')
+        authenticated_client.get(url)
+
+        self._create_recipes(user, 1, start=2)
+
+        assert authenticated_client.get(url).json()['count'] == 3
+
+    def test_count_reset_on_recipe_create(
+        self, api_client, user, django_capture_on_commit_callbacks
+    ):
+        """Новый рецепт сбрасывает закешированный count ленты."""
+        self._create_recipes(user, 1)
+        url = reverse('api:recipe-list')
+        api_client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            self._create_recipes(user, 1, start=1)
+        data = api_client.get(url).json()
+
+        assert data['count'] == len(data['results']) == 2
+
+    def test_count_reset_on_favorite(self, authenticated_client, user):
+        """Добавление в избранное сбрасывает count отфильтрованной ленты."""
+        self._create_recipes(user, 2)
+        url = reverse('api:recipe-list')
+        params = {'is_favorited': 1}
+        assert authenticated_client.get(url, params).json()['count'] == 0
+
+        Favorite.objects.create(user=user, recipe=Recipe.objects.first())
+        data = authenticated_client.get(url, params).json()
+
+        assert data['count'] == len(data['results']) == 1
+
+    def test_stale_count_keeps_new_rows(self, authenticated_client, user):
+        """Устаревший count не обрезает последнюю страницу."""
+        self._create_recipes(user, 2)
+        url = reverse('api:recipe-list')
+        authenticated_client.get(url)
+
+        # bulk_create без сигналов: count в кеше остается прежним
+        Recipe.objects.bulk_create([Recipe(
+            name='Рецепт 2', text='Описание', cooking_time=10,
+            image='test_image.jpg', author=user
+        )])
+        response = authenticated_client.get(url)
+
+        assert response.json()['count'] == 2
+        assert len(response.json()['results']) == 3
+
+    def test_exact_count_by_default(self, api_client, user):
+        """Без count_strategy у view count считается точно каждый раз."""
+        from api.counting import CountStrategyPaginator, ExactCount
+
+        self._create_recipes(user, 2)
+        paginator = CountStrategyPaginator(Recipe.objects.all(), 10)
+
+        assert isinstance(paginator.count_strategy, ExactCount)
+        assert paginator.count == 2
+
+    def test_estimate_falls_back_off_postgresql(self, user):
+        """Вне PostgreSQL оценка заменяется точным значением."""
+        from api.counting import EstimatedCount
+
+        self._create_recipes(user, 4)
+
+        assert EstimatedCount(threshold=0).count(Recipe.objects.all()) == 4
+
+
+@pytest.mark.django_db
+class TestAnonymousResponseCache:
+    """Тесты кеша ответов для анонимных пользователей."""
+
+    IMAGE = (
+        'data:image/gif;base64,R0lGODlhAQABAIAAAAUEBAAAACwAAAAAAQABAAACAkQBADs='
+    )
+
+    @pytest.fixture
+    def anonymous_client(self):
+        """Отдельный клиент: authenticated_client авторизует api_client."""
+        return APIClient()
+
+    def _update(self, client, recipe, ingredient, name):
+        return client.patch(
+            reverse('api:recipe-detail', kwargs={'pk': recipe.id}),
+            {
+                'name': name,
+                'ingredients': [{'id': ingredient.id, 'amount': 5}],
+            },
+            format='json'
+        )
+
+    def test_detail_served_from_cache(
+        self, api_client, recipe, django_assert_num_queries
+    ):
+        """Повторный анонимный запрос рецепта не обращается к БД."""
+        url = reverse('api:recipe-detail', kwargs={'pk': recipe.id})
+        first = api_client.get(url)
+
+        with django_assert_num_queries(0):
+            second = api_client.get(url)
+
+        assert second.status_code == status.HTTP_200_OK
+        assert second.content == first.content
+
+    def test_query_params_normalized(
+        self, api_client, recipe, django_assert_num_queries
+    ):
+        """Порядок параметров запроса не влияет на ключ кеша."""
+        url = reverse('api:recipe-list')
+        api_client.get(f'{url}?limit=3&page=1')
+
+        with django_assert_num_queries(0):
+            response = api_client.get(f'{url}?page=1&limit=3')
+
+        assert response.json()['count'] == 1
+
+    def test_authenticated_not_cached(self, authenticated_client, recipe):
+        """Ответы авторизованным пользователям не кешируются."""
+        url = reverse('api:recipe-detail', kwargs={'pk': recipe.id})
+        authenticated_client.get(url)
+        Recipe.objects.filter(pk=recipe.pk).update(name='Изменен в БД')
+
+        response = authenticated_client.get(url)
+
+        assert response.json()['name'] == 'Изменен в БД'
+
+    def test_update_invalidates_detail_and_list(
+        self, anonymous_client, authenticated_client, recipe, ingredient
+    ):
+        """Изменение рецепта сбрасывает его страницу и ленту."""
+        detail_url = reverse('api:recipe-detail', kwargs={'pk': recipe.id})
+        list_url = reverse('api:recipe-list')
+        anonymous_client.get(detail_url)
+        anonymous_client.get(list_url)
+
+        self._update(authenticated_client, recipe, ingredient, 'Новое имя')
+
+        assert anonymous_client.get(detail_url).json()['name'] == 'Новое имя'
+        assert anonymous_client.get(
+            list_url
+        ).json()['results'][0]['name'] == 'Новое имя'
+
+    def test_create_and_delete_invalidate_list(
+        self, anonymous_client, authenticated_client, ingredient
+    ):
+        """Создание и удаление рецепта меняют закешированную ленту."""
+        list_url = reverse('api:recipe-list')
+        assert anonymous_client.get(list_url).json()['results'] == []
+
+        created = authenticated_client.post(
+            list_url,
+            {
+                'name': 'Рецепт',
+                'text': 'Описание',
+                'cooking_time': 10,
+                'image': self.IMAGE,
+                'ingredients': [{'id': ingredient.id, 'amount': 5}],
+            },
+            format='json'
+        )
+        assert len(anonymous_client.get(list_url).json()['results']) == 1
+
+        detail_url = reverse(
+            'api:recipe-detail', kwargs={'pk': created.json()['id']}
+        )
+        anonymous_client.get(detail_url)
+        authenticated_client.delete(detail_url)
+
+        assert anonymous_client.get(list_url).json()['results'] == []
+        assert anonymous_client.get(detail_url).status_code == (
+            status.HTTP_404_NOT_FOUND
+        )
+
+    def test_author_change_invalidates(self, api_client, user, recipe):
+        """Изменение профиля автора сбрасывает ответы с его рецептами."""
+        url = reverse('api:recipe-detail', kwargs={'pk': recipe.id})
+        api_client.get(url)
+
+        user.first_name = 'Переименован'
+        user.save()
+
+        assert api_client.get(url).json()['author']['first_name'] == (
+            'Переименован'
+        )
+
+    def test_other_recipes_stay_cached(
+        self, anonymous_client, authenticated_client, user, recipe,
+        ingredient, django_assert_num_queries
+    ):
+        """Изменение рецепта не сбрасывает страницы других рецептов."""
+        other = Recipe.objects.create(
+            name='Другой', text='Описание', cooking_time=5,
+            image='test_image.jpg', author=user
+        )
+        other_url = reverse('api:recipe-detail', kwargs={'pk': other.id})
+        anonymous_client.get(other_url)
+
+        self._update(authenticated_client, recipe, ingredient, 'Новое имя')
+
+        with django_assert_num_queries(0):
+            anonymous_client.get(other_url)
+
+
+@pytest.mark.django_db
+class TestConditionalRequests:
+    """Тесты ETag и Last-Modified."""
+
+    @pytest.fixture
+    def anonymous_client(self):
+        return APIClient()
+
+    def test_recipe_detail_not_modified(
+        self, authenticated_client, recipe, django_assert_num_queries
+    ):
+        """Совпавший ETag - 304 без выборки и сериализации рецепта."""
+        url = reverse('api:recipe-detail', kwargs={'pk': recipe.id})
+        etag = authenticated_client.get(url)['ETag']
+
+        # Валидаторы рецепта; версия списков пользователя - из кеша
+        with django_assert_num_queries(1):
+            response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        assert not response.content
+
+    def test_last_modified_only_for_anonymous(
+        self, anonymous_client, authenticated_client, recipe
+    ):
+        """Last-Modified не отдается ответам, зависящим от пользователя."""
+        url = reverse('api:recipe-detail', kwargs={'pk': recipe.id})
+
+        assert 'Last-Modified' in anonymous_client.get(url)
+        assert 'Last-Modified' not in authenticated_client.get(url)
+
+    def test_if_modified_since(self, anonymous_client, recipe):
+        """If-Modified-Since с датой изменения рецепта - 304."""
+        url = reverse('api:recipe-detail', kwargs={'pk': recipe.id})
+        last_modified = anonymous_client.get(url)['Last-Modified']
+
+        response = anonymous_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_cached_anonymous_not_modified(
+        self, anonymous_client, recipe, django_assert_num_queries
+    ):
+        """Ответ из кеша анонимных ответов тоже проверяется по ETag."""
+        url = reverse('api:recipe-detail', kwargs={'pk': recipe.id})
+        etag = anonymous_client.get(url)['ETag']
+
+        with django_assert_num_queries(0):
+            response = anonymous_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_etag_changes_on_update(
+        self, authenticated_client, recipe, ingredient
+    ):
+        """Изменение рецепта меняет ETag."""
+        url = reverse('api:recipe-detail', kwargs={'pk': recipe.id})
+        etag = authenticated_client.get(url)['ETag']
+
+        authenticated_client.patch(
+            url,
+            {
+                'name': 'Новое имя',
+                'ingredients': [{'id': ingredient.id, 'amount': 5}],
+            },
+            format='json'
+        )
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+    def test_list_etag_follows_user_lists(self, authenticated_client, recipe):
+        """Добавление в избранное меняет ETag ленты пользователя."""
+        url = reverse('api:recipe-list')
+        etag = authenticated_client.get(url)['ETag']
+        assert authenticated_client.get(
+            url, HTTP_IF_NONE_MATCH=etag
+        ).status_code == status.HTTP_304_NOT_MODIFIED
+
+        authenticated_client.post(
+            reverse('api:recipe-favorite', kwargs={'pk': recipe.id})
+        )
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['results'][0]['is_favorited'] is True
+
+    def test_list_etag_follows_recipe_changes(
+        self, authenticated_client, recipe
+    ):
+        """Изменение и удаление рецепта в обход API меняют ETag ленты."""
+        url = reverse('api:recipe-list')
+
+        for change in (
+            lambda: Recipe.objects.get(pk=recipe.pk).save(),
+            lambda: Recipe.objects.filter(pk=recipe.pk).delete(),
+        ):
+            etag = authenticated_client.get(url)['ETag']
+            change()
+            response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == status.HTTP_200_OK
+
+        assert response.json()['results'] == []
+
+    def test_list_etag_follows_filters(self, authenticated_client, recipe):
+        """ETag ленты вычисляется по отфильтрованному набору рецептов."""
+        url = reverse('api:recipe-list')
+        etag = authenticated_client.get(url)['ETag']
+
+        response = authenticated_client.get(
+            url, {'author': recipe.author_id + 1}, HTTP_IF_NONE_MATCH=etag
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_user_endpoints(self, authenticated_client, user):
+        """Профиль пользователя и /me/ поддерживают If-None-Match."""
+        for url in (
+            reverse('api:user-detail', kwargs={'pk': user.id}),
+            # reverse('api:user-me') указывает на одноименный маршрут djoser
+            '/api/users/me/',
+        ):
+            etag = authenticated_client.get(url)['ETag']
+            response = authenticated_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_missing_user_not_found(self, authenticated_client):
+        """Для несуществующего пользователя по-прежнему 404."""
+        url = reverse('api:user-detail', kwargs={'pk': 9999})
+
+        response = authenticated_client.get(url, HTTP_IF_NONE_MATCH='"x"')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_ingredients_not_modified(
+        self, anonymous_client, ingredient, django_assert_num_queries
+    ):
+        """ETag справочника не требует запросов и меняется с версией."""
+        url = reverse('api:ingredient-list')
+        etag = anonymous_client.get(url)['ETag']
+
+        with django_assert_num_queries(0):
+            response = anonymous_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        Ingredient.objects.create(name='Перец', measurement_unit='г')
+        response = anonymous_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .views import IngredientViewSet, RecipeViewSet, UserViewSet
 
 app_name = 'api'
@@ -10,7 +12,21 @@ router.register('ingredients', IngredientViewSet, basename='ingredient')
 router.register('recipes', RecipeViewSet, basename='recipe')
 router.register('users', UserViewSet, basename='user')
 
+# Асинхронные представления для чтения (см. api.async_views). Остальные
+# методы и маршруты обрабатываются ViewSet-ами роутера
+async_urlpatterns = [
+    path('recipes/', async_views.recipe_list, name='recipe-list'),
+    path(
+        'recipes/<int:pk>/', async_views.recipe_detail, name='recipe-detail'
+    ),
+    path(
+        'ingredients/', async_views.ingredient_list, name='ingredient-list'
+    ),
+    path('users/<int:pk>/', async_views.user_detail, name='user-detail'),
+]
+
 urlpatterns = [
+    *(async_urlpatterns if settings.ASYNC_READ_VIEWS else []),
     path('', include(router.urls)),
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
@@ -1,13 +1,18 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse, Http404
-from django.db.models import Sum
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.db.models import Exists, F, OuterRef, Prefetch, Window
+from django.db.models.functions import RowNumber
 from django_filters.rest_framework import DjangoFilterBackend
+from collections import defaultdict
 import logging
 
+from foodgram.db_router import pin_to_primary
+
 from recipes.models import (
     Ingredient, Recipe, Favorite, ShoppingCart, RecipeIngredient
 )
@@ -22,8 +27,21 @@ from .serializers import (
 #     RecipeCreateSerializer, FavoriteSerializer,
 #     ShoppingCartSerializer, SubscriptionSerializer, CustomUserSerializer
 # )
+from .conditional import (
+    conditional_response, ingredient_validators, recipe_list_validators,
+    recipe_validators, user_validators
+)
+from .counting import CachedCount, EstimatedCount
 from .filters import IngredientSearchFilter, RecipeFilter
+from .ingredient_cache import ingredient_catalogue_cache
 from .pagination import CustomPageNumberPagination
+from .response_cache import (
+    get_cached_response, is_cacheable, recipe_list_tags, recipe_tags
+)
+from .shopping_list import (
+    SHOPPING_LIST_FORMATS, IgnoreFormatContentNegotiation,
+    render_shopping_list
+)
 
 User = get_user_model()
 
@@ -49,13 +67,58 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
 
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
-    """ViewSet для работы с ингредиентами."""
+    """
+    ViewSet для работы с ингредиентами.
+
+    Ответы отдаются из кеша уже сериализованного JSON
+    (см. api.ingredient_cache).
+    """
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (permissions.AllowAny,)
     filter_backends = (IngredientSearchFilter,)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(
+            request,
+            self.get_list_key(request),
+            lambda: self._render(
+                self.filter_queryset(self.get_queryset()), many=True
+            )
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(
+            request,
+            f'item:{kwargs["pk"]}',
+            lambda: self._render(self.get_object())
+        )
+
+    @staticmethod
+    def get_list_key(request):
+        """Ключ кеша списка: нормализованная строка поиска и лимит."""
+        search_filter = IngredientSearchFilter()
+        search_term = search_filter.get_search_term(request)
+        limit = search_filter.get_limit(request) if search_term else ''
+        return f'list:{search_term}:{limit}'
+
+    def _cached_response(self, request, key, build):
+        """Ответ из кеша справочника с поддержкой условных запросов."""
+        return conditional_response(
+            request,
+            ingredient_validators(key),
+            lambda: HttpResponse(
+                ingredient_catalogue_cache.get(key, build),
+                content_type='application/json'
+            )
+        )
+
+    def _render(self, instance, many=False):
+        """Сериализует ингредиенты в JSON."""
+        serializer = self.get_serializer(instance, many=many)
+        return JSONRenderer().render(serializer.data)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """ViewSet для работы с рецептами."""
@@ -63,6 +126,55 @@ class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = (permissions.AllowAny,)  # Разрешаем все, проверки делаем вручную
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    # Порядок для keyset-пагинации (?cursor=), см. CustomPageNumberPagination
+    cursor_ordering = ('-pub_date', '-id')
+    # Лента - основная нагрузка анонимов: count кешируется или оценивается
+    count_strategy = EstimatedCount()
+
+    def get_queryset(self):
+        """
+        Рецепты с флагами is_favorited и is_in_shopping_cart,
+        вычисленными в основном запросе для текущего пользователя.
+        """
+        if self.action in ('list', 'retrieve'):
+            return self.get_read_queryset(self.request.user)
+        return self.annotate_user_flags(Recipe.objects.all(), self.request.user)
+
+    @classmethod
+    def get_read_queryset(cls, user):
+        """
+        Queryset для чтения: автор и ингредиенты подгружаются заранее,
+        чтобы число запросов на страницу списка не зависело
+        от количества рецептов. Используется и асинхронными
+        представлениями (см. api.async_views).
+        """
+        queryset = Recipe.objects.select_related('author').prefetch_related(
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                author_is_subscribed=Exists(Subscription.objects.filter(
+                    user=user, author=OuterRef('author')
+                ))
+            )
+        return cls.annotate_user_flags(queryset, user)
+
+    @staticmethod
+    def annotate_user_flags(queryset, user):
+        """Флаги избранного и списка покупок для пользователя."""
+        if not user.is_authenticated:
+            return queryset
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+        )
 
     def get_serializer_class(self):
         if self.action in ('create', 'partial_update', 'update'):
@@ -70,6 +182,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return RecipeReadSerializer
 
     def create(self, request, *args, **kwargs):
+        # Проверки и ответ после записи читают из основной базы
+        pin_to_primary()
         # Проверяем аутентификацию (401)
         if not request.user.is_authenticated:
             return Response(
@@ -87,7 +201,33 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        def build():
+            return conditional_response(
+                request,
+                recipe_list_validators(request),
+                lambda: super(RecipeViewSet, self).list(
+                    request, *args, **kwargs
+                )
+            )
+
+        if is_cacheable(request):
+            return get_cached_response(request, build, recipe_list_tags)
+        return build()
+
     def retrieve(self, request, *args, **kwargs):
+        def build():
+            return conditional_response(
+                request,
+                recipe_validators(kwargs.get('pk'), request.user),
+                lambda: self._retrieve(request, *args, **kwargs)
+            )
+
+        if is_cacheable(request):
+            return get_cached_response(request, build, recipe_tags)
+        return build()
+
+    def _retrieve(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
             serializer = self.get_serializer(instance)
@@ -104,6 +244,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
 
     def update(self, request, *args, **kwargs):
+        pin_to_primary()
         print(f"🔍 UPDATE: User={request.user.id if request.user.is_authenticated else 'Anonymous'}, Recipe ID={kwargs.get('pk')}")
 
         try:
@@ -151,6 +292,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
 
     def destroy(self, request, *args, **kwargs):
+        pin_to_primary()
         print(f"🔍 DESTROY: User={request.user.id if request.user.is_authenticated else 'Anonymous'}, Recipe ID={kwargs.get('pk')}")
 
         try:
@@ -199,6 +341,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def favorite(self, request, pk=None):
         """Добавить/удалить рецепт из избранного."""
+        pin_to_primary()
         try:
             # Проверка валидности ID рецепта
             try:
@@ -254,6 +397,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def shopping_cart(self, request, pk=None):
         """Добавить/удалить рецепт из корзины покупок."""
+        pin_to_primary()
         try:
             # Проверка валидности ID рецепта
             try:
@@ -307,40 +451,36 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=[permissions.IsAuthenticated]
+        permission_classes=[permissions.IsAuthenticated],
+        content_negotiation_class=IgnoreFormatContentNegotiation
     )
     def download_shopping_cart(self, request):
-        """Скачать список покупок."""
+        """Скачать список покупок (?format=txt|csv|json)."""
         try:
-            shopping_cart = ShoppingCart.objects.filter(user=request.user)
-            recipes = [item.recipe for item in shopping_cart]
-
-            if not recipes:
+            file_format = request.query_params.get('format', 'txt')
+            if file_format not in SHOPPING_LIST_FORMATS:
                 return Response(
-                    {'errors': 'В списке покупок нет рецептов'},
+                    {'errors': (
+                        f'Неподдерживаемый формат: {file_format}. '
+                        f'Доступны: {", ".join(SHOPPING_LIST_FORMATS)}'
+                    )},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            ingredients = RecipeIngredient.objects.filter(
-                recipe__in=recipes
-            ).values(
-                'ingredient__name', 'ingredient__measurement_unit'
-            ).annotate(
-                total_amount=Sum('amount')
-            ).order_by('ingredient__name')
-
-            shopping_list = 'Список покупок:\n\n'
-            for item in ingredients:
-                shopping_list += (
-                    f"{item['ingredient__name']} "
-                    f"({item['ingredient__measurement_unit']}) — "
-                    f"{item['total_amount']}\n"
+            shopping_list = render_shopping_list(request.user, file_format)
+            if shopping_list is None:
+                return Response(
+                    {'errors': 'В списке покупок нет рецептов'},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
 
-            response = HttpResponse(
-                shopping_list, content_type='text/plain; charset=utf-8'
+            content, content_type = shopping_list
+            response = StreamingHttpResponse(
+                content, content_type=content_type
+            )
+            response['Content-Disposition'] = (
+                f'attachment; filename="shopping_list.{file_format}"'
             )
-            response['Content-Disposition'] = 'attachment; filename="shopping_list.txt"'
             return response
         except Exception as e:
             return Response(
@@ -389,6 +529,8 @@ class UserViewSet(viewsets.ModelViewSet):
     serializer_class = CustomUserSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
     pagination_class = CustomPageNumberPagination
+    cursor_ordering = None
+    count_strategy = CachedCount()
 
     def get_serializer_class(self):
         """Выбор сериализатора в зависимости от действия."""
@@ -405,12 +547,26 @@ class UserViewSet(viewsets.ModelViewSet):
             permission_classes = self.permission_classes
         return [permission() for permission in permission_classes]
 
+    def get_queryset(self):
+        """
+        Пользователи списка с флагом is_subscribed, вычисленным
+        в основном запросе для текущего пользователя.
+        """
+        queryset = super().get_queryset()
+        user = self.request.user
+        if self.action == 'list' and user.is_authenticated:
+            queryset = queryset.annotate(
+                is_subscribed=Exists(Subscription.objects.filter(
+                    user=user, author=OuterRef('pk')
+                ))
+            )
+        return queryset
+
     def retrieve(self, request, pk=None):
         """Получить пользователя по ID с валидацией."""
         try:
             # Проверяем, что pk можно преобразовать в int
             user_id = int(pk)
-            user = get_object_or_404(User, pk=user_id)
         except (ValueError, TypeError):
             # Если ID невалидный (например, {{userId}}), возвращаем 400
             return Response(
@@ -418,8 +574,14 @@ class UserViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        serializer = self.get_serializer(user)
-        return Response(serializer.data)
+        def build():
+            user = get_object_or_404(User, pk=user_id)
+            serializer = self.get_serializer(user)
+            return Response(serializer.data)
+
+        return conditional_response(
+            request, user_validators(user_id, request.user), build
+        )
 
     @action(
         detail=False,
@@ -428,8 +590,11 @@ class UserViewSet(viewsets.ModelViewSet):
     )
     def me(self, request):
         """Получить информацию о текущем пользователе."""
-        serializer = self.get_serializer(request.user)
-        return Response(serializer.data)
+        return conditional_response(
+            request,
+            user_validators(request.user, request.user),
+            lambda: Response(self.get_serializer(request.user).data)
+        )
 
     @action(
         detail=False,
@@ -454,7 +619,8 @@ class UserViewSet(viewsets.ModelViewSet):
 
         elif request.method == 'DELETE':
             if request.user.avatar:
-                request.user.avatar.delete()
+                # Файл может быть общим с другими пользователями
+                # (хранилище по хешу), его удалит команда gc_media
                 request.user.avatar = None
                 request.user.save()
             return Response(status=status.HTTP_204_NO_CONTENT)
@@ -497,6 +663,7 @@ class UserViewSet(viewsets.ModelViewSet):
     )
     def subscribe(self, request, pk=None):
         """Подписаться/отписаться от автора."""
+        pin_to_primary()
         try:
             author_id = int(pk)
             author = get_object_or_404(User, pk=author_id)
@@ -543,7 +710,8 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=[permissions.IsAuthenticated]
+        permission_classes=[permissions.IsAuthenticated],
+        cursor_ordering=('id',)
     )
     def subscriptions(self, request):
         """Получить список подписок пользователя."""
@@ -554,13 +722,53 @@ class UserViewSet(viewsets.ModelViewSet):
 
         page = self.paginate_queryset(authors)
         if page is not None:
+            self._attach_recipes(page, request)
             serializer = SubscriptionSerializer(
                 page, many=True, context={'request': request}
             )
             return self.get_paginated_response(serializer.data)
 
+        authors = list(authors)
+        self._attach_recipes(authors, request)
         serializer = SubscriptionSerializer(
             authors, many=True, context={'request': request}
         )
         return Response(serializer.data)
 
+    @staticmethod
+    def _attach_recipes(authors, request):
+        """
+        Загружает рецепты всех авторов страницы одним запросом.
+
+        Последние recipes_limit рецептов каждого автора отбираются
+        оконной функцией ROW_NUMBER() OVER (PARTITION BY author_id),
+        затем раскладываются по авторам в атрибут limited_recipes.
+        """
+        recipes_limit = request.query_params.get('recipes_limit')
+        try:
+            recipes_limit = int(recipes_limit) if recipes_limit else None
+        except ValueError:
+            # Если recipes_limit невалидный, игнорируем его
+            recipes_limit = None
+        if recipes_limit is not None and recipes_limit < 0:
+            # Отрицательный recipes_limit тоже игнорируется
+            recipes_limit = None
+
+        recipes = Recipe.objects.filter(
+            author__in=[author.pk for author in authors]
+        )
+        if recipes_limit is not None:
+            recipes = recipes.annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=F('author_id'),
+                    order_by=(F('pub_date').desc(), F('id').desc())
+                )
+            ).filter(row_number__lte=recipes_limit)
+
+        recipes_by_author = defaultdict(list)
+        for recipe in recipes.order_by('author_id', '-pub_date', '-id'):
+            recipes_by_author[recipe.author_id].append(recipe)
+        for author in authors:
+            author.limited_recipes = recipes_by_author[author.pk]
+
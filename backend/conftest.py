@@ -1,5 +1,7 @@
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
 from rest_framework.test import APIClient
 from django.core.files.uploadedfile import SimpleUploadedFile
 
@@ -7,6 +9,30 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True, scope='session')
+def locmem_cache():
+    """Кеш в памяти процесса: тесты не делят кеш с сервером и между собой."""
+    with override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'foodgram-tests',
+        }
+    }):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Очищает кеш перед каждым тестом: откат транзакции его не сбрасывает."""
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def raise_on_repeated_queries(settings):
+    """Повторяющиеся SQL запросы (N+1) в тестах - ошибка, а не запись лога."""
+    settings.SQL_REPEATED_QUERY_RAISE = True
+
+
 @pytest.fixture
 def api_client():
     """Фикстура для создания клиента API."""
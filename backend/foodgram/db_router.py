@@ -0,0 +1,133 @@
+"""
+Маршрутизация запросов к БД между основной базой и репликами.
+
+Реплики задаются DB_REPLICA_HOSTS (см. settings.DATABASE_REPLICAS).
+Чтения из запросов безопасными методами (GET, HEAD, OPTIONS) идут на
+случайную реплику, все остальное - на default:
+
+- запись и любые запросы POST/PUT/PATCH/DELETE;
+- чтения после записи в том же запросе: запрос закрепляется за основной
+  базой (pin_to_primary) пути записи избранного, корзины, подписок и
+  рецептов, а также сам роутер при любой записи;
+- чтения внутри транзакции и вне HTTP-запроса (команды, фоновые
+  задачи), где состояние запроса не задано.
+
+Чтобы пользователь сразу видел свои изменения, несмотря на отставание
+реплики, закрепленный ответ ставит cookie на DB_REPLICA_PIN_SECONDS:
+следующие запросы этого клиента тоже читают из основной базы.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingState:
+    """Состояние маршрутизации одного запроса."""
+
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        self.pinned = False
+
+
+# Изменяемый объект, а не флаг: контекст копируется в потоки
+# sync_to_async, и закрепление в потоке должно быть видно запросу
+_state = ContextVar('db_routing_state', default=None)
+
+
+def pin_to_primary():
+    """Закрепляет текущий запрос за основной базой."""
+    state = _state.get()
+    if state is not None:
+        state.pinned = True
+
+
+def is_pinned():
+    state = _state.get()
+    return state is not None and state.pinned
+
+
+def get_read_alias():
+    """Алиас для чтения с учетом состояния текущего запроса."""
+    state = _state.get()
+    replicas = settings.DATABASE_REPLICAS
+    if (
+        not replicas or state is None or not state.use_replicas
+        or state.pinned or connections[DEFAULT_DB_ALIAS].in_atomic_block
+    ):
+        return DEFAULT_DB_ALIAS
+    return random.choice(replicas)
+
+
+class PrimaryReplicaRouter:
+    """Роутер Django: чтение с реплик, запись и миграции - в default."""
+
+    def db_for_read(self, model, **hints):
+        return get_read_alias()
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """Задает состояние маршрутизации на время запроса."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _state.set(self.get_state(request))
+        try:
+            response = self.get_response(request)
+            self.process_response(request, response)
+            return response
+        finally:
+            _state.reset(token)
+
+    async def __acall__(self, request):
+        token = _state.set(self.get_state(request))
+        try:
+            response = await self.get_response(request)
+            self.process_response(request, response)
+            return response
+        finally:
+            _state.reset(token)
+
+    @staticmethod
+    def get_state(request):
+        return RoutingState(
+            request.method in SAFE_METHODS
+            and PIN_COOKIE not in request.COOKIES
+        )
+
+    @staticmethod
+    def process_response(request, response):
+        if (
+            is_pinned() and settings.DATABASE_REPLICAS
+            and settings.DB_REPLICA_PIN_SECONDS
+        ):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.DB_REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax'
+            )
@@ -0,0 +1,121 @@
+"""
+Обработчики и форматтеры логирования (см. logging_config).
+
+Записи из потока запроса только кладутся в очередь QueueHandler, а
+форматирование и запись в файлы и консоль выполняет фоновый поток
+QueueListener. Очередь ограничена: при ее переполнении запись
+отбрасывается и учитывается в dropped, запрос не ждет диска.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Атрибуты LogRecord; все остальные пришли через extra
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord(
+    '', logging.INFO, '', 0, '', (), None
+))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись одной строкой JSON: время, уровень, логгер и поля extra."""
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _get_handler(name):
+    # logging.getHandlerByName появился только в Python 3.12
+    getter = getattr(logging, 'getHandlerByName', None)
+    if getter is not None:
+        return getter(name)
+    return logging._handlers.get(name)
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    QueueHandler со своим фоновым QueueListener.
+
+    handlers - имена обработчиков из LOGGING, в которые пишет фоновый
+    поток. Поток запускается при первой записи в процессе: после fork
+    воркера gunicorn у него свой поток.
+    """
+
+    def __init__(self, handlers, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.handler_names = handlers
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._listener = QueueListener(
+                self.queue,
+                *(_get_handler(name) for name in self.handler_names),
+                respect_handler_level=True
+            )
+            self._listener.start()
+            self._pid = os.getpid()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Дописывает очередь и останавливает фоновый поток."""
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._listener = self._pid = None
+
+    def flush(self):
+        """Ждет записи всего, что уже в очереди (для тестов и выхода)."""
+        if self._pid == os.getpid():
+            self.queue.join()
+
+    def prepare(self, record):
+        # В отличие от QueueHandler.prepare, сообщение не форматируется
+        # в потоке запроса: аргументы - примитивы, их подставит фоновый
+        # поток. Трассировка исключения сохраняется текстом сразу, пока
+        # жив стек
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info
+            )
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self.start()
+        super().emit(record)
+
+    def close(self):
+        self.stop()
+        super().close()
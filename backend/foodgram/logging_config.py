@@ -1,160 +1,118 @@
 """
 Конфигурация логирования для Django проекта
+
+Все логгеры пишут в обработчик queue: запись только кладется в очередь,
+а в консоль и файлы ее выводит фоновый поток (foodgram.log). Формат
+консоли - LOG_FORMAT: json (по умолчанию) или text. Файлы с ротацией
+пишутся, если задан LOG_DIR. Выборку логов запросов по маршрутам
+настраивают REQUEST_LOG_* в settings (см. api.logging_middleware).
 """
+import os
 from pathlib import Path
 
-# Базовая директория проекта
-BASE_DIR = Path(__file__).resolve().parent.parent
-
-# Создаем папку для логов, если её нет
-LOG_DIR = BASE_DIR / 'logs'
-LOG_DIR.mkdir(exist_ok=True)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# SQL-запросы Django пишет в django.db.backends на уровне DEBUG
+SQL_LOG_LEVEL = os.getenv('SQL_LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_DIR = os.getenv('LOG_DIR', '')
 
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': (
-                '[{asctime}] {levelname} {name} {module} '
-                '{process:d} {thread:d} {pathname}:{lineno} - {message}'
-            ),
-            'style': '{',
-            'datefmt': '%Y-%m-%d %H:%M:%S',
-        },
-        'simple': {
-            'format': '[{asctime}] {levelname} {name} - {message}',
-            'style': '{',
-            'datefmt': '%Y-%m-%d %H:%M:%S',
-        },
-        'error': {
-            'format': (
-                '[{asctime}] {levelname} {name} {module} '
-                '{pathname}:{lineno} - {message}\n{exc_info}'
-            ),
-            'style': '{',
-            'datefmt': '%Y-%m-%d %H:%M:%S',
-        },
-        'sql': {
-            'format': (
-                '[{asctime}] SQL: {message}'
-            ),
-            'style': '{',
-            'datefmt': '%Y-%m-%d %H:%M:%S',
-        },
+handlers = {
+    'console': {
+        'level': 'DEBUG',
+        'class': 'logging.StreamHandler',
+        'formatter': 'json' if LOG_FORMAT == 'json' else 'simple',
     },
-    'handlers': {
+}
+queue_handlers = ['console']
+sql_handlers = ['console']
+
+if LOG_DIR:
+    Path(LOG_DIR).mkdir(parents=True, exist_ok=True)
+    handlers.update({
         'file_debug': {
             'level': 'DEBUG',
             'class': 'logging.handlers.RotatingFileHandler',
-            'filename': LOG_DIR / 'django_debug.log',
+            'filename': Path(LOG_DIR) / 'django_debug.log',
             'maxBytes': 1024 * 1024 * 10,  # 10 MB
             'backupCount': 5,
-            'formatter': 'verbose',
+            'formatter': 'json',
             'encoding': 'utf-8',
         },
         'file_error': {
             'level': 'ERROR',
             'class': 'logging.handlers.RotatingFileHandler',
-            'filename': LOG_DIR / 'django_error.log',
+            'filename': Path(LOG_DIR) / 'django_error.log',
             'maxBytes': 1024 * 1024 * 10,  # 10 MB
             'backupCount': 5,
-            'formatter': 'error',
+            'formatter': 'json',
             'encoding': 'utf-8',
         },
         'file_sql': {
             'level': 'DEBUG',
             'class': 'logging.handlers.RotatingFileHandler',
-            'filename': LOG_DIR / 'django_sql.log',
+            'filename': Path(LOG_DIR) / 'django_sql.log',
             'maxBytes': 1024 * 1024 * 10,  # 10 MB
             'backupCount': 3,
             'formatter': 'sql',
             'encoding': 'utf-8',
         },
-        'console': {
-            'level': 'INFO',
-            'class': 'logging.StreamHandler',
-            'formatter': 'simple',
+    })
+    queue_handlers = ['console', 'file_debug', 'file_error']
+    sql_handlers = ['file_sql']
+
+handlers.update({
+    # Очереди в фоновые потоки; при переполнении записи отбрасываются
+    'queue': {
+        '()': 'foodgram.log.QueueListenerHandler',
+        'handlers': queue_handlers,
+        'queue_size': 10000,
+    },
+    'queue_sql': {
+        '()': 'foodgram.log.QueueListenerHandler',
+        'handlers': sql_handlers,
+        'queue_size': 10000,
+    },
+})
+
+
+def _logger(level=LOG_LEVEL, handler='queue'):
+    return {'handlers': [handler], 'level': level, 'propagate': False}
+
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'foodgram.log.JsonFormatter',
         },
-        'console_debug': {
-            'level': 'DEBUG',
-            'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+        'simple': {
+            'format': '[{asctime}] {levelname} {name} - {message}',
+            'style': '{',
+            'datefmt': '%Y-%m-%d %H:%M:%S',
+        },
+        'sql': {
+            'format': (
+                '[{asctime}] SQL: {message}'
+            ),
+            'style': '{',
+            'datefmt': '%Y-%m-%d %H:%M:%S',
         },
     },
+    'handlers': handlers,
     'root': {
-        'handlers': ['console', 'file_debug', 'file_error'],
-        'level': 'DEBUG',
+        'handlers': ['queue'],
+        'level': LOG_LEVEL,
     },
     'loggers': {
-        'django': {
-            'handlers': ['console', 'file_debug', 'file_error'],
-            'level': 'INFO',
-            'propagate': False,
-        },
-        'django.request': {
-            'handlers': ['console_debug', 'file_debug', 'file_error'],
-            'level': 'DEBUG',
-            'propagate': False,
-        },
-        'django.server': {
-            'handlers': ['console_debug', 'file_debug'],
-            'level': 'INFO',
-            'propagate': False,
-        },
-        'django.db.backends': {
-            'handlers': ['file_sql'],
-            'level': 'DEBUG',
-            'propagate': False,
-        },
-        'django.db.backends.schema': {
-            'handlers': ['file_sql'],
-            'level': 'DEBUG',
-            'propagate': False,
-        },
-        'django.security': {
-            'handlers': ['console_debug', 'file_debug', 'file_error'],
-            'level': 'INFO',
-            'propagate': False,
-        },
-        'django.utils.autoreload': {
-            'handlers': ['console'],
-            'level': 'INFO',
-            'propagate': False,
-        },
-        # Логгеры для ваших приложений
-        'api': {
-            'handlers': ['console_debug', 'file_debug', 'file_error'],
-            'level': 'DEBUG',
-            'propagate': False,
-        },
-        'recipes': {
-            'handlers': ['console_debug', 'file_debug', 'file_error'],
-            'level': 'DEBUG',
-            'propagate': False,
-        },
-        'users': {
-            'handlers': ['console_debug', 'file_debug', 'file_error'],
-            'level': 'DEBUG',
-            'propagate': False,
-        },
-        # DRF логирование
-        'rest_framework': {
-            'handlers': ['console_debug', 'file_debug', 'file_error'],
-            'level': 'DEBUG',
-            'propagate': False,
-        },
-        # Логирование для отладки
-        'foodgram': {
-            'handlers': ['console_debug', 'file_debug', 'file_error'],
-            'level': 'DEBUG',
-            'propagate': False,
-        },
-        # Логирование для middleware
-        'api.middleware': {
-            'handlers': ['console_debug', 'file_debug', 'file_error'],
-            'level': 'DEBUG',
-            'propagate': False,
-        },
+        'django': _logger(),
+        'django.db.backends': _logger(SQL_LOG_LEVEL, 'queue_sql'),
+        'django.utils.autoreload': _logger('INFO'),
+        # Логгеры приложений
+        'api': _logger(),
+        'recipes': _logger(),
+        'users': _logger(),
+        'foodgram': _logger(),
+        'rest_framework': _logger(),
     },
 }
@@ -0,0 +1,222 @@
+"""
+Внутренние метрики.
+
+Эндпоинты доступны только из сетей METRICS_ALLOWED_NETWORKS и не
+проксируются nginx наружу.
+
+/metrics отдает метрики в формате Prometheus: гистограммы времени
+ответа по маршрутам (api:recipe-list), числа и времени SQL запросов на
+запрос, счетчики попаданий в кеши и загрузку воркеров. Если задана
+переменная окружения PROMETHEUS_MULTIPROC_DIR (ее ставит
+gunicorn.conf.py), значения пишутся в файлы этого каталога и /metrics
+суммирует все воркеры; иначе выводятся значения текущего процесса.
+
+/internal/metrics/db/ относится к процессу, который обработал запрос:
+у каждого воркера gunicorn свой пул соединений.
+"""
+import ipaddress
+import os
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+    Histogram, generate_latest, multiprocess
+)
+
+REQUEST_DURATION = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Время обработки запроса по маршрутам',
+    ['route', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter(
+    'foodgram_http_requests',
+    'Запросы по маршрутам и кодам ответа',
+    ['route', 'method', 'status'],
+)
+DB_QUERIES = Histogram(
+    'foodgram_db_queries_per_request',
+    'Число SQL запросов на запрос',
+    ['route'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+DB_DURATION = Histogram(
+    'foodgram_db_duration_seconds',
+    'Время в БД на запрос',
+    ['route'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+CACHE_REQUESTS = Counter(
+    'foodgram_cache_requests',
+    'Обращения к кешам: result=hit|miss',
+    ['cache', 'result'],
+)
+# Загрузка воркеров: доля занятых - workers_busy / workers
+REQUESTS_IN_PROGRESS = Gauge(
+    'foodgram_http_requests_in_progress',
+    'Запросы, обрабатываемые сейчас',
+    multiprocess_mode='livesum',
+)
+WORKERS = Gauge(
+    'foodgram_workers', 'Запущенные воркеры', multiprocess_mode='livesum'
+)
+WORKERS_BUSY = Gauge(
+    'foodgram_workers_busy',
+    'Воркеры, обрабатывающие хотя бы один запрос',
+    multiprocess_mode='livesum',
+)
+WORKERS.set(1)
+
+_in_progress = 0
+_in_progress_lock = threading.Lock()
+
+
+def is_internal(request):
+    """Запрос пришел из разрешенной сети (по адресу соединения)."""
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network.strip(), strict=False)
+        for network in settings.METRICS_ALLOWED_NETWORKS if network.strip()
+    )
+
+
+def get_pool_stats(connection):
+    """
+    Статистика пула psycopg соединения или None без пула.
+
+    in_use - соединения, выданные запросам; waiting - запросы, ждущие
+    соединения сейчас; wait_ms - суммарное время ожидания с запуска
+    процесса, avg_wait_ms - среднее на запрос, попавший в очередь.
+    """
+    pool = getattr(connection, 'pool', None)
+    if pool is None:
+        return None
+    stats = pool.get_stats()
+    size = stats.get('pool_size', 0)
+    available = stats.get('pool_available', 0)
+    queued = stats.get('requests_queued', 0)
+    wait_ms = stats.get('requests_wait_ms', 0)
+    return {
+        'min_size': stats.get('pool_min', 0),
+        'max_size': stats.get('pool_max', 0),
+        'size': size,
+        'available': available,
+        'in_use': size - available,
+        'waiting': stats.get('requests_waiting', 0),
+        'requests': stats.get('requests_num', 0),
+        'queued': queued,
+        'wait_ms': wait_ms,
+        'avg_wait_ms': wait_ms / queued if queued else 0,
+        'errors': stats.get('requests_errors', 0),
+        'connections_lost': stats.get('connections_lost', 0),
+    }
+
+
+def db_metrics(request):
+    """Настройки соединений и статистика пулов всех баз."""
+    if not is_internal(request):
+        return HttpResponseForbidden()
+    databases = {}
+    for alias in connections:
+        connection = connections[alias]
+        databases[alias] = {
+            'vendor': connection.vendor,
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'conn_health_checks': (
+                connection.settings_dict['CONN_HEALTH_CHECKS']
+            ),
+            'pool': get_pool_stats(connection),
+        }
+    return JsonResponse({'pid': os.getpid(), 'databases': databases})
+
+
+def record_cache(cache, hit):
+    """Учитывает обращение к кешу cache: попадание или промах."""
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def _track_in_progress(delta):
+    global _in_progress
+    with _in_progress_lock:
+        _in_progress += delta
+        REQUESTS_IN_PROGRESS.set(_in_progress)
+        WORKERS_BUSY.set(1 if _in_progress else 0)
+
+
+class MetricsMiddleware:
+    """
+    Middleware метрик запросов
+
+    Время ответа и число запросов по маршруту (имя из resolver_match,
+    для ненайденных URL - unmatched), число и время SQL запросов из
+    профиля QueryProfilerMiddleware и число запросов в обработке.
+    Подключается раньше QueryProfilerMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        _track_in_progress(1)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _track_in_progress(-1)
+        self.observe(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        _track_in_progress(1)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _track_in_progress(-1)
+        self.observe(request, response, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def observe(request, response, duration):
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match is not None else 'unmatched'
+        REQUEST_DURATION.labels(route, request.method).observe(duration)
+        REQUESTS.labels(
+            route, request.method, str(response.status_code)
+        ).inc()
+        profile = getattr(request, 'sql_profile', None)
+        if profile is not None:
+            DB_QUERIES.labels(route).observe(profile.count)
+            DB_DURATION.labels(route).observe(profile.duration)
+
+
+def get_registry():
+    """Реестр для вывода: сумма файлов всех воркеров или процесс."""
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics(request):
+    """Метрики в текстовом формате Prometheus."""
+    if not is_internal(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,29 @@
+"""Общие для приложений примеси моделей."""
+
+
+class CounterFieldsMixin:
+    """
+    Исключает денормализованные счетчики из UPDATE при save().
+
+    Счетчики меняются атомарным UPDATE с F() (см. recipes.counters);
+    сохранение всей строки записало бы значения, прочитанные до
+    параллельного изменения, и потеряло бы его. Если update_fields не
+    заданы, сохраняются загруженные поля, кроме COUNTER_FIELDS.
+    """
+    COUNTER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not args
+            and not self._state.adding
+            and not kwargs.get('force_insert')
+            and kwargs.get('update_fields') is None
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
@@ -11,8 +11,13 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import copy
 import os  # Re-add os import
 
+# Логирование: запись в очередь, вывод фоновым потоком
+# (уровни LOG_LEVEL и SQL_LOG_LEVEL, формат LOG_FORMAT, файлы в LOG_DIR)
+from .logging_config import LOGGING  # noqa: F401
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -52,17 +57,45 @@ INSTALLED_APPS = [
     "api",
 ]
 
+# EmailBackend проверяет пароль в ограниченном пуле (см. users.hashers);
+# ModelBackend не подключен, иначе неудачный вход хешировался бы второй
+# раз в потоке запроса
 AUTHENTICATION_BACKENDS = [
     'users.authentication.EmailBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]
 
+# Пароли хранятся в argon2id (users.hashers.Argon2PasswordHasher);
+# хеши PBKDF2 и с другими параметрами argon2 пересчитываются при входе.
+# Параметры по умолчанию - минимум OWASP: 19 МиБ памяти на хеш
+PASSWORD_HASHERS = [
+    'users.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_ARGON2_TIME_COST = int(os.getenv('PASSWORD_ARGON2_TIME_COST', '2'))
+PASSWORD_ARGON2_MEMORY_COST = int(
+    os.getenv('PASSWORD_ARGON2_MEMORY_COST', '19456')
+)
+PASSWORD_ARGON2_PARALLELISM = int(
+    os.getenv('PASSWORD_ARGON2_PARALLELISM', '1')
+)
+# Пул проверки паролей на процесс: одновременных хешей, мест в очереди
+# и ожидание результата (сек). Сверх очереди вход получает 429
+LOGIN_HASH_WORKERS = int(
+    os.getenv('LOGIN_HASH_WORKERS', str(min(4, os.cpu_count() or 1)))
+)
+LOGIN_HASH_QUEUE_SIZE = int(os.getenv('LOGIN_HASH_QUEUE_SIZE', '16'))
+LOGIN_HASH_TIMEOUT = float(os.getenv('LOGIN_HASH_TIMEOUT', '5'))
+
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "api.logging_middleware.LoggingMiddleware",
-    "api.logging_middleware.DatabaseQueryLoggingMiddleware",
+    "foodgram.metrics.MetricsMiddleware",
+    "api.logging_middleware.QueryProfilerMiddleware",
     "api.middleware.InvalidTokenFixMiddleware",
+    "foodgram.db_router.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -106,6 +139,93 @@ DATABASES = {
     }
 }
 
+# Кеш общий для всех процессов: воркеров gunicorn и команд manage.py.
+# Через него воркеры узнают о смене версии справочника, тегов кеша
+# ответов и снимков токенов, поэтому кеш в памяти процесса (LocMemCache)
+# для сервера не подходит и используется только в тестах (conftest.py).
+# По умолчанию - файлы в CACHE_LOCATION на локальном диске; в
+# docker-compose - Redis (CACHE_BACKEND=...redis.RedisCache,
+# CACHE_LOCATION=redis://redis:6379/1)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', '/tmp/foodgram-cache'),
+    }
+}
+if CACHES['default']['BACKEND'].endswith('FileBasedCache'):
+    # При переполнении удаляется треть записей; лимит по умолчанию (300)
+    # меньше числа страниц ленты и поисковых запросов в кеше
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '10000')),
+    }
+
+# Триграммный поиск ингредиентов использует lookups из django.contrib.postgres
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    INSTALLED_APPS.append('django.contrib.postgres')
+
+# Соединения с PostgreSQL. По умолчанию соединение живет DB_CONN_MAX_AGE
+# секунд и переиспользуется следующими запросами воркера, перед
+# повторным использованием оно проверяется (DB_CONN_HEALTH_CHECKS).
+# Профиль production (DB_POOL=True) включает пул psycopg: у каждого
+# процесса до DB_POOL_MAX_SIZE соединений, запрос берет соединение из
+# пула и возвращает в конце, ожидая свободного не дольше DB_POOL_TIMEOUT
+# секунд. Проверку соединений пула тоже включает DB_CONN_HEALTH_CHECKS,
+# а CONN_MAX_AGE с пулом должен быть 0.
+# Всего соединений: процессов gunicorn * DB_POOL_MAX_SIZE, это число
+# должно быть меньше max_connections PostgreSQL (по умолчанию 100).
+# Статистика пула: /internal/metrics/db/ (см. foodgram.metrics)
+DB_POOL = os.getenv('DB_POOL', 'False').lower() == 'true'
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = os.getenv(
+        'DB_CONN_HEALTH_CHECKS', 'True'
+    ).lower() == 'true'
+    if DB_POOL:
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '4')),
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+                'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '600')),
+            },
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(
+            os.getenv('DB_CONN_MAX_AGE', '60')
+        )
+
+# Реплики для чтения: DB_REPLICA_HOSTS=хост[:порт],... Каждая реплика
+# получает алиас replica_<n> с настройками default. GET-запросы читают с
+# реплик, запись и чтение после записи идут в default (foodgram.db_router).
+# После записи клиент DB_REPLICA_PIN_SECONDS секунд читает из default,
+# это время должно покрывать отставание репликации
+DATABASE_REPLICAS = []
+for index, address in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1
+):
+    host, _, port = address.strip().partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **copy.deepcopy(DATABASES['default']),
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        # В тестах реплика - та же база, что и default
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['foodgram.db_router.PrimaryReplicaRouter']
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', '5'))
+
+# Сети, из которых доступны внутренние метрики (/internal/metrics/).
+# nginx этот путь наружу не проксирует
+METRICS_ALLOWED_NETWORKS = os.getenv(
+    'METRICS_ALLOWED_NETWORKS',
+    '127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16'
+).split(',')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -161,12 +281,73 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.CustomPageNumberPagination',
     'PAGE_SIZE': 6,
 }
 
+# Время жизни снимка пользователя по токену в кеше (сек), 0 - проверять
+# токен в БД на каждый запрос. Выход, смена пароля и изменение
+# пользователя сбрасывают снимок в общем кеше (CACHES); это время
+# ограничивает жизнь снимков, устаревших в обход API
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', '60'))
+
+# Подсчет count в пагинации (см. api.counting): время жизни закешированного
+# точного значения и порог, выше которого на PostgreSQL используется оценка
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', '30')
+)
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGINATION_COUNT_ESTIMATE_THRESHOLD', '10000')
+)
+
+# Максимальное количество ингредиентов в ответе на поисковый запрос
+INGREDIENT_SEARCH_LIMIT = int(os.getenv('INGREDIENT_SEARCH_LIMIT', '100'))
+
+# Кеш сериализованных ответов справочника ингредиентов
+INGREDIENT_CACHE_TIMEOUT = int(os.getenv('INGREDIENT_CACHE_TIMEOUT', '86400'))
+INGREDIENT_CACHE_MAX_ENTRIES = int(
+    os.getenv('INGREDIENT_CACHE_MAX_ENTRIES', '1024')
+)
+
+# Кеш ответов для анонимных пользователей (см. api.response_cache):
+# записи сбрасываются тегами, таймаут ограничивает жизнь записей,
+# измененных в обход API (админка, команды)
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300'))
+
+# Ограничения изображений, загружаемых в формате data URI
+# (см. api.data_uri): размер файла, число пикселей и объем, который
+# декодер держит в памяти до записи во временный файл. Размер тела
+# запроса ограничивается также DATA_UPLOAD_MAX_MEMORY_SIZE и nginx
+IMAGE_UPLOAD_MAX_BYTES = int(
+    os.getenv('IMAGE_UPLOAD_MAX_BYTES', str(10 * 1024 * 1024))
+)
+IMAGE_UPLOAD_MAX_PIXELS = int(
+    os.getenv('IMAGE_UPLOAD_MAX_PIXELS', '40000000')
+)
+IMAGE_UPLOAD_SPOOL_SIZE = int(
+    os.getenv('IMAGE_UPLOAD_SPOOL_SIZE', str(1024 * 1024))
+)
+
+# Фоновая обработка изображений рецептов (см. api.images): ширины и
+# форматы уменьшенных копий, качество сжатия и число потоков обработки
+# (0 - обработка сразу после коммита в потоке запроса)
+IMAGE_VARIANT_WIDTHS = tuple(
+    int(width) for width in
+    os.getenv('IMAGE_VARIANT_WIDTHS', '320,640,1280').split(',')
+)
+IMAGE_VARIANT_FORMATS = tuple(
+    os.getenv('IMAGE_VARIANT_FORMATS', 'webp,avif').split(',')
+)
+IMAGE_VARIANT_QUALITY = int(os.getenv('IMAGE_VARIANT_QUALITY', '80'))
+IMAGE_PIPELINE_WORKERS = int(os.getenv('IMAGE_PIPELINE_WORKERS', '2'))
+
+# Асинхронные представления для чтения (см. api.async_views).
+# Включаются в профиле ASGI: под WSGI каждый такой запрос запускал бы
+# отдельный цикл событий
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False').lower() == 'true'
+
 # Djoser settings
 DJOSER = {
     'LOGIN_FIELD': 'email',
@@ -232,3 +413,42 @@ CSRF_TRUSTED_ORIGINS = [
     "http://127.0.0.1",
     "http://127.0.0.1:3000",
 ]
+
+# Выборка логов успешных запросов: доля по умолчанию и по именам
+# маршрутов, например
+# REQUEST_LOG_SAMPLE_RATES=api:recipe-list=0.1,api:ingredient-list=0.01.
+# Ошибки и запросы дольше REQUEST_LOG_SLOW_MS логируются всегда
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv('REQUEST_LOG_SAMPLE_RATE', '1'))
+REQUEST_LOG_SAMPLE_RATES = {
+    route.strip(): float(rate)
+    for route, _, rate in (
+        item.rpartition('=')
+        for item in os.getenv('REQUEST_LOG_SAMPLE_RATES', '').split(',')
+        if item.strip()
+    )
+}
+REQUEST_LOG_SLOW_MS = float(os.getenv('REQUEST_LOG_SLOW_MS', '1000'))
+
+# Профиль SQL запросов каждого запроса (api.sql_profiler, работает без
+# DEBUG): число самых медленных запросов в отчете, порог медленного
+# запроса (мс), длина отпечатка SQL и заголовок Server-Timing с временем
+# в БД. Заголовок раскрывает время БД клиентам, по умолчанию он
+# включен только при DEBUG
+SQL_PROFILER_TOP_N = int(os.getenv('SQL_PROFILER_TOP_N', '5'))
+SQL_SLOW_QUERY_MS = float(os.getenv('SQL_SLOW_QUERY_MS', '100'))
+SQL_PROFILER_MAX_SQL_LENGTH = int(
+    os.getenv('SQL_PROFILER_MAX_SQL_LENGTH', '500')
+)
+SQL_PROFILER_SERVER_TIMING = os.getenv(
+    'SQL_PROFILER_SERVER_TIMING', str(DEBUG)
+).lower() == 'true'
+# Детектор N+1: запрос с одним отпечатком, выполненный за HTTP-запрос
+# SQL_REPEATED_QUERY_THRESHOLD раз и больше, логируется вместе с местом
+# вызова (0 - детектор выключен). При SQL_REPEATED_QUERY_RAISE вместо
+# записи в лог выбрасывается RepeatedQueriesError (включено в тестах)
+SQL_REPEATED_QUERY_THRESHOLD = int(
+    os.getenv('SQL_REPEATED_QUERY_THRESHOLD', '5')
+)
+SQL_REPEATED_QUERY_RAISE = os.getenv(
+    'SQL_REPEATED_QUERY_RAISE', 'False'
+).lower() == 'true'
@@ -0,0 +1,57 @@
+"""
+Хранилище медиафайлов с адресацией по содержимому.
+
+Файл называется SHA-256 своего содержимого: <каталог>/<хеш>.<расширение>.
+Повторная загрузка того же изображения (фронтенд присылает картинку
+при каждом редактировании рецепта) не пишет файл заново, а возвращает
+имя уже сохраненного. Один файл могут использовать несколько записей,
+поэтому хранилище файлы не удаляет: это делает команда gc_media,
+которая считает ссылки из Recipe.image и User.avatar.
+"""
+import hashlib
+import os
+import posixpath
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def content_hash(content):
+    """SHA-256 содержимого файла, прочитанного кусками."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage, сохраняющий файлы под именем хеша."""
+
+    def hashed_name(self, name, content):
+        """Имя файла с тем же каталогом и расширением, что и у name."""
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, content_hash(content) + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(self.generate_filename(name), content)
+        try:
+            # Файл уже есть: обновляется только время изменения, чтобы
+            # gc_media не удалил его, пока ссылка не сохранена в БД
+            os.utime(self.path(name))
+            return name
+        except FileNotFoundError:
+            pass
+        # При одновременной записи того же файла другим процессом
+        # get_available_name добавит суффикс: получится копия,
+        # которую gc_media удалит, когда на нее не останется ссылок
+        return super().save(name, content, max_length=max_length)
+
+
+content_storage = ContentAddressedStorage()
@@ -20,9 +20,13 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .metrics import db_metrics, metrics
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path('api/', include('api.urls', namespace='api')),
+    path('internal/metrics/db/', db_metrics, name='metrics-db'),
+    path('metrics', metrics, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,27 @@
+"""
+Настройки gunicorn: читаются из рабочего каталога автоматически,
+параметры командной строки (--workers, --bind) их дополняют.
+
+Метрики Prometheus собираются в режиме нескольких процессов: воркеры
+пишут значения в файлы каталога PROMETHEUS_MULTIPROC_DIR, а /metrics
+суммирует их (см. foodgram.metrics). Переменная задается здесь, до
+запуска воркеров; каталог очищается при старте, а файлы
+завершившихся воркеров исключаются из суммы занятости.
+"""
+import os
+import shutil
+
+METRICS_DIR = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', '/tmp/foodgram-metrics'
+)
+
+
+def on_starting(server):
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
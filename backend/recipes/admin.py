@@ -27,13 +27,7 @@ class RecipeAdmin(admin.ModelAdmin):
     list_filter = ('author', 'name')
     search_fields = ('name', 'author__username')
     inlines = (RecipeIngredientInline,)
-    readonly_fields = ('favorites_count',)
-
-    def favorites_count(self, obj):
-        """Количество добавлений рецепта в избранное."""
-        return obj.favorited.count()
-
-    favorites_count.short_description = 'В избранном'
+    readonly_fields = ('favorites_count', 'in_carts_count')
 
 
 @admin.register(Favorite)
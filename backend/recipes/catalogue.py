@@ -0,0 +1,38 @@
+"""
+Версия справочника ингредиентов.
+
+Справочник почти не меняется после import_ingredients, поэтому данные,
+построенные по нему (индекс поиска, сериализованные ответы API),
+кешируются и привязываются к версии. Версия хранится в кеше Django и
+общая для всех воркеров; любое изменение справочника ее увеличивает.
+"""
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'recipes:ingredients:version'
+
+
+def _initial_version():
+    # Начальное значение зависит от времени, чтобы после вытеснения ключа
+    # из кеша версия не совпала ни с одной из использованных ранее
+    return time.time_ns() // 1000
+
+
+def get_catalogue_version():
+    """Возвращает текущую версию справочника ингредиентов."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _initial_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalogue_version():
+    """Увеличивает версию справочника, делая устаревшими все кеши."""
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        # Ключ отсутствует или был вытеснен из кеша
+        cache.add(VERSION_KEY, _initial_version(), timeout=None)
+        return cache.get(VERSION_KEY)
@@ -0,0 +1,74 @@
+"""
+Денормализованные счетчики.
+
+Recipe.favorites_count, Recipe.in_carts_count и User.recipes_count
+меняются атомарным UPDATE с F() при создании и удалении избранного,
+корзины и рецептов (см. recipes.signals), поэтому списки и админка
+не делают COUNT на каждую строку. Изменения в обход сигналов
+(bulk_create, QuerySet.update, SQL) счетчики не учитывают - их
+выравнивает команда recount_counters.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Favorite, Recipe, ShoppingCart
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно изменяет счетчик field записи pk на delta."""
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        # Счетчик не уходит в минус, даже если уже рассинхронизирован
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def count_subquery(related_model, related_field):
+    """Количество строк related_model, ссылающихся на внешнюю запись."""
+    return Coalesce(
+        Subquery(
+            related_model.objects.filter(**{related_field: OuterRef('pk')})
+            .order_by()
+            .values(related_field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+def recount(model, field, related_model, related_field):
+    """
+    Пересчитывает счетчик field по всем записям model одним UPDATE.
+
+    Обновляются только расходящиеся записи; возвращается их количество.
+    """
+    actual = count_subquery(related_model, related_field)
+    drifted = model.objects.annotate(actual=actual).exclude(
+        **{field: F('actual')}
+    )
+    return model.objects.filter(pk__in=drifted.values('pk')).update(
+        **{field: actual}
+    )
+
+
+def get_counters():
+    """Описание счетчиков: (модель, поле, связанная модель, поле связи)."""
+    return (
+        (Recipe, 'favorites_count', Favorite, 'recipe'),
+        (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+        (get_user_model(), 'recipes_count', Recipe, 'author'),
+    )
+
+
+def recount_all():
+    """Пересчитывает все счетчики; возвращает {поле: исправлено строк}."""
+    with transaction.atomic():
+        return {
+            f'{model.__name__}.{field}': recount(
+                model, field, related_model, related_field
+            )
+            for model, field, related_model, related_field in get_counters()
+        }
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from recipes.media import collect_garbage, get_reference_counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete recipe images, avatars and their variants that are not '
+        'referenced by any recipe or user'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=3600,
+            help='Keep files modified less than this many seconds ago'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List orphaned files without deleting them'
+        )
+
+    def handle(self, *args, **options):
+        references = get_reference_counts()
+        shared = sum(1 for count in references.values() if count > 1)
+        self.stdout.write(
+            f'Referenced files: {len(references)} ({shared} shared)'
+        )
+
+        deleted = collect_garbage(
+            min_age=timedelta(seconds=options['min_age']),
+            dry_run=options['dry_run']
+        )
+        for name in deleted:
+            self.stdout.write(name)
+        action = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(
+            self.style.SUCCESS(f'{action} {len(deleted)} orphaned files')
+        )
@@ -0,0 +1,219 @@
+import random
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from api.counting import invalidate_counts
+from api.response_cache import RECIPE_LIST_TAG, invalidate_tags
+from recipes.catalogue import bump_catalogue_version
+from recipes.counters import recount_all
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCart
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+USERNAME_PREFIX = 'bench_'
+
+
+def bench_email(index):
+    return f'bench{index}@example.com'
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate users, recipes, favorites, shopping carts and '
+        'subscriptions for load tests (scripts/benchmarks/api_load.py)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument(
+            '--recipes', type=int, default=1000,
+            help='Total number of recipes, authors are picked at random'
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=5000,
+            help='Total number of favorites'
+        )
+        parser.add_argument(
+            '--cart-size', type=int, default=5,
+            help='Recipes in the shopping cart of every user'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=10,
+            help='Authors followed by every user'
+        )
+        parser.add_argument('--ingredients-per-recipe', type=int, default=6)
+        parser.add_argument(
+            '--password', default='Bench-password-2024',
+            help='Password of every generated user'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete previously generated users and their data first'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('--users must be positive')
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        with transaction.atomic():
+            if options['clear']:
+                deleted, _ = User.objects.filter(
+                    username__startswith=USERNAME_PREFIX
+                ).delete()
+                self.stdout.write(f'Deleted {deleted} rows')
+            elif User.objects.filter(
+                username__startswith=USERNAME_PREFIX
+            ).exists():
+                raise CommandError(
+                    'Benchmark users already exist, use --clear'
+                )
+
+            users = self.create_users(options['users'], options['password'])
+            ingredients = self.get_ingredients()
+            recipes = self.create_recipes(
+                users, ingredients, options['recipes'],
+                options['ingredients_per_recipe']
+            )
+            favorites = self.create_pairs(
+                Favorite, users, recipes, options['favorites']
+            )
+            carts = self.create_pairs(
+                ShoppingCart, users, recipes,
+                options['cart_size'] * len(users)
+            )
+            subscriptions = self.create_subscriptions(
+                users, options['subscriptions']
+            )
+            recount_all()
+            # bulk_create не отправляет сигналы: ленту в кеше ответов
+            # и закешированные count сбрасываем явно
+            invalidate_tags(RECIPE_LIST_TAG)
+            invalidate_counts()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} users, {len(recipes)} recipes, '
+            f'{favorites} favorites, {carts} cart items, '
+            f'{subscriptions} subscriptions'
+        ))
+        self.stdout.write(
+            f'Users log in as {bench_email(0)}..'
+            f'{bench_email(len(users) - 1)} with password '
+            f'{options["password"]}'
+        )
+
+    def create_users(self, count, password):
+        # Хеш вычисляется один раз: argon2 намеренно медленный
+        password = make_password(password)
+        return User.objects.bulk_create(
+            (
+                User(
+                    username=f'{USERNAME_PREFIX}{index}',
+                    email=bench_email(index),
+                    first_name='Bench',
+                    last_name=f'User {index}',
+                    password=password,
+                )
+                for index in range(count)
+            ),
+            batch_size=self.batch_size
+        )
+
+    def get_ingredients(self):
+        ingredients = list(Ingredient.objects.all())
+        if ingredients:
+            return ingredients
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {index}', measurement_unit='г')
+            for index in range(200)
+        )
+        bump_catalogue_version()
+        return ingredients
+
+    def save_placeholder_image(self):
+        """Одно изображение на все рецепты, сохраненное в хранилище."""
+        buffer = BytesIO()
+        Image.new('RGB', (640, 480), color=(230, 126, 34)).save(
+            buffer, format='PNG'
+        )
+        # Хранилище адресует файлы по содержимому: повторный запуск
+        # возвращает имя уже сохраненного файла
+        return Recipe._meta.get_field('image').storage.save(
+            'recipes/images/bench.png', ContentFile(buffer.getvalue())
+        )
+
+    def create_recipes(self, users, ingredients, count, per_recipe):
+        image = self.save_placeholder_image()
+        recipes = Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author=self.random.choice(users),
+                    name=f'Рецепт {index}',
+                    text='Рецепт для нагрузочного тестирования',
+                    cooking_time=self.random.randint(5, 120),
+                    image=image,
+                )
+                for index in range(count)
+            ),
+            batch_size=self.batch_size
+        )
+        per_recipe = min(per_recipe, len(ingredients))
+        RecipeIngredient.objects.bulk_create(
+            (
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient,
+                    amount=self.random.randint(1, 500)
+                )
+                for recipe in recipes
+                for ingredient in self.random.sample(ingredients, per_recipe)
+            ),
+            batch_size=self.batch_size
+        )
+        return recipes
+
+    def create_pairs(self, model, users, recipes, count):
+        """Случайные уникальные пары пользователь-рецепт."""
+        count = min(count, len(users) * len(recipes))
+        pairs = set()
+        while len(pairs) < count:
+            pairs.add((
+                self.random.randrange(len(users)),
+                self.random.randrange(len(recipes)),
+            ))
+        model.objects.bulk_create(
+            (
+                model(user=users[user], recipe=recipes[recipe])
+                for user, recipe in pairs
+            ),
+            batch_size=self.batch_size
+        )
+        return count
+
+    def create_subscriptions(self, users, per_user):
+        per_user = min(per_user, len(users) - 1)
+        # Авторы выбираются среди остальных пользователей: индексы
+        # от index и выше сдвигаются на единицу
+        subscriptions = [
+            Subscription(
+                user=user,
+                author=users[author + (author >= index)]
+            )
+            for index, user in enumerate(users)
+            for author in self.random.sample(range(len(users) - 1), per_user)
+        ]
+        Subscription.objects.bulk_create(
+            subscriptions, batch_size=self.batch_size
+        )
+        return len(subscriptions)
@@ -1,10 +1,14 @@
 import csv
 import json
 import os
+import time
+from itertools import islice
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from recipes.catalogue import bump_catalogue_version
 from recipes.models import Ingredient
 
 
@@ -23,12 +27,25 @@ class Command(BaseCommand):
             default='csv',
             help='File format (csv or json)'
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows inserted with one query'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate the file and report counts without saving'
+        )
 
     def handle(self, *args, **options):
         file_path = options.get('path') or os.path.join(
             settings.BASE_DIR.parent, 'data', 'ingredients.csv'
         )
         file_format = options.get('format')
+        batch_size = options.get('batch_size')
+        dry_run = options.get('dry_run')
 
         if not os.path.exists(file_path):
             self.stdout.write(self.style.ERROR(
@@ -36,39 +53,105 @@ class Command(BaseCommand):
             ))
             return
 
+        if batch_size < 1:
+            self.stdout.write(self.style.ERROR(
+                'Batch size must be a positive number'
+            ))
+            return
+
         try:
             if file_format == 'csv':
-                self._import_from_csv(file_path)
+                rows = self._read_csv(file_path)
             elif file_format == 'json':
-                self._import_from_json(file_path)
+                rows = self._read_json(file_path)
             else:
                 self.stdout.write(self.style.ERROR(
                     f'Unknown format {file_format}'
                 ))
+                return
+            self._import(rows, batch_size, dry_run)
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Error: {e}'))
+        else:
+            if dry_run:
+                self.stdout.write(self.style.WARNING(
+                    'Dry run: no changes were saved'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Successfully imported ingredients from {file_path}'
+                ))
+        finally:
+            # Сбрасываем кеши справочника во всех воркерах
+            bump_catalogue_version()
 
-    def _import_from_csv(self, file_path):
-        with open(file_path, encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                name, measurement_unit = row
-                Ingredient.objects.get_or_create(
-                    name=name,
-                    measurement_unit=measurement_unit
+    def _import(self, rows, batch_size, dry_run):
+        """
+        Загружает ингредиенты пачками в одной транзакции.
+
+        Уникальность задается ограничением unique_ingredient по обоим
+        полям модели, поэтому обновлять при конфликте нечего: уже
+        существующие строки пропускаются (ignore_conflicts). При ошибке
+        в любой строке транзакция откатывается целиком.
+        """
+        started = time.perf_counter()
+        processed = 0
+        with transaction.atomic():
+            count_before = Ingredient.objects.count()
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                Ingredient.objects.bulk_create(
+                    [
+                        Ingredient(name=name, measurement_unit=unit)
+                        for name, unit in batch
+                    ],
+                    ignore_conflicts=True
                 )
-            self.stdout.write(self.style.SUCCESS(
-                f'Successfully imported ingredients from {file_path}'
-            ))
+                processed += len(batch)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'Processed {processed} rows '
+                    f'({processed / elapsed:.0f} rows/sec)'
+                )
+            created = Ingredient.objects.count() - count_before
+            if dry_run:
+                transaction.set_rollback(True)
+
+        self.stdout.write(
+            f'Rows: {processed}, new ingredients: {created}, '
+            f'skipped existing: {processed - created}'
+        )
 
-    def _import_from_json(self, file_path):
+    @staticmethod
+    def _clean(name, measurement_unit, line):
+        """Проверяет и нормализует одну строку файла."""
+        name = (name or '').strip()
+        measurement_unit = (measurement_unit or '').strip()
+        if not name or not measurement_unit:
+            raise CommandError(
+                f'Line {line}: name and measurement unit are required'
+            )
+        return name, measurement_unit
+
+    def _read_csv(self, file_path):
+        with open(file_path, encoding='utf-8') as f:
+            for line, row in enumerate(csv.reader(f), start=1):
+                if not row:
+                    continue
+                if len(row) != 2:
+                    raise CommandError(
+                        f'Line {line}: expected 2 columns, got {len(row)}'
+                    )
+                yield self._clean(*row, line)
+
+    def _read_json(self, file_path):
+        # Стандартный json не умеет читать массив потоково,
+        # поэтому файл разбирается целиком, а пачками идет вставка
         with open(file_path, encoding='utf-8') as f:
             data = json.load(f)
-            for item in data:
-                Ingredient.objects.get_or_create(
-                    name=item['name'],
-                    measurement_unit=item['measurement_unit']
-                )
-            self.stdout.write(self.style.SUCCESS(
-                f'Successfully imported ingredients from {file_path}'
-            ))
+        for line, item in enumerate(data, start=1):
+            yield self._clean(
+                item.get('name'), item.get('measurement_unit'), line
+            )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import recount_all
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute denormalized counters (favorites, shopping carts, '
+        'recipes per author)'
+    )
+
+    def handle(self, *args, **options):
+        for counter, fixed in recount_all().items():
+            self.stdout.write(f'{counter}: fixed {fixed} rows')
+        self.stdout.write(self.style.SUCCESS('Counters are up to date'))
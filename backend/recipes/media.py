@@ -0,0 +1,94 @@
+"""
+Учет ссылок на медиафайлы и удаление неиспользуемых.
+
+Изображения рецептов и аватары хранятся по хешу содержимого
+(см. foodgram.storage): один файл может быть у нескольких записей,
+поэтому при замене или удалении изображения файл не удаляется сразу.
+Команда gc_media считает ссылки из Recipe.image и User.avatar и удаляет
+файлы без ссылок вместе с производными от них (копии в подкаталогах
+вида <каталог>/variants/<имя оригинала>-<ширина>.<формат>).
+"""
+import posixpath
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .models import Recipe
+
+
+def get_media_fields():
+    """Поля с файлами в хранилище по хешу: (модель, имя поля)."""
+    return ((Recipe, 'image'), (get_user_model(), 'avatar'))
+
+
+def get_reference_counts():
+    """Возвращает Counter {имя файла: количество ссылающихся записей}."""
+    counts = Counter()
+    for model, field in get_media_fields():
+        names = model.objects.exclude(**{f'{field}__isnull': True}).exclude(
+            **{field: ''}
+        ).values_list(field, flat=True)
+        counts.update(names.iterator())
+    return counts
+
+
+def _walk(storage, directory):
+    """Имена всех файлов каталога хранилища, включая подкаталоги."""
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for filename in files:
+        yield posixpath.join(directory, filename)
+    for subdirectory in directories:
+        yield from _walk(storage, posixpath.join(directory, subdirectory))
+
+
+def _stem(name):
+    return posixpath.splitext(posixpath.basename(name))[0]
+
+
+def find_orphans(min_age):
+    """
+    Возвращает [(хранилище, имя файла)] файлов без ссылок.
+
+    Файлы, измененные позже чем min_age (timedelta) назад, не считаются
+    мусором: их могли только что загрузить в еще не завершенной
+    транзакции.
+    """
+    references = get_reference_counts()
+    cutoff = timezone.now() - min_age
+    orphans = []
+    for model, field_name in get_media_fields():
+        field = model._meta.get_field(field_name)
+        storage = field.storage
+        directory = field.upload_to.rstrip('/')
+        referenced_stems = {
+            _stem(name) for name in references
+            if posixpath.dirname(name) == directory
+        }
+        for name in _walk(storage, directory):
+            if posixpath.dirname(name) == directory:
+                if name in references:
+                    continue
+            elif _stem(name).rpartition('-')[0] in referenced_stems:
+                # Копия изображения, оригинал которого используется
+                continue
+            if storage.get_modified_time(name) > cutoff:
+                continue
+            orphans.append((storage, name))
+    return orphans
+
+
+def collect_garbage(min_age=timedelta(hours=1), dry_run=False):
+    """
+    Удаляет файлы без ссылок; возвращает список их имен.
+
+    При dry_run файлы только перечисляются.
+    """
+    orphans = find_orphans(min_age)
+    if not dry_run:
+        for storage, name in orphans:
+            storage.delete(name)
+    return [name for storage, name in orphans]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# Индексы на LOWER(name) для поиска по префиксу (varchar_pattern_ops)
+# и по подстроке / с опечатками (pg_trgm). Создаются только на PostgreSQL.
+POSTGRESQL_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS ingredient_name_lower_pattern_idx '
+    'ON recipes_ingredient (LOWER(name) varchar_pattern_ops)',
+    'CREATE INDEX IF NOT EXISTS ingredient_name_lower_trgm_idx '
+    'ON recipes_ingredient USING gin (LOWER(name) gin_trgm_ops)',
+)
+
+
+def create_postgresql_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for statement in POSTGRESQL_INDEXES:
+        schema_editor.execute(statement)
+
+
+def drop_postgresql_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'DROP INDEX IF EXISTS ingredient_name_lower_pattern_idx'
+    )
+    schema_editor.execute('DROP INDEX IF EXISTS ingredient_name_lower_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_postgresql_indexes, drop_postgresql_indexes
+        ),
+    ]
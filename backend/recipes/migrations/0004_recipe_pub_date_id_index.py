@@ -0,0 +1,21 @@
+# Generated by Django 5.2.2 on 2026-10-18 03:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0003_ingredient_search_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["pub_date", "id"], name="recipe_pub_date_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.2 on 2026-10-18 03:31
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(related_model):
+    return Coalesce(
+        Subquery(
+            related_model.objects.filter(recipe=OuterRef("pk"))
+            .order_by()
+            .values("recipe")
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0
+    )
+
+
+def fill_counters(apps, schema_editor):
+    apps.get_model("recipes", "Recipe").objects.update(
+        favorites_count=count_subquery(apps.get_model("recipes", "Favorite")),
+        in_carts_count=count_subquery(
+            apps.get_model("recipes", "ShoppingCart")
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_recipe_pub_date_id_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="В избранном"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="in_carts_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="В списках покупок"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-18 03:50
+
+import foodgram.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_recipe_image_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                storage=foodgram.storage.ContentAddressedStorage(),
+                upload_to="recipes/images/",
+                verbose_name="Изображение",
+            ),
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from foodgram.models import CounterFieldsMixin
+from foodgram.storage import content_storage
+
 User = get_user_model()
 
 
@@ -19,12 +22,14 @@ class Ingredient(models.Model):
                 name='unique_ingredient'
             )
         ]
+        # Поиск идет по LOWER(name): индексы для него создаются только на
+        # PostgreSQL в миграции 0003_ingredient_search_indexes
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     """Модель рецепта."""
     author = models.ForeignKey(
         User, on_delete=models.CASCADE,
@@ -33,8 +38,14 @@ class Recipe(models.Model):
     name = models.CharField(max_length=200, verbose_name='Название')
     image = models.ImageField(
         upload_to='recipes/images/',
+        storage=content_storage,
         verbose_name='Изображение'
     )
+    # Уменьшенные копии изображения (см. api.images)
+    image_variants = models.JSONField(
+        default=dict, blank=True, editable=False,
+        verbose_name='Копии изображения'
+    )
     text = models.TextField(verbose_name='Текстовое описание')
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -48,11 +59,30 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         auto_now_add=True, verbose_name='Дата публикации'
     )
+    # Для валидаторов условных запросов (ETag, Last-Modified)
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата изменения'
+    )
+    # Счетчики поддерживаются сигналами (см. recipes.counters)
+    favorites_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='В избранном'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='В списках покупок'
+    )
+
+    COUNTER_FIELDS = ('favorites_count', 'in_carts_count')
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pub_date']
+        indexes = [
+            # Для keyset-пагинации ленты по (pub_date, id)
+            models.Index(
+                fields=['pub_date', 'id'], name='recipe_pub_date_id_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
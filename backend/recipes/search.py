@@ -0,0 +1,211 @@
+"""
+Поиск ингредиентов для автодополнения.
+
+Совпадения ранжируются так: сначала названия, начинающиеся с запроса,
+затем названия, содержащие запрос, затем совпадения с одной опечаткой.
+Для коротких запросов (короче FUZZY_MIN_LENGTH) возвращаются только
+совпадения по началу названия, а вхождения подстроки - лишь если таких
+нет: иначе запрос из одной буквы добирал бы лимит случайными названиями.
+
+На PostgreSQL поиск выполняется в БД по индексам varchar_pattern_ops
+и pg_trgm (см. миграцию 0003_ingredient_search_indexes). На остальных
+СУБД используется индекс в памяти процесса: отсортированный массив
+названий для поиска по префиксу и проверка опечаток для слов названия.
+Индекс перестраивается при смене версии справочника (recipes.catalogue).
+"""
+import threading
+from bisect import bisect_left
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Lower
+
+from .catalogue import get_catalogue_version
+from .models import Ingredient
+
+# Минимальная длина запроса, с которой к совпадениям по началу названия
+# добавляются вхождения подстроки и совпадения с опечаткой
+FUZZY_MIN_LENGTH = 4
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def normalize(value):
+    """Приводит строку к виду, в котором хранится в индексе."""
+    return value.strip().lower()
+
+
+def _within_one_edit(first, second):
+    """Проверяет, что строки отличаются не более чем на одну правку."""
+    if len(first) > len(second):
+        first, second = second, first
+    if len(second) - len(first) > 1:
+        return False
+    position = 0
+    while position < len(first) and first[position] == second[position]:
+        position += 1
+    if len(first) == len(second):
+        return first[position + 1:] == second[position + 1:]
+    return first[position:] == second[position + 1:]
+
+
+class IngredientIndex:
+    """Индекс названий ингредиентов в памяти процесса."""
+
+    def __init__(self, rows):
+        """Строит индекс по парам (id, name)."""
+        self.version = None
+        entries = sorted((normalize(name), pk) for pk, name in rows)
+        self.names = [name for name, _ in entries]
+        self.ids = [pk for _, pk in entries]
+        # Хвосты названий, начинающиеся с каждого слова, - для поиска
+        # опечаток не только в начале названия
+        self.tokens = []
+        for position, name in enumerate(self.names):
+            start = 0
+            for word in name.split():
+                start = name.index(word, start)
+                self.tokens.append((name[start:], position))
+                start += len(word)
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, term, limit):
+        """Возвращает id найденных ингредиентов в порядке ранжирования."""
+        term = normalize(term)
+        if not term or limit <= 0:
+            return []
+
+        found = []
+        seen = set()
+
+        # Префикс: бинарный поиск по отсортированному массиву
+        position = bisect_left(self.names, term)
+        while (
+            position < len(self.names)
+            and self.names[position].startswith(term)
+            and len(found) < limit
+        ):
+            found.append(position)
+            seen.add(position)
+            position += 1
+        if found and len(term) < FUZZY_MIN_LENGTH:
+            return [self.ids[position] for position in found]
+
+        # Вхождение подстроки
+        if len(found) < limit:
+            for position, name in enumerate(self.names):
+                if position not in seen and term in name:
+                    found.append(position)
+                    seen.add(position)
+                    if len(found) >= limit:
+                        break
+
+        # Одна опечатка в начале названия или одного из его слов
+        if len(found) < limit and len(term) >= FUZZY_MIN_LENGTH:
+            fuzzy = sorted({
+                position for token, position in self.tokens
+                if position not in seen and self._is_fuzzy_prefix(term, token)
+            })
+            found.extend(fuzzy[:limit - len(found)])
+
+        return [self.ids[position] for position in found]
+
+    @staticmethod
+    def _is_fuzzy_prefix(term, token):
+        """
+        Проверяет, что term отличается от префикса token одной правкой.
+
+        При одной правке одна из половин запроса совпадает с токеном
+        точно: первая - как префикс, вторая - со сдвигом не более чем
+        на символ. Это дешевое условие отсекает почти все токены до
+        посимвольного сравнения.
+        """
+        length = len(term)
+        half = length // 2
+        if not (
+            token.startswith(term[:half])
+            or term[half:] in token[half - 1:length + 1]
+        ):
+            return False
+        return any(
+            _within_one_edit(term, token[:size])
+            for size in (length, length + 1, length - 1)
+        )
+
+
+def get_index():
+    """
+    Возвращает индекс ингредиентов.
+
+    Индекс строится при первом обращении и перестраивается,
+    когда меняется версия справочника.
+    """
+    global _index
+    version = get_catalogue_version()
+    index = _index
+    if index is None or index.version != version:
+        with _index_lock:
+            if _index is None or _index.version != version:
+                _index = IngredientIndex(
+                    Ingredient.objects.values_list('id', 'name')
+                )
+                _index.version = version
+            index = _index
+    return index
+
+
+def _search_ids_postgresql(queryset, term, limit):
+    """
+    Поиск средствами PostgreSQL по индексам на LOWER(name).
+
+    Сначала выбираются совпадения по префиксу: LIKE 'term%' использует
+    индекс varchar_pattern_ops. Если их меньше limit и запрос не короче
+    FUZZY_MIN_LENGTH (или совпадений по префиксу нет), остаток
+    добирается совпадениями по подстроке и с опечатками (индекс pg_trgm).
+    """
+    term = normalize(term)
+    queryset = queryset.annotate(name_lower=Lower('name'))
+    ids = list(
+        queryset.filter(name_lower__startswith=term)
+        .order_by('name').values_list('pk', flat=True)[:limit]
+    )
+    if len(ids) >= limit or (ids and len(term) < FUZZY_MIN_LENGTH):
+        return ids
+    ranked = queryset.filter(
+        Q(name_lower__contains=term)
+        | Q(name_lower__trigram_word_similar=term)
+    ).exclude(
+        name_lower__startswith=term
+    ).annotate(
+        rank=Case(
+            When(name_lower__contains=term, then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    ).order_by('rank', 'name')
+    return ids + list(
+        ranked.values_list('pk', flat=True)[:limit - len(ids)]
+    )
+
+
+def search_ingredients(queryset, term, limit):
+    """
+    Фильтрует queryset ингредиентов по строке поиска.
+
+    Возвращает QuerySet не более чем из limit ингредиентов,
+    упорядоченных по рангу совпадения и названию.
+    """
+    if connection.vendor == 'postgresql':
+        ids = _search_ids_postgresql(queryset, term, limit)
+    else:
+        ids = get_index().search(term, limit)
+    if not ids:
+        return queryset.none()
+    ordering = Case(
+        *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(pk__in=ids).order_by(ordering)
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalogue import bump_catalogue_version
+from .counters import change_counter
+from .models import Favorite, Ingredient, Recipe, ShoppingCart
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_ingredients_version(sender, **kwargs):
+    """Увеличивает версию справочника при изменении ингредиента."""
+    bump_catalogue_version()
+    # Повторно после коммита: кеш, перестроенный другим воркером
+    # до фиксации транзакции, мог попасть под уже новую версию
+    transaction.on_commit(bump_catalogue_version)
+
+
+def _delta(signal, created):
+    """Изменение счетчика: +1 при создании, -1 при удалении, иначе 0."""
+    if signal is post_delete:
+        return -1
+    return 1 if created else 0
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def update_favorites_count(sender, instance, signal, created=False,
+                           raw=False, **kwargs):
+    """Поддерживает Recipe.favorites_count."""
+    delta = _delta(signal, created)
+    if delta and not raw:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', delta)
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def update_in_carts_count(sender, instance, signal, created=False,
+                          raw=False, **kwargs):
+    """Поддерживает Recipe.in_carts_count."""
+    delta = _delta(signal, created)
+    if delta and not raw:
+        change_counter(Recipe, instance.recipe_id, 'in_carts_count', delta)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def update_recipes_count(sender, instance, signal, created=False,
+                         raw=False, **kwargs):
+    """Поддерживает User.recipes_count автора."""
+    delta = _delta(signal, created)
+    if delta and not raw:
+        change_counter(
+            get_user_model(), instance.author_id, 'recipes_count', delta
+        )
@@ -0,0 +1,125 @@
+import base64
+import io
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from PIL import Image
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+def image_data_uri():
+    """Небольшое изображение в формате data URI."""
+    img = Image.new('RGB', (10, 10), color='red')
+    img_io = io.BytesIO()
+    img.save(img_io, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        img_io.getvalue()
+    ).decode()
+
+
+@pytest.mark.django_db
+class TestCounters:
+    """Тесты денормализованных счетчиков."""
+
+    def test_favorite_counter(self, authenticated_client, recipe):
+        """favorites_count меняется при добавлении и удалении из избранного."""
+        url = reverse('api:recipe-favorite', kwargs={'pk': recipe.id})
+
+        authenticated_client.post(url)
+        recipe.refresh_from_db()
+        assert recipe.favorites_count == 1
+
+        authenticated_client.delete(url)
+        recipe.refresh_from_db()
+        assert recipe.favorites_count == 0
+
+    def test_shopping_cart_counter(self, authenticated_client, recipe):
+        """in_carts_count меняется при работе со списком покупок."""
+        url = reverse('api:recipe-shopping-cart', kwargs={'pk': recipe.id})
+
+        authenticated_client.post(url)
+        recipe.refresh_from_db()
+        assert recipe.in_carts_count == 1
+
+        authenticated_client.delete(url)
+        recipe.refresh_from_db()
+        assert recipe.in_carts_count == 0
+
+    def test_recipes_counter(self, authenticated_client, user, ingredient):
+        """recipes_count автора меняется при создании и удалении рецепта."""
+        response = authenticated_client.post(
+            reverse('api:recipe-list'),
+            {
+                'name': 'Новый рецепт',
+                'text': 'Описание',
+                'cooking_time': 10,
+                'image': image_data_uri(),
+                'ingredients': [{'id': ingredient.id, 'amount': 5}],
+            },
+            format='json'
+        )
+        user.refresh_from_db()
+        assert user.recipes_count == 1
+
+        authenticated_client.delete(
+            reverse('api:recipe-detail', kwargs={'pk': response.data['id']})
+        )
+        user.refresh_from_db()
+        assert user.recipes_count == 0
+
+    def test_counter_not_negative(self, user, recipe):
+        """Удаление при уже обнуленном счетчике не уводит его в минус."""
+        favorite = Favorite.objects.create(user=user, recipe=recipe)
+        Recipe.objects.filter(pk=recipe.pk).update(favorites_count=0)
+
+        favorite.delete()
+
+        recipe.refresh_from_db()
+        assert recipe.favorites_count == 0
+
+    def test_save_keeps_counters(self, user, admin_user, recipe):
+        """Сохранение загруженной ранее записи не затирает счетчики."""
+        stale_user = user.__class__.objects.get(pk=user.pk)
+        Favorite.objects.create(user=admin_user, recipe=recipe)
+        ShoppingCart.objects.create(user=admin_user, recipe=recipe)
+        Recipe.objects.create(
+            name='Второй', text='Описание', cooking_time=5,
+            image='test_image.jpg', author=user
+        )
+
+        recipe.name = 'Новое название'
+        recipe.save()
+        stale_user.set_password('Sup3r-secret-pass')
+        stale_user.save()
+
+        recipe.refresh_from_db()
+        user.refresh_from_db()
+        assert recipe.name == 'Новое название'
+        assert (recipe.favorites_count, recipe.in_carts_count) == (1, 1)
+        assert user.check_password('Sup3r-secret-pass')
+        assert user.recipes_count == 2
+
+    def test_recount_command(self, user, admin_user, recipe):
+        """Команда recount_counters исправляет рассинхронизацию."""
+        # bulk_create не отправляет сигналы - счетчики отстают
+        Favorite.objects.bulk_create([
+            Favorite(user=user, recipe=recipe),
+            Favorite(user=admin_user, recipe=recipe),
+        ])
+        ShoppingCart.objects.bulk_create([
+            ShoppingCart(user=user, recipe=recipe),
+        ])
+        user.__class__.objects.filter(pk=user.pk).update(recipes_count=7)
+
+        out = StringIO()
+        call_command('recount_counters', stdout=out)
+
+        recipe.refresh_from_db()
+        user.refresh_from_db()
+        assert recipe.favorites_count == 2
+        assert recipe.in_carts_count == 1
+        assert user.recipes_count == 1
+        assert 'Recipe.favorites_count: fixed 1 rows' in out.getvalue()
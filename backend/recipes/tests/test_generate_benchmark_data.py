@@ -0,0 +1,96 @@
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import F
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+
+def generate(*args):
+    out = StringIO()
+    call_command(
+        'generate_benchmark_data', '--users', '5', '--recipes', '20',
+        '--favorites', '30', '--cart-size', '2', '--subscriptions', '3',
+        *args, stdout=out
+    )
+    return out.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.mark.django_db
+class TestGenerateBenchmarkData:
+
+    def test_counts(self):
+        output = generate()
+
+        assert User.objects.filter(username__startswith='bench_').count() == 5
+        assert Recipe.objects.count() == 20
+        assert Favorite.objects.count() == 30
+        assert ShoppingCart.objects.count() == 10
+        assert Subscription.objects.count() == 15
+        assert not Subscription.objects.filter(
+            user=F('author')
+        ).exists()
+        assert Ingredient.objects.exists()
+        assert 'Created 5 users, 20 recipes' in output
+
+    def test_counters_recounted(self):
+        generate()
+
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        assert recipe.favorites_count == recipe.favorited.count()
+        author = User.objects.get(username='bench_0')
+        assert author.recipes_count == author.recipes.count()
+
+    def test_users_can_log_in(self):
+        generate('--password', 'Secret-pass-1')
+
+        user = User.objects.get(email='bench4@example.com')
+        assert user.check_password('Secret-pass-1')
+
+    def test_reproducible_with_clear(self):
+        generate()
+        favorites = set(Favorite.objects.values_list(
+            'user__username', 'recipe__name'
+        ))
+
+        with pytest.raises(CommandError):
+            generate()
+        generate('--clear')
+
+        assert set(Favorite.objects.values_list(
+            'user__username', 'recipe__name'
+        )) == favorites
+
+    def test_image_saved(self):
+        generate()
+
+        image = Recipe.objects.first().image
+        assert image.storage.exists(image.name)
+        assert Recipe.objects.exclude(image=image.name).count() == 0
+
+    def test_caches_invalidated(self, django_capture_on_commit_callbacks):
+        client = APIClient()
+        url = reverse('api:recipe-list')
+        assert client.get(url).json()['count'] == 0
+
+        with django_capture_on_commit_callbacks(execute=True):
+            generate()
+
+        # Кеш ответа анонимам и закешированный count сброшены
+        assert client.get(url).json()['count'] == 20
+        client.force_authenticate(User.objects.get(username='bench_0'))
+        assert client.get(url).json()['count'] == 20
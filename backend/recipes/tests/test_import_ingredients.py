@@ -0,0 +1,75 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from recipes.models import Ingredient
+
+
+def run_import(path, *args):
+    """Запускает import_ingredients и возвращает его вывод."""
+    out = StringIO()
+    call_command('import_ingredients', '--path', str(path), *args, stdout=out)
+    return out.getvalue()
+
+
+@pytest.mark.django_db
+class TestImportIngredients:
+    """Тесты команды import_ingredients."""
+
+    @pytest.fixture
+    def csv_file(self, tmp_path):
+        """CSV-файл с ингредиентами, включая дубликат."""
+        path = tmp_path / 'ingredients.csv'
+        path.write_text(
+            'соль,г\nсахар,г\nмолоко,мл\nсоль,г\n', encoding='utf-8'
+        )
+        return path
+
+    def test_import_csv(self, csv_file):
+        """Импорт CSV с пропуском дубликатов."""
+        output = run_import(csv_file, '--batch-size', '2')
+
+        assert Ingredient.objects.count() == 3
+        assert 'rows/sec' in output
+        assert 'new ingredients: 3' in output
+
+    def test_import_is_idempotent(self, csv_file):
+        """Повторный импорт не создает дубликатов."""
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+
+        output = run_import(csv_file)
+
+        assert Ingredient.objects.count() == 3
+        assert 'skipped existing: 2' in output
+
+    def test_import_json(self, tmp_path):
+        """Импорт JSON."""
+        path = tmp_path / 'ingredients.json'
+        path.write_text(json.dumps([
+            {'name': 'соль', 'measurement_unit': 'г'},
+            {'name': 'молоко', 'measurement_unit': 'мл'},
+        ]), encoding='utf-8')
+
+        run_import(path, '--format', 'json')
+
+        assert Ingredient.objects.count() == 2
+
+    def test_dry_run(self, csv_file):
+        """В режиме --dry-run ничего не сохраняется."""
+        output = run_import(csv_file, '--dry-run')
+
+        assert Ingredient.objects.count() == 0
+        assert 'new ingredients: 3' in output
+        assert 'Dry run' in output
+
+    def test_invalid_row_rolls_back(self, tmp_path):
+        """Ошибка в строке откатывает весь импорт."""
+        path = tmp_path / 'ingredients.csv'
+        path.write_text('соль,г\nсахар\n', encoding='utf-8')
+
+        output = run_import(path, '--batch-size', '1')
+
+        assert Ingredient.objects.count() == 0
+        assert 'Line 2' in output
@@ -0,0 +1,140 @@
+import hashlib
+import io
+import os
+import time
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from PIL import Image
+
+from foodgram.storage import content_storage
+from recipes.media import collect_garbage, get_reference_counts
+from recipes.models import Recipe
+
+
+def png_bytes(color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (10, 10), color=color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def make_old(path):
+    """Сдвигает время изменения файла на два часа назад."""
+    old = time.time() - 7200
+    os.utime(path, (old, old))
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+class TestContentAddressedStorage:
+    """Тесты хранилища с именами по хешу содержимого."""
+
+    def test_name_is_content_hash(self, media_root):
+        """Файл называется SHA-256 содержимого с исходным расширением."""
+        content = png_bytes()
+
+        name = content_storage.save(
+            'recipes/images/photo.PNG', ContentFile(content)
+        )
+
+        digest = hashlib.sha256(content).hexdigest()
+        assert name == f'recipes/images/{digest}.png'
+        assert (media_root / name).read_bytes() == content
+
+    def test_same_content_written_once(self, media_root):
+        """Повторное сохранение того же содержимого не пишет файл."""
+        first = content_storage.save('recipes/images/a.png',
+                                     ContentFile(png_bytes()))
+        make_old(media_root / first)
+        mtime = os.path.getmtime(media_root / first)
+
+        second = content_storage.save('recipes/images/b.png',
+                                      ContentFile(png_bytes()))
+
+        assert second == first
+        assert len(os.listdir(media_root / 'recipes/images')) == 1
+        # Время изменения обновлено, чтобы gc_media не удалил файл
+        assert os.path.getmtime(media_root / first) > mtime
+
+    def test_different_content(self, media_root):
+        """Разное содержимое сохраняется в разные файлы."""
+        first = content_storage.save('recipes/images/a.png',
+                                     ContentFile(png_bytes('red')))
+        second = content_storage.save('recipes/images/a.png',
+                                      ContentFile(png_bytes('blue')))
+
+        assert first != second
+
+
+@pytest.mark.django_db
+class TestMediaGarbageCollection:
+    """Тесты учета ссылок и удаления неиспользуемых файлов."""
+
+    def _save(self, media_root, name, color):
+        name = content_storage.save(name, ContentFile(png_bytes(color)))
+        make_old(media_root / name)
+        return name
+
+    def test_reference_counts(self, media_root, recipe, user, admin_user):
+        """Одинаковые изображения учитываются как один файл."""
+        name = self._save(media_root, 'users/avatars/a.png', 'red')
+        user.avatar = admin_user.avatar = name
+        user.save()
+        admin_user.save()
+
+        counts = get_reference_counts()
+
+        assert counts[name] == 2
+        assert counts[recipe.image.name] == 1
+
+    def test_collect_garbage(self, media_root, recipe, user):
+        """Удаляются только файлы и копии без ссылок."""
+        used = self._save(media_root, 'recipes/images/a.png', 'red')
+        orphan = self._save(media_root, 'recipes/images/b.png', 'blue')
+        avatar = self._save(media_root, 'users/avatars/c.png', 'green')
+        Recipe.objects.filter(pk=recipe.pk).update(image=used)
+        variants = media_root / 'recipes/images/variants'
+        variants.mkdir()
+        for name in (used, orphan):
+            stem = os.path.splitext(os.path.basename(name))[0]
+            path = variants / f'{stem}-320.webp'
+            path.write_bytes(b'variant')
+            make_old(path)
+        user.avatar = avatar
+        user.save()
+
+        deleted = collect_garbage()
+
+        orphan_stem = os.path.splitext(os.path.basename(orphan))[0]
+        assert sorted(deleted) == sorted([
+            orphan, f'recipes/images/variants/{orphan_stem}-320.webp'
+        ])
+        assert (media_root / used).exists()
+        assert (media_root / avatar).exists()
+        assert not (media_root / orphan).exists()
+
+    def test_recent_files_kept(self, media_root, recipe):
+        """Свежие файлы без ссылок не удаляются."""
+        name = content_storage.save('recipes/images/new.png',
+                                    ContentFile(png_bytes('blue')))
+
+        assert collect_garbage() == []
+        assert collect_garbage(min_age=timedelta(0)) == [name]
+
+    def test_command_dry_run(self, media_root, recipe):
+        """--dry-run только перечисляет файлы."""
+        orphan = self._save(media_root, 'recipes/images/b.png', 'blue')
+        out = StringIO()
+
+        call_command('gc_media', '--dry-run', stdout=out)
+
+        assert orphan in out.getvalue()
+        assert 'Would delete 1 orphaned files' in out.getvalue()
+        assert (media_root / orphan).exists()
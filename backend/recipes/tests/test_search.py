@@ -0,0 +1,86 @@
+import pytest
+
+from recipes.models import Ingredient
+from recipes.search import IngredientIndex, get_index, search_ingredients
+
+
+class TestIngredientIndex:
+    """Тесты индекса ингредиентов в памяти процесса."""
+
+    @pytest.fixture
+    def index(self):
+        """Индекс по небольшому справочнику."""
+        return IngredientIndex([
+            (1, 'молоко'),
+            (2, 'кокосовое молоко'),
+            (3, 'моллюски'),
+            (4, 'сахар'),
+            (5, 'Соль'),
+            (6, 'абрикосовый сок'),
+        ])
+
+    def test_prefix_search(self, index):
+        """Поиск по префиксу названия."""
+        assert index.search('молок', 10) == [1, 2]
+        assert index.search('мол', 10) == [3, 1]
+
+    def test_prefix_case_insensitive(self, index):
+        """Регистр запроса и названия не учитывается."""
+        assert index.search('СОЛ', 10) == [5]
+
+    def test_prefix_ranked_before_substring(self, index):
+        """Совпадения по префиксу идут раньше вхождений подстроки."""
+        result = index.search('молоко', 10)
+        assert result == [1, 2]
+
+    def test_short_term_prefix_only(self, index):
+        """Короткий запрос возвращает только совпадения по началу названия."""
+        assert index.search('с', 10) == [4, 5]
+        assert index.search('м', 10) == [3, 1]
+
+    def test_substring_search(self, index):
+        """Поиск по вхождению подстроки."""
+        assert index.search('сок', 10) == [6]
+
+    def test_fuzzy_search(self, index):
+        """Совпадения с одной опечаткой."""
+        assert index.search('малоко', 10) == [2, 1]
+        assert index.search('сахр', 10) == [4]
+
+    def test_fuzzy_skipped_for_short_terms(self, index):
+        """Для коротких запросов опечатки не ищутся."""
+        assert index.search('са', 10) == [4]
+
+    def test_limit(self, index):
+        """Количество результатов ограничено limit."""
+        assert index.search('мол', 2) == [3, 1]
+
+    def test_no_results(self, index):
+        """Поиск без совпадений."""
+        assert index.search('x' * 100, 10) == []
+        assert index.search('', 10) == []
+
+
+@pytest.mark.django_db
+class TestSearchIngredients:
+    """Тесты поиска ингредиентов по queryset."""
+
+    def test_search_returns_ranked_queryset(self):
+        """Результат - queryset в порядке ранжирования."""
+        Ingredient.objects.create(name='кокосовое молоко', measurement_unit='мл')
+        Ingredient.objects.create(name='молоко', measurement_unit='мл')
+
+        result = search_ingredients(Ingredient.objects.all(), 'молоко', 10)
+
+        assert [item.name for item in result] == ['молоко', 'кокосовое молоко']
+
+    def test_index_invalidated_on_save_and_delete(self):
+        """Индекс перестраивается после изменения справочника."""
+        salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        assert len(get_index()) == 1
+
+        Ingredient.objects.create(name='сахар', measurement_unit='г')
+        assert len(get_index()) == 2
+
+        salt.delete()
+        assert len(get_index()) == 1
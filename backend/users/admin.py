@@ -10,7 +10,10 @@ User = get_user_model()
 class UserAdmin(BaseUserAdmin):
     """Админ-панель для модели User."""
     search_fields = ('email', 'username')
-    list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff')
+    list_display = (
+        'username', 'email', 'first_name', 'last_name', 'is_staff',
+        'recipes_count'
+    )
 
 
 @admin.register(Subscription)
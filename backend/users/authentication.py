@@ -1,18 +1,148 @@
+from hashlib import sha256
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.fields.files import FieldFile
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from foodgram.metrics import record_cache
+
+from .hashers import verify_login_password
 
 User = get_user_model()
 
+TOKEN_CACHE_PREFIX = 'auth:token:'
+# Поля пользователя в кеше, в порядке полей модели (как ожидает
+# Model.from_db). Остальные (пароль, last_login, счетчики) отложены и
+# загружаются из БД при обращении; save() сохраняет только загруженные
+# поля, поэтому снимок не перезаписывает остальные
+SNAPSHOT_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in {
+        'id', 'email', 'username', 'first_name', 'last_name', 'avatar',
+        'is_active', 'is_staff', 'is_superuser', 'updated_at',
+    }
+)
+
 
 class EmailBackend(ModelBackend):
-    """Аутентификация по email."""
+    """
+    Аутентификация по email.
+
+    Пароль проверяется в пуле users.hashers; устаревший хеш
+    заменяется новым после успешной проверки.
+    """
 
     def authenticate(self, request, username=None, password=None, **kwargs):
-        try:
-            user = User.objects.get(email=username)
-        except User.DoesNotExist:
+        if username is None:
+            # djoser передает email под именем USERNAME_FIELD
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
             return None
+        user = User.objects.filter(email=username).first()
 
-        if user.check_password(password) and self.user_can_authenticate(user):
+        is_correct, new_encoded = verify_login_password(
+            password, user.password if user is not None else None
+        )
+        if not is_correct:
+            return None
+        if new_encoded is not None:
+            user.password = new_encoded
+            user.save(update_fields=['password'])
+        if self.user_can_authenticate(user):
             return user
         return None
+
+
+def token_cache_key(key):
+    """Ключ кеша токена: в ключе хеш, а не сам токен."""
+    return TOKEN_CACHE_PREFIX + sha256(key.encode()).hexdigest()
+
+
+def make_snapshot(user):
+    values = []
+    for name in SNAPSHOT_FIELDS:
+        value = getattr(user, name)
+        values.append(value.name if isinstance(value, FieldFile) else value)
+    return tuple(values)
+
+
+def from_snapshot(snapshot):
+    """Пользователь из снимка, как загруженный .only(*SNAPSHOT_FIELDS)."""
+    return User.from_db(DEFAULT_DB_ALIAS, SNAPSHOT_FIELDS, snapshot)
+
+
+def _token_queryset(key):
+    return Token.objects.select_related('user').only(
+        'key', *(f'user__{name}' for name in SNAPSHOT_FIELDS)
+    ).filter(key=key)
+
+
+def get_token_user(key):
+    """
+    Пользователь токена или None для неизвестного токена.
+
+    Снимок пользователя хранится в кеше AUTH_TOKEN_CACHE_TIMEOUT
+    секунд; сигналы users.signals удаляют его при выходе, смене пароля
+    и любом изменении пользователя.
+    """
+    cache_key = token_cache_key(key)
+    snapshot = cache.get(cache_key)
+    record_cache('auth_token', snapshot is not None)
+    if snapshot is None:
+        token = _token_queryset(key).first()
+        if token is None:
+            return None
+        snapshot = make_snapshot(token.user)
+        cache.set(cache_key, snapshot, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+    return from_snapshot(snapshot)
+
+
+async def aget_token_user(key):
+    """Асинхронный вариант get_token_user."""
+    cache_key = token_cache_key(key)
+    snapshot = await cache.aget(cache_key)
+    record_cache('auth_token', snapshot is not None)
+    if snapshot is None:
+        token = await _token_queryset(key).afirst()
+        if token is None:
+            return None
+        snapshot = make_snapshot(token.user)
+        await cache.aset(
+            cache_key, snapshot, settings.AUTH_TOKEN_CACHE_TIMEOUT
+        )
+    return from_snapshot(snapshot)
+
+
+def forget_tokens(user_id):
+    """Удаляет из кеша снимки по всем токенам пользователя."""
+    keys = Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без запроса Token JOIN User на каждый запрос.
+
+    Ответы и ошибки те же, что у TokenAuthentication. request.auth -
+    несохраненный Token с ключом и user_id. При
+    AUTH_TOKEN_CACHE_TIMEOUT = 0 кеш не используется.
+    """
+
+    def authenticate_credentials(self, key):
+        if not settings.AUTH_TOKEN_CACHE_TIMEOUT:
+            return super().authenticate_credentials(key)
+        user = get_token_user(key)
+        if user is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return (user, Token(key=key, user_id=user.pk))
@@ -0,0 +1,108 @@
+"""
+Хеширование паролей при входе.
+
+Проверка пароля - самая дорогая часть входа, и при волне логинов
+(прогоны Newman, рассылки) воркеры упираются в CPU. Поэтому проверка
+выполняется в отдельном ограниченном пуле потоков процесса: не больше
+LOGIN_HASH_WORKERS хешей одновременно и не больше LOGIN_HASH_QUEUE_SIZE
+в очереди. Если очередь заполнена или ответа нет за LOGIN_HASH_TIMEOUT
+секунд, вход отклоняется с 429 и Retry-After, а не копится в воркерах.
+Потоков достаточно: argon2-cffi и hashlib отпускают GIL на время хеша.
+
+Пароли хранятся в argon2id с параметрами из настроек
+(PASSWORD_ARGON2_*). Хеши других алгоритмов и с другими параметрами
+пересчитываются при успешном входе.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework.exceptions import Throttled
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2id с настраиваемой стоимостью."""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class LoginThrottled(Throttled):
+    default_detail = 'Слишком много попыток входа, повторите позже.'
+
+
+class HashingPool:
+    """Пул потоков с ограничением числа задач в работе и в очереди."""
+
+    def __init__(self, workers, queue_size, timeout):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='login-hash'
+        )
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def run(self, function, *args):
+        """Результат function(*args) из пула или LoginThrottled."""
+        if not self._slots.acquire(blocking=False):
+            raise LoginThrottled(wait=self.timeout)
+        try:
+            future = self._executor.submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Слот свободен, только когда задача завершилась, а не когда
+        # запрос перестал ее ждать
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise LoginThrottled(wait=self.timeout)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Пул процесса; создается при первом входе, уже после fork."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(
+                    settings.LOGIN_HASH_WORKERS,
+                    settings.LOGIN_HASH_QUEUE_SIZE,
+                    settings.LOGIN_HASH_TIMEOUT,
+                )
+    return _pool
+
+
+def _verify(password, encoded):
+    if encoded is None:
+        # Непригодный хеш: verify_password хеширует случайную строку
+        encoded = hashers.make_password(None)
+    is_correct, must_update = hashers.verify_password(password, encoded)
+    if is_correct and must_update:
+        return True, hashers.make_password(password)
+    return is_correct, None
+
+
+def verify_login_password(password, encoded):
+    """
+    Проверяет пароль в пуле: (верен ли, новый хеш или None).
+
+    Для encoded = None (нет пользователя) хешируется случайная строка,
+    чтобы время ответа не выдавало существование email.
+    """
+    return get_pool().run(_verify, password, encoded)
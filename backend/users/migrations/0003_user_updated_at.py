@@ -0,0 +1,30 @@
+# Generated by Django 5.2.2 on 2026-10-18 04:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fill_updated_at(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    User.objects.update(updated_at=models.F("date_joined"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_user_recipes_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name="Дата изменения",
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.2 on 2026-10-18 03:50
+
+import foodgram.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_user_updated_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="avatar",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=foodgram.storage.ContentAddressedStorage(),
+                upload_to="users/avatars/",
+                verbose_name="Аватар",
+            ),
+        ),
+    ]
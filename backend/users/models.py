@@ -1,8 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
+from foodgram.models import CounterFieldsMixin
+from foodgram.storage import content_storage
 
-class User(AbstractUser):
+
+class User(CounterFieldsMixin, AbstractUser):
     """Кастомная модель пользователя."""
     username = models.CharField(
         max_length=150,
@@ -31,10 +34,21 @@ class User(AbstractUser):
     )
     avatar = models.ImageField(
         upload_to='users/avatars/',
+        storage=content_storage,
         blank=True,
         null=True,
         verbose_name='Аватар'
     )
+    # Для валидаторов условных запросов (ETag, Last-Modified)
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name='Дата изменения'
+    )
+    # Поддерживается сигналами приложения recipes (см. recipes.counters)
+    recipes_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество рецептов'
+    )
+
+    COUNTER_FIELDS = ('recipes_count',)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
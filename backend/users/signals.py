@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import forget_tokens, token_cache_key
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Выход (djoser token/logout) удаляет токен - и его снимок в кеше."""
+    cache.delete(token_cache_key(instance.key))
+
+
+@receiver(post_save, sender=get_user_model())
+def forget_user_snapshot(sender, instance, created=False, update_fields=None,
+                         **kwargs):
+    """Смена пароля, деактивация и правка профиля сбрасывают снимок."""
+    if created or (update_fields and set(update_fields) == {'last_login'}):
+        return
+    forget_tokens(instance.pk)
@@ -1,6 +1,18 @@
+import threading
+
 import pytest
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
-from users.authentication import EmailBackend
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import async_views
+from users import hashers
+from users.authentication import EmailBackend, token_cache_key
 
 User = get_user_model()
 
@@ -78,3 +90,209 @@ class TestEmailBackend:
         )
 
         assert authenticated_user is None
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user)
+
+
+@pytest.fixture
+def token_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def count_queries(client, path='/api/users/me/'):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(path)
+    assert response.status_code == 200
+    return len(queries)
+
+
+@pytest.mark.django_db
+class TestCachedTokenAuthentication:
+    """Тесты кеширующей аутентификации по токену."""
+
+    def test_cached_request_skips_token_query(self, token_client, token):
+        """Повторный запрос не обращается к таблице токенов."""
+        first = count_queries(token_client)
+        second = count_queries(token_client)
+
+        assert second == first - 1
+        assert cache.get(token_cache_key(token.key)) is not None
+
+    def test_response_unchanged(self, token_client, user, settings):
+        """Ответ совпадает с ответом без кеша."""
+        cached = token_client.get('/api/users/me/').json()
+        settings.AUTH_TOKEN_CACHE_TIMEOUT = 0
+
+        assert token_client.get('/api/users/me/').json() == cached
+        assert cached['email'] == user.email
+
+    def test_invalid_token(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token wrong')
+
+        response = client.get('/api/users/me/')
+
+        assert response.status_code == 401
+        assert response.json() == {'detail': 'Недопустимый токен.'}
+
+    def test_logout(self, token_client, token):
+        """После token/logout закешированный токен не принимается."""
+        count_queries(token_client)
+
+        response = token_client.post('/api/auth/token/logout/')
+
+        assert response.status_code == 204
+        assert cache.get(token_cache_key(token.key)) is None
+        assert token_client.get('/api/users/me/').status_code == 401
+
+    def test_set_password(self, token_client, token, user):
+        """Смена пароля сбрасывает снимок и сохраняет новый пароль."""
+        count_queries(token_client)
+
+        response = token_client.post('/api/users/set_password/', {
+            'current_password': 'testpassword',
+            'new_password': 'newpassword123',
+        })
+
+        assert response.status_code == 204
+        assert cache.get(token_cache_key(token.key)) is None
+        user.refresh_from_db()
+        assert user.check_password('newpassword123')
+
+    def test_deactivation(self, token_client, user):
+        """Деактивированный пользователь сразу теряет доступ."""
+        count_queries(token_client)
+        user.is_active = False
+        user.save()
+
+        response = token_client.get('/api/users/me/')
+
+        assert response.status_code == 401
+
+    def test_profile_change(self, token_client, user):
+        """Изменение профиля видно в следующем запросе."""
+        count_queries(token_client)
+        user.first_name = 'Новое'
+        user.save()
+
+        assert token_client.get('/api/users/me/').json()['first_name'] == (
+            'Новое'
+        )
+
+    def test_snapshot_save_keeps_other_fields(self, token_client, user):
+        """Сохранение пользователя из снимка не затирает остальные поля."""
+        count_queries(token_client)
+        get_user_model().objects.filter(pk=user.pk).update(recipes_count=7)
+
+        response = token_client.delete('/api/users/me/avatar/')
+
+        assert response.status_code == 204
+        user.refresh_from_db()
+        assert user.recipes_count == 7
+
+    def test_async_authenticate_shares_cache(self, rf, token, user):
+        """Асинхронный путь использует тот же кеш."""
+        authenticate = async_to_sync(async_views.authenticate)
+        request = rf.get('/', HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        assert authenticate(request) == user
+        assert cache.get(token_cache_key(token.key)) is not None
+        with CaptureQueriesContext(connection) as queries:
+            assert authenticate(request) == user
+        assert len(queries) == 0
+
+
+@pytest.fixture
+def small_pool(monkeypatch):
+    """Пул на один хеш без очереди."""
+    pool = hashers.HashingPool(workers=1, queue_size=0, timeout=5)
+    monkeypatch.setattr(hashers, '_pool', pool)
+    return pool
+
+
+def login(email='test@example.com', password='testpassword'):
+    return APIClient().post('/api/auth/token/login/', {
+        'email': email, 'password': password,
+    })
+
+
+@pytest.mark.django_db
+class TestLoginHashing:
+    """Проверка пароля при входе: пул, 429 и пересчет хешей."""
+
+    def test_pbkdf2_upgraded_to_argon2(self, user):
+        """Хеш PBKDF2 заменяется на argon2 при успешном входе."""
+        user.password = make_password(
+            'testpassword', hasher='pbkdf2_sha256'
+        )
+        user.save()
+
+        response = login()
+
+        assert response.status_code == 200
+        assert 'auth_token' in response.json()
+        user.refresh_from_db()
+        assert user.password.startswith('argon2$argon2id$')
+        assert user.check_password('testpassword')
+
+    def test_argon2_params_change_rehashes(self, user, settings):
+        settings.PASSWORD_ARGON2_TIME_COST = 3
+
+        assert login().status_code == 200
+
+        user.refresh_from_db()
+        assert 't=3' in user.password
+
+    def test_wrong_password_keeps_hash(self, user):
+        user.password = make_password('testpassword', hasher='pbkdf2_sha256')
+        user.save()
+
+        response = login(password='wrong')
+
+        assert response.status_code == 400
+        user.refresh_from_db()
+        assert user.password.startswith('pbkdf2_sha256$')
+
+    def test_unknown_email(self, user):
+        assert login(email='nobody@example.com').status_code == 400
+
+    def test_inactive_user(self, user):
+        user.is_active = False
+        user.save()
+
+        assert login().status_code == 400
+
+    def test_queue_full(self, user, small_pool):
+        """Занятый пул отвечает 429 с Retry-After, а не ждет."""
+        release = threading.Event()
+        small_pool._executor.submit(release.wait)
+        small_pool._slots.acquire()
+        try:
+            response = login()
+        finally:
+            small_pool._slots.release()
+            release.set()
+
+        assert response.status_code == 429
+        assert response['Retry-After'] == '5'
+
+    def test_timeout(self, user, small_pool):
+        """Хеш не получен за LOGIN_HASH_TIMEOUT - 429."""
+        small_pool.timeout = 0.01
+        release = threading.Event()
+        small_pool._executor.submit(release.wait)
+        try:
+            with pytest.raises(hashers.LoginThrottled):
+                small_pool.run(lambda: None)
+        finally:
+            release.set()
+
+    def test_slot_released_after_task(self, small_pool):
+        """Слот освобождается по завершении задачи."""
+        for _ in range(3):
+            assert small_pool.run(lambda: 42) == 42
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест публичного API по сценариям и сравнение с базовой линией.
+
+Сценарии (каждый выполняется по очереди заданное время):
+    feed           - страница ленты и один рецепт из нее
+    autocomplete   - поиск ингредиента по мере ввода (1-4 буквы)
+    favorite       - добавление рецепта в избранное и удаление
+                     (исходное состояние восстанавливается)
+    shopping_list  - скачивание списка покупок
+    subscriptions  - страница подписок с рецептами авторов
+
+Запросы идут от пользователей команды generate_benchmark_data (вход
+через /api/auth/token/login/). Для каждого сценария выводятся RPS,
+перцентили задержки, ошибки и SQL запросы на HTTP-запрос: их число и
+время в БД берутся из /metrics сервера (foodgram.metrics), поэтому
+скрипт нужно запускать из сети METRICS_ALLOWED_NETWORKS.
+
+С --baseline результаты сравниваются с сохраненными: рост задержки или
+падение RPS больше --tolerance и рост числа запросов больше
+--query-tolerance (и хотя бы на 0.25 запроса) считаются регрессией, и
+скрипт завершается с кодом 1.
+Задержки зависят от машины, поэтому базовую линию стоит снимать на той
+же машине и с тем же сервером; число запросов от машины не зависит.
+
+Пример (SQLite; для Postgres задайте DB_ENGINE, DB_NAME и т.д.):
+    cd backend
+    export DB_NAME=/tmp/bench.sqlite3
+    python manage.py migrate
+    python manage.py generate_benchmark_data --users 200 --recipes 2000 \\
+        --favorites 10000
+    gunicorn foodgram.wsgi:application --workers 2 --bind :8000
+
+    ./scripts/benchmarks/api_load.py --duration 10 \\
+        --save-baseline scripts/benchmarks/baseline_sqlite.json
+    ./scripts/benchmarks/api_load.py --duration 10 \\
+        --baseline scripts/benchmarks/baseline_sqlite.json
+
+generate_benchmark_data сбрасывает кеш ответов ленты и count, поэтому
+данные можно перегенерировать и при запущенном сервере.
+"""
+
+import argparse
+import http.client
+import json
+import random
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+
+LOGIN_PATH = '/api/auth/token/login/'
+METRICS_PATH = '/metrics'
+METRIC_LINE = re.compile(
+    r'^(foodgram_db_(?:queries_per_request|duration_seconds)_(?:sum|count))'
+    r'\{route="([^"]*)"\} (\S+)$',
+    re.MULTILINE
+)
+LATENCY_KEYS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def parse_arguments():
+    """Парсит аргументы командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Нагрузочный тест API по сценариям'
+    )
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help='Сценарий, можно указать несколько '
+                             '(по умолчанию все)')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Одновременных пользователей')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='Длительность замера сценария, сек')
+    parser.add_argument('--warmup', type=float, default=2,
+                        help='Прогрев перед замером сценария, сек')
+    parser.add_argument('--users', type=int, default=8,
+                        help='Сколько пользователей bench<N> войдет')
+    parser.add_argument('--password', default='Bench-password-2024')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline',
+                        help='JSON базовой линии для сравнения')
+    parser.add_argument('--save-baseline',
+                        help='Сохранить результаты как базовую линию')
+    parser.add_argument('--note', default='',
+                        help='Описание окружения для базовой линии')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Допустимое ухудшение задержки и RPS (доля)')
+    parser.add_argument('--query-tolerance', type=float, default=0.1,
+                        help='Допустимый рост числа запросов (доля)')
+    parser.add_argument('--json', action='store_true',
+                        help='Вывести результаты в JSON')
+    return parser.parse_args()
+
+
+def connect(url):
+    connection_class = (
+        http.client.HTTPSConnection if url.scheme == 'https'
+        else http.client.HTTPConnection
+    )
+    return connection_class(url.netloc, timeout=60)
+
+
+class Session:
+    """Соединение одного пользователя с учетом задержек и ошибок."""
+
+    def __init__(self, url, token=None):
+        self.url = url
+        self.connection = connect(url)
+        self.headers = {
+            'Accept': 'application/json', 'Connection': 'keep-alive',
+        }
+        if token:
+            self.headers['Authorization'] = f'Token {token}'
+        self.latencies = []
+        self.errors = 0
+
+    def request(self, method, path, ok=(200,), body=None):
+        """Выполняет запрос; статус вне ok считается ошибкой."""
+        headers = self.headers
+        if body is not None:
+            body = json.dumps(body)
+            headers = {**headers, 'Content-Type': 'application/json'}
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.errors += 1
+            self.connection.close()
+            self.connection = connect(self.url)
+            return None, b''
+        if response.status in ok:
+            self.latencies.append(time.perf_counter() - started)
+        else:
+            self.errors += 1
+        return response.status, content
+
+    def close(self):
+        self.connection.close()
+
+
+def feed(session, data, rng):
+    page = rng.randint(1, data['pages'])
+    status, content = session.request('GET', f'/api/recipes/?page={page}')
+    if status == 200:
+        results = json.loads(content)['results']
+        if results:
+            session.request(
+                'GET', f'/api/recipes/{rng.choice(results)["id"]}/'
+            )
+
+
+def autocomplete(session, data, rng):
+    name = rng.choice(data['ingredient_names'])
+    for length in range(1, min(len(name), 4) + 1):
+        session.request(
+            'GET', '/api/ingredients/?name=' + quote(name[:length])
+        )
+
+
+def favorite(session, data, rng):
+    path = f'/api/recipes/{rng.choice(data["recipe_ids"])}/favorite/'
+    status, _ = session.request('POST', path, ok=(201, 400))
+    session.request('DELETE', path, ok=(204,))
+    if status == 400:
+        # Рецепт уже был в избранном: возвращаем как было
+        session.request('POST', path, ok=(201,))
+
+
+def shopping_list(session, data, rng):
+    session.request('GET', '/api/recipes/download_shopping_cart/')
+
+
+def subscriptions(session, data, rng):
+    session.request('GET', '/api/users/subscriptions/?recipes_limit=3')
+
+
+SCENARIOS = {
+    'feed': feed,
+    'autocomplete': autocomplete,
+    'favorite': favorite,
+    'shopping_list': shopping_list,
+    'subscriptions': subscriptions,
+}
+
+
+def login(url, email, password):
+    session = Session(url)
+    status, content = session.request(
+        'POST', LOGIN_PATH, body={'email': email, 'password': password}
+    )
+    session.close()
+    if status != 200:
+        raise SystemExit(
+            f'Не удалось войти как {email}: HTTP {status}. '
+            'Данные создает manage.py generate_benchmark_data'
+        )
+    return json.loads(content)['auth_token']
+
+
+def load_data(url, token):
+    """Рецепты и ингредиенты, к которым обращаются сценарии."""
+    session = Session(url, token)
+    _, content = session.request('GET', '/api/recipes/?limit=100')
+    recipes = json.loads(content)
+    _, content = session.request('GET', '/api/ingredients/')
+    session.close()
+    return {
+        'recipe_ids': [recipe['id'] for recipe in recipes['results']],
+        'pages': max(1, min(recipes['count'] // 6, 50)),
+        'ingredient_names': [
+            ingredient['name'] for ingredient in json.loads(content)[:500]
+        ],
+    }
+
+
+def read_db_metrics(url):
+    """Суммы (запросов, SQL запросов, секунд в БД) из /metrics или None."""
+    session = Session(url)
+    status, content = session.request('GET', METRICS_PATH)
+    session.close()
+    if status != 200:
+        return None
+    totals = {}
+    for name, route, value in METRIC_LINE.findall(content.decode()):
+        if route != 'metrics':
+            totals[name] = totals.get(name, 0) + float(value)
+    return (
+        totals.get('foodgram_db_queries_per_request_count', 0),
+        totals.get('foodgram_db_queries_per_request_sum', 0),
+        totals.get('foodgram_db_duration_seconds_sum', 0),
+    )
+
+
+def worker(url, token, scenario, data, seed, deadline):
+    """Выполняет сценарий по кругу до deadline."""
+    session = Session(url, token)
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        scenario(session, data, rng)
+    session.close()
+    return session.latencies, session.errors
+
+
+def run(url, tokens, scenario, data, args, duration):
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [
+            executor.submit(
+                worker, url, tokens[index % len(tokens)], scenario, data,
+                args.seed + index, deadline
+            )
+            for index in range(args.concurrency)
+        ]
+        return [future.result() for future in futures]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def measure(url, tokens, name, data, args):
+    """Замер одного сценария после прогрева."""
+    scenario = SCENARIOS[name]
+    if args.warmup:
+        run(url, tokens, scenario, data, args, args.warmup)
+    before = read_db_metrics(url)
+    results = run(url, tokens, scenario, data, args, args.duration)
+    after = read_db_metrics(url)
+
+    latencies = [value for result in results for value in result[0]]
+    result = {
+        'requests': len(latencies),
+        'errors': sum(result[1] for result in results),
+        'rps': round(len(latencies) / args.duration, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'queries_per_request': None,
+        'db_ms_per_request': None,
+    }
+    if before is not None and after is not None and after[0] > before[0]:
+        observed = after[0] - before[0]
+        result['queries_per_request'] = round(
+            (after[1] - before[1]) / observed, 2
+        )
+        result['db_ms_per_request'] = round(
+            (after[2] - before[2]) / observed * 1000, 2
+        )
+    return result
+
+
+def compare(name, result, baseline, args):
+    """Строки сравнения с базовой линией и признак регрессии."""
+    lines, regression = [], False
+
+    def check(key, worse):
+        nonlocal regression
+        old, new = baseline.get(key), result.get(key)
+        if old is None or new is None:
+            return
+        change = f'({new / old - 1:+.0%})' if old else ''
+        flag = ''
+        if worse(old, new):
+            flag = '  <-- регрессия'
+            regression = True
+        lines.append(f'    {key:<20} {old:9.2f} -> {new:9.2f} {change}{flag}')
+
+    for key in LATENCY_KEYS:
+        check(key, lambda old, new: new > old * (1 + args.tolerance))
+    check('rps', lambda old, new: new < old * (1 - args.tolerance))
+    # Рост меньше четверти запроса на HTTP-запрос - разброс ветвей сценария
+    check('queries_per_request', lambda old, new: (
+        new - old > max(old * args.query_tolerance, 0.25)
+    ))
+    return [f'  {name}:'] + lines, regression
+
+
+def format_result(name, result):
+    queries = result['queries_per_request']
+    db = (
+        f'queries/req={queries:5.1f} db={result["db_ms_per_request"]:5.1f}ms'
+        if queries is not None else 'queries/req=   n/a'
+    )
+    return (
+        f'{name:>14} rps={result["rps"]:8.1f} '
+        f'p50={result["p50_ms"]:7.1f}ms p95={result["p95_ms"]:7.1f}ms '
+        f'p99={result["p99_ms"]:7.1f}ms {db} errors={result["errors"]}'
+    )
+
+
+def main():
+    args = parse_arguments()
+    url = urlsplit(args.url.rstrip('/'))
+    tokens = [
+        login(url, f'bench{index}@example.com', args.password)
+        for index in range(args.users)
+    ]
+    data = load_data(url, tokens[0])
+    if read_db_metrics(url) is None:
+        print(
+            f'{METRICS_PATH} недоступен: число SQL запросов не измеряется',
+            file=sys.stderr
+        )
+
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        results[name] = measure(url, tokens, name, data, args)
+        if not args.json:
+            print(format_result(name, results[name]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as file:
+            json.dump({
+                'environment': {
+                    'note': args.note,
+                    'concurrency': args.concurrency,
+                    'duration': args.duration,
+                    'users': args.users,
+                },
+                'scenarios': results,
+            }, file, indent=2, ensure_ascii=False)
+            file.write('\n')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)
+        print(f'\nСравнение с {args.baseline}', file=sys.stderr)
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline['scenarios']:
+                continue
+            lines, regression = compare(
+                name, result, baseline['scenarios'][name], args
+            )
+            print('\n'.join(lines), file=sys.stderr)
+            if regression:
+                regressions.append(name)
+        if regressions:
+            sys.exit(f'Регрессия в сценариях: {", ".join(regressions)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Сравнение пропускной способности WSGI- и ASGI-развертываний.
+
+Скрипт открывает заданное число одновременных соединений к каждому
+серверу и в течение заданного времени запрашивает эндпоинты чтения
+(лента, рецепт, поиск ингредиентов, профиль пользователя). Для каждого
+уровня конкуренции выводятся RPS, перцентили задержки и число ошибок.
+
+Пример (сервера запущены заранее на одной и той же БД):
+    gunicorn foodgram.wsgi:application --workers 4 --bind :8000
+    ASYNC_READ_VIEWS=True gunicorn foodgram.asgi:application \\
+        --worker-class uvicorn.workers.UvicornWorker --workers 4 --bind :8001
+
+    ./scripts/benchmarks/asgi_vs_wsgi.py \\
+        --target wsgi=http://localhost:8000 \\
+        --target asgi=http://localhost:8001 \\
+        --concurrency 1,16,64 --duration 15
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?page=2',
+    '/api/recipes/{recipe_id}/',
+    '/api/ingredients/?name=%D1%81%D0%BE%D0%BB',
+    '/api/users/{user_id}/',
+)
+
+
+def parse_arguments():
+    """Парсит аргументы командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Сравнение WSGI и ASGI под конкурентной нагрузкой'
+    )
+    parser.add_argument('--target', action='append', required=True,
+                        help='Сервер в виде имя=URL, можно указать несколько')
+    parser.add_argument('--concurrency', default='1,16,64',
+                        help='Уровни конкуренции через запятую')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='Длительность замера на уровень, сек')
+    parser.add_argument('--token',
+                        help='Токен для запросов от имени пользователя')
+    parser.add_argument('--recipe-id', type=int, default=1)
+    parser.add_argument('--user-id', type=int, default=1)
+    parser.add_argument('--json', action='store_true',
+                        help='Вывести результаты в JSON')
+    return parser.parse_args()
+
+
+def worker(base_url, paths, headers, deadline):
+    """Запрашивает пути по кругу по одному соединению до deadline."""
+    url = urlsplit(base_url)
+    connection_class = (
+        http.client.HTTPSConnection if url.scheme == 'https'
+        else http.client.HTTPConnection
+    )
+    connection = connection_class(url.netloc, timeout=30)
+    latencies, errors = [], 0
+    index = 0
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = connection_class(url.netloc, timeout=30)
+    connection.close()
+    return latencies, errors
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def measure(base_url, paths, headers, concurrency, duration):
+    """Замер одного сервера на одном уровне конкуренции."""
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(worker, base_url, paths, headers, deadline)
+            for _ in range(concurrency)
+        ]
+        results = [future.result() for future in futures]
+    latencies = [value for result in results for value in result[0]]
+    errors = sum(result[1] for result in results)
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / duration,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_ms': (statistics.fmean(latencies) * 1000) if latencies else 0,
+    }
+
+
+def main():
+    args = parse_arguments()
+    targets = []
+    for target in args.target:
+        name, _, url = target.partition('=')
+        if not url:
+            sys.exit(f'Некорректный --target: {target} (ожидается имя=URL)')
+        targets.append((name, url.rstrip('/')))
+    levels = [int(level) for level in args.concurrency.split(',')]
+    paths = [
+        path.format(recipe_id=args.recipe_id, user_id=args.user_id)
+        for path in DEFAULT_PATHS
+    ]
+    headers = {'Accept': 'application/json', 'Connection': 'keep-alive'}
+    if args.token:
+        headers['Authorization'] = f'Token {args.token}'
+
+    results = {}
+    for name, url in targets:
+        for level in levels:
+            result = measure(url, paths, headers, level, args.duration)
+            results.setdefault(name, []).append(result)
+            if not args.json:
+                print(
+                    f'{name:>8} c={level:<4} rps={result["rps"]:8.1f} '
+                    f'p50={result["p50_ms"]:7.1f}ms '
+                    f'p95={result["p95_ms"]:7.1f}ms '
+                    f'p99={result["p99_ms"]:7.1f}ms '
+                    f'errors={result["errors"]}'
+                )
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
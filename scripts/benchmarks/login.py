@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Пропускная способность входа (POST /api/auth/token/login/).
+
+Скрипт регистрирует пользователя через API (если его еще нет) и на
+каждом уровне конкуренции в течение заданного времени выполняет вход;
+доля запросов с неверным паролем задается --wrong-ratio. Выводятся
+успешные входы в секунду, перцентили задержки, число ответов 429
+(очередь проверки паролей заполнена, см. users.hashers) и ошибок.
+
+Пример:
+    LOGIN_HASH_WORKERS=2 gunicorn foodgram.wsgi:application \\
+        --workers 2 --threads 8 --bind :8000
+    ./scripts/benchmarks/login.py --url http://localhost:8000 \\
+        --concurrency 1,8,32 --duration 10
+"""
+
+import argparse
+import http.client
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+LOGIN_PATH = '/api/auth/token/login/'
+SIGNUP_PATH = '/api/users/'
+
+
+def parse_arguments():
+    """Парсит аргументы командной строки."""
+    parser = argparse.ArgumentParser(description='Нагрузка на вход')
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--concurrency', default='1,8,32',
+                        help='Уровни конкуренции через запятую')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='Длительность замера на уровень, сек')
+    parser.add_argument('--email', default='bench-login@example.com')
+    parser.add_argument('--password', default='Bench-login-2024')
+    parser.add_argument('--wrong-ratio', type=float, default=0.0,
+                        help='Доля входов с неверным паролем')
+    parser.add_argument('--json', action='store_true',
+                        help='Вывести результаты в JSON')
+    return parser.parse_args()
+
+
+def connect(url):
+    connection_class = (
+        http.client.HTTPSConnection if url.scheme == 'https'
+        else http.client.HTTPConnection
+    )
+    return connection_class(url.netloc, timeout=60)
+
+
+def post(connection, path, data):
+    connection.request('POST', path, body=json.dumps(data), headers={
+        'Content-Type': 'application/json', 'Accept': 'application/json',
+    })
+    response = connection.getresponse()
+    response.read()
+    return response.status
+
+
+def ensure_user(url, email, password):
+    """Создает пользователя для входа; 400 - уже существует."""
+    connection = connect(url)
+    status = post(connection, SIGNUP_PATH, {
+        'email': email, 'username': email.split('@')[0].replace('-', '_'),
+        'first_name': 'Bench', 'last_name': 'Login', 'password': password,
+    })
+    connection.close()
+    if status not in (201, 400):
+        raise SystemExit(f'Не удалось создать пользователя: HTTP {status}')
+
+
+def worker(url, email, password, wrong_ratio, deadline):
+    """Входит по кругу по одному соединению до deadline."""
+    connection = connect(url)
+    latencies = []
+    counts = {'ok': 0, 'rejected': 0, 'throttled': 0, 'errors': 0}
+    index = 0
+    while time.perf_counter() < deadline:
+        index += 1
+        wrong = wrong_ratio and (index * wrong_ratio) % 1 < wrong_ratio
+        started = time.perf_counter()
+        try:
+            status = post(connection, LOGIN_PATH, {
+                'email': email,
+                'password': password + '-wrong' if wrong else password,
+            })
+        except (OSError, http.client.HTTPException):
+            counts['errors'] += 1
+            connection.close()
+            connection = connect(url)
+            continue
+        if status == 429:
+            counts['throttled'] += 1
+            continue
+        if status == 200:
+            counts['ok'] += 1
+        elif status == 400:
+            counts['rejected'] += 1
+        else:
+            counts['errors'] += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+    return latencies, counts
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def measure(url, args, concurrency):
+    """Замер на одном уровне конкуренции."""
+    deadline = time.perf_counter() + args.duration
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(
+                worker, url, args.email, args.password, args.wrong_ratio,
+                deadline
+            )
+            for _ in range(concurrency)
+        ]
+        results = [future.result() for future in futures]
+    latencies = [value for result in results for value in result[0]]
+    counts = {
+        key: sum(result[1][key] for result in results)
+        for key in results[0][1]
+    }
+    return {
+        'concurrency': concurrency,
+        **counts,
+        'logins_per_sec': (counts['ok'] + counts['rejected']) / args.duration,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    args = parse_arguments()
+    url = urlsplit(args.url.rstrip('/'))
+    ensure_user(url, args.email, args.password)
+
+    results = []
+    for level in (int(level) for level in args.concurrency.split(',')):
+        result = measure(url, args, level)
+        results.append(result)
+        if not args.json:
+            print(
+                f'c={level:<4} logins/s={result["logins_per_sec"]:7.1f} '
+                f'p50={result["p50_ms"]:7.1f}ms '
+                f'p95={result["p95_ms"]:7.1f}ms '
+                f'p99={result["p99_ms"]:7.1f}ms '
+                f'429={result["throttled"]} errors={result["errors"]}'
+            )
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Запросы с токеном в секунду без кеша токенов и с кешем.
+
+Скрипт поднимает Django в процессе, создает пользователя с токеном в
+отдельной БД (по умолчанию временный файл SQLite, см. DB_NAME) и
+отправляет авторизованные GET-запросы тестовым клиентом: сначала с
+AUTH_TOKEN_CACHE_TIMEOUT = 0 (запрос Token JOIN User на каждый запрос,
+как у TokenAuthentication), затем с кешем. Сеть и сервер в замер не
+входят, поэтому разница - это именно стоимость проверки токена.
+
+Пример:
+    ./scripts/benchmarks/token_auth.py --requests 3000
+    DB_ENGINE=django.db.backends.postgresql DB_NAME=foodgram \\
+        ./scripts/benchmarks/token_auth.py
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / 'backend'
+
+DEFAULT_PATHS = (
+    '/api/users/me/',
+    '/api/recipes/?is_favorited=1',
+    '/api/users/subscriptions/',
+)
+
+
+def parse_arguments():
+    """Парсит аргументы командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Аутентификация по токену без кеша и с кешем'
+    )
+    parser.add_argument('--requests', type=int, default=2000,
+                        help='Запросов на каждый вариант')
+    parser.add_argument('--path', action='append',
+                        help='Путь для запросов, можно указать несколько')
+    parser.add_argument('--rounds', type=int, default=3,
+                        help='Раундов; варианты чередуются, берется лучший')
+    parser.add_argument('--timeout', type=int, default=60,
+                        help='AUTH_TOKEN_CACHE_TIMEOUT для варианта с кешем')
+    return parser.parse_args()
+
+
+def setup_django():
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    os.environ.setdefault('DEBUG', 'False')
+    os.environ['ALLOWED_HOSTS'] = 'testserver'
+    os.environ.setdefault('DB_NAME', os.path.join(
+        tempfile.gettempdir(), 'foodgram_token_auth.sqlite3'
+    ))
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command('migrate', verbosity=0)
+
+
+def make_client():
+    from django.contrib.auth import get_user_model
+    from rest_framework.authtoken.models import Token
+    from rest_framework.test import APIClient
+
+    user, _ = get_user_model().objects.get_or_create(
+        email='bench-token@example.com',
+        defaults={
+            'username': 'bench_token', 'first_name': 'Bench',
+            'last_name': 'Token',
+        }
+    )
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def measure(client, paths, count):
+    """RPS и запросов к БД на запрос по кругу путей."""
+    from django.db import connection
+
+    queries = 0
+
+    def count_query(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    for path in paths:
+        # Прогрев: кеш токена, ответов и соединение с БД
+        assert client.get(path).status_code == 200, path
+    with connection.execute_wrapper(count_query):
+        started = time.perf_counter()
+        for index in range(count):
+            client.get(paths[index % len(paths)])
+        elapsed = time.perf_counter() - started
+    return {
+        'rps': count / elapsed,
+        'queries': queries / count,
+    }
+
+
+def main():
+    args = parse_arguments()
+    setup_django()
+
+    from django.core.cache import cache
+    from django.test import override_settings
+
+    client = make_client()
+    paths = args.path or DEFAULT_PATHS
+    results = {}
+    for _ in range(args.rounds):
+        for name, timeout in (('db', 0), ('cached', args.timeout)):
+            cache.clear()
+            with override_settings(AUTH_TOKEN_CACHE_TIMEOUT=timeout):
+                result = measure(client, paths, args.requests)
+            if result['rps'] > results.get(name, {}).get('rps', 0):
+                results[name] = result
+    for name in results:
+        print(
+            f'{name:>7} rps={results[name]["rps"]:8.1f} '
+            f'queries/request={results[name]["queries"]:.2f}'
+        )
+    print(f'speedup x{results["cached"]["rps"] / results["db"]["rps"]:.2f}')
+
+
+if __name__ == '__main__':
+    main()